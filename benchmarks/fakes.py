@@ -0,0 +1,123 @@
+"""
+Datos sintéticos y fuentes falsas para los benchmarks (sin red).
+
+- `synthetic_ohlcv`: velas con el formato de data_pipeline.download_ohlcv.
+- `FakeYFinance`: descargador compatible con download_ohlcv / OHLCVStore.
+- `FakeSourcesServer`: servidor HTTP local que imita Reddit y FRED.
+- `fake_trends`: sustituto de la fuente de Google Trends.
+- `FakeSherloock`: motor con `reason()` y `predict_batch()` de coste fijo.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+
+# Tamaños de referencia: nombre -> (velas, frecuencia)
+SIZES = {
+    "1y_daily": (252, "B"),
+    "10y_daily": (2_520, "B"),
+    "1y_hourly": (6_240, "h"),
+    "1y_minute": (374_400, "min"),
+    "10y_minute": (3_744_000, "min"),
+}
+
+
+def synthetic_ohlcv(n, freq="B", seed=0, start="2015-01-01", price=1.10, vol=0.004):
+    """Paseo aleatorio log-normal con high/low coherentes y volumen."""
+    rng = np.random.default_rng(seed)
+    close = price * np.exp(np.cumsum(rng.normal(0.0, vol, n)))
+    open_ = np.concatenate([[price], close[:-1]])
+    wick = np.abs(rng.normal(0.0, vol / 2, (2, n))) * close
+    return pd.DataFrame({
+        "date": pd.date_range(start, periods=n, freq=freq),
+        "open": open_,
+        "high": np.maximum(open_, close) + wick[0],
+        "low": np.minimum(open_, close) - wick[1],
+        "close": close,
+        "volume": rng.integers(1_000, 100_000, n).astype(float),
+    })
+
+
+class FakeYFinance:
+    """Descargador con la firma de download_ohlcv que sirve un histórico fijo."""
+
+    def __init__(self, n, freq="B", seed=0):
+        self.history = synthetic_ohlcv(n, freq, seed)
+        self.calls = 0
+
+    def __call__(self, symbol, interval="1d", **kwargs):
+        self.calls += 1
+        df = self.history
+        if "start" in kwargs:
+            df = df[df["date"] >= pd.Timestamp(kwargs["start"])]
+        return df.reset_index(drop=True)
+
+
+def fake_reddit_listing(n_posts=50, seed=0):
+    rng = np.random.default_rng(seed)
+    words = ["rally", "crash", "EUR", "bullish", "bearish", "flat", "ECB", "Fed", "great", "awful"]
+    return {"data": {"children": [
+        {"data": {"name": f"t3_{seed}_{i}", "title": " ".join(rng.choice(words, 6))}} for i in range(n_posts)
+    ]}}
+
+
+class FakeSourcesServer:
+    """Servidor HTTP local con las respuestas de Reddit (token + listados) y FRED."""
+
+    def __init__(self, latency=0.0, n_posts=50):
+        listing = json.dumps(fake_reddit_listing(n_posts)).encode()
+        fred = json.dumps({"observations": [
+            {"date": f"2024-{m:02d}-01", "value": str(5.0e11 + m * 1e9)} for m in range(1, 13)
+        ]}).encode()
+        token = json.dumps({"access_token": "token"}).encode()
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, body):
+                time.sleep(latency)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self._reply(token)
+
+            def do_GET(self):
+                self._reply(fred if self.path.startswith("/fred") else listing)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.endpoints = {"reddit_auth": f"{url}/api/v1/access_token", "reddit_api": url, "fred": f"{url}/fred"}
+
+    def close(self):
+        self.server.shutdown()
+
+
+def fake_trends():
+    """Resultado con el formato de factors._get_interest_factors."""
+    return {"gtrends_eurusd": 0.42, "gtrends_recession": 0.13}
+
+
+class FakeSherloock:
+    """Motor Sherloock de coste fijo (el benchmark mide lo que hay alrededor)."""
+
+    def __init__(self, cost_s=0.0):
+        self.cost_s = cost_s
+
+    def reason(self, command):
+        if self.cost_s:
+            time.sleep(self.cost_s)
+        if command.startswith("forecast"):
+            return "[FORECAST PuLP] Valor optimizado: 1.08000"
+        return "[MÚSCULO LÓGICO] Soluciones: []"
+
+    def predict_batch(self, X):
+        return np.zeros(len(X), dtype=int)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Benchmarks offline de SS91-V3.
+
+Mide, con datos sintéticos y fuentes falsas (ver benchmarks/fakes.py):
+
+    indicators        fetch_ohlcv (descarga falsa + indicadores pandas_ta)
+    fibonacci         compute_fibonacci_levels y rolling_fibonacci
+    backtest          run_vectorized_backtest + simulate_trades
+    marginal_factors  get_all_marginal_factors (Reddit/FRED/Trends falsos)
+    decision          generate_decision (Sherloock falso)
+    decisions         generate_decisions sobre una tabla de n símbolo-velas
+    streaming         stream_decisions vela a vela (replay; p.ej. --sizes 1y_minute)
+    robustness        robustness_report con 10.000 remuestreos del backtest
+
+Los resultados se guardan en benchmarks/results/<commit>.json para poder
+comparar entre commits:
+
+    python benchmarks/run.py                         # tamaños por defecto
+    python benchmarks/run.py --sizes all --repeat 3
+    python benchmarks/run.py --compare benchmarks/results/abc1234.json
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+from benchmarks.fakes import SIZES, FakeSherloock, FakeSourcesServer, FakeYFinance, fake_trends, synthetic_ohlcv
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_SIZES = ("1y_daily", "10y_daily", "1y_hourly")
+REGRESSION_THRESHOLD = 1.2  # 20% más lento que la referencia
+
+
+def _with_fake_indicators(df):
+    """RSI/ATR sintéticos para los benchmarks que no miden pandas_ta."""
+    rng = np.random.default_rng(1)
+    out = df.copy()
+    out["RSI_14"] = np.clip(50 + np.cumsum(rng.normal(0, 3, len(df))) % 100, 0, 100)
+    out["ATRr_14"] = (df["high"] - df["low"]).rolling(14, min_periods=1).mean()
+    return out
+
+
+@contextlib.contextmanager
+def offline_sources():
+    """Sustituye Reddit/FRED/Trends, las cachés y Sherloock por fakes en proceso."""
+    from ss91_v3 import engine, factors
+    from ss91_v3.factor_cache import FactorCache
+    from ss91_v3.sentiment import SentimentCache
+
+    server = FakeSourcesServer()
+    saved = (dict(factors.ENDPOINTS), factors._get_interest_factors, factors.get_factor_cache,
+             factors._SENTIMENT_CACHE, engine._ENGINE)
+    env = {k: os.environ.get(k) for k in ("REDDIT_CLIENT_ID", "REDDIT_SECRET", "FRED_API_KEY")}
+    try:
+        factors.ENDPOINTS.update(server.endpoints)
+        factors._get_interest_factors = fake_trends
+        factors.get_factor_cache = lambda: FactorCache(path=None)
+        factors._SENTIMENT_CACHE = SentimentCache(path=None)
+        engine._ENGINE = FakeSherloock()
+        os.environ.update({k: "bench" for k in env})
+        yield
+    finally:
+        factors.ENDPOINTS.clear()
+        factors.ENDPOINTS.update(saved[0])
+        factors._get_interest_factors, factors.get_factor_cache, factors._SENTIMENT_CACHE, engine._ENGINE = saved[1:]
+        for k, v in env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        server.close()
+
+
+# --- Benchmarks: cada uno devuelve (setup, fn) para un tamaño ---
+def bench_indicators(n, freq):
+    from ss91_v3.data_pipeline import fetch_ohlcv
+    store = types.SimpleNamespace(get=FakeYFinance(n, freq))
+    return None, lambda: fetch_ohlcv("EURUSD=X", period="max", store=store)
+
+
+def bench_fibonacci(n, freq):
+    from ss91_v3.data_pipeline import compute_fibonacci_levels
+    from ss91_v3.fibonacci import rolling_fibonacci
+    df = synthetic_ohlcv(n, freq)
+    return None, lambda: (compute_fibonacci_levels(df), rolling_fibonacci(df, 252))
+
+
+def bench_backtest(n, freq):
+    from ss91_v3.backtest import run_vectorized_backtest
+    from ss91_v3.risk import simulate_trades
+    df = _with_fake_indicators(synthetic_ohlcv(n, freq))
+    sentiment = np.random.default_rng(2).uniform(0, 1, n)
+
+    def run():
+        result = run_vectorized_backtest(df, sentiment=sentiment, gtrends_crisis=0.6)
+        simulate_trades(df, result["signal"].to_numpy())
+    return None, run
+
+
+def bench_marginal_factors(n, freq):
+    from ss91_v3.data_pipeline import get_all_marginal_factors
+    df = _with_fake_indicators(synthetic_ohlcv(n, freq))
+    return None, lambda: get_all_marginal_factors(df)
+
+
+def bench_decision(n, freq):
+    from ss91_v3 import engine
+    from ss91_v3.core import generate_decision
+    from ss91_v3.data_pipeline import build_payload
+    df = _with_fake_indicators(synthetic_ohlcv(n, freq))
+    payload = build_payload(df, {"reddit_vader_avg": 0.1, "gtrends_recession": 0.9, "fred_debt_norm": 0.5}, {})
+    # Fuerza la regla de Pánico para que haya llamada a Sherloock
+    payload["ohlc_latest"]["RSI_14"] = 20.0
+    payload["fibonacci"]["position_ratio"] = 0.1
+    return engine.clear_reason_cache, lambda: generate_decision(payload)
+
+
+def bench_decisions(n, freq):
+    from ss91_v3 import engine
+    from ss91_v3.core import generate_decisions
+    rng = np.random.default_rng(3)
+    table = pd.DataFrame({
+        "symbol": [f"SYM{i % 500}" for i in range(n)],
+        "snapshot_time_utc": np.repeat(pd.date_range("2024-01-01", periods=-(-n // 500), freq="h"), 500)[:n],
+        "rsi": rng.uniform(0, 100, n), "fibo_ratio": rng.uniform(0, 1, n),
+        "sentiment": rng.uniform(0, 1, n), "gtrends_crisis": rng.uniform(0, 1, n),
+        "close": rng.uniform(1.0, 1.2, n), "low_1y": 1.0,
+    })
+    table["recent_prices"] = [[c * 0.999, c] for c in table["close"]]
+    return engine.clear_reason_cache, lambda: generate_decisions(table)
+
+
+def bench_streaming(n, freq):
+    from ss91_v3.streaming import measure, replay_frame, static_factors, stream_decisions
+    df = synthetic_ohlcv(n, freq)
+    factors = {"reddit_vader_avg": 0.1, "gtrends_recession": 0.9, "fred_debt_norm": 0.5}
+
+    def run():
+        stats = measure(stream_decisions(replay_frame(df), static_factors(factors), fibo_lookback=252))
+        log_stats(f"streaming {n} velas", stats)
+    return None, run
+
+
+def bench_robustness(n, freq):
+    from ss91_v3.backtest import run_vectorized_backtest
+    from ss91_v3.robustness import robustness_report
+    df = _with_fake_indicators(synthetic_ohlcv(n, freq))
+    result = run_vectorized_backtest(df, sentiment=np.random.default_rng(2).uniform(0, 1, n), gtrends_crisis=0.6)
+    return None, lambda: robustness_report(result, n_samples=10_000)
+
+
+def log_stats(label, stats):
+    logging.getLogger("ss91_v3").info(f"{label}: {json.dumps(stats)}")
+
+
+# nombre -> (función, depende del tamaño)
+BENCHMARKS = {
+    "indicators": (bench_indicators, True),
+    "fibonacci": (bench_fibonacci, True),
+    "backtest": (bench_backtest, True),
+    "marginal_factors": (bench_marginal_factors, False),
+    "decision": (bench_decision, False),
+    "decisions": (bench_decisions, True),
+    "streaming": (bench_streaming, True),
+    "robustness": (bench_robustness, True),
+}
+
+
+def time_call(setup, fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_benchmarks(names, sizes, repeat=3):
+    """Lista de resultados {benchmark, size, n, status, min_s, median_s, runs}."""
+    results = []
+    with offline_sources():
+        for name in names:
+            make, sized = BENCHMARKS[name]
+            for size in (sizes if sized else sizes[:1]):
+                n, freq = SIZES[size]
+                row = {"benchmark": name, "size": size if sized else "-", "n": n if sized else None}
+                try:
+                    setup, fn = make(n, freq)
+                    fn()  # calentamiento (imports, cachés de pandas)
+                    timings = time_call(setup, fn, repeat)
+                    row.update(status="ok", min_s=min(timings), median_s=statistics.median(timings), runs=timings)
+                except Exception as e:
+                    row.update(status="error", error=f"{type(e).__name__}: {e}")
+                print(_format_row(row), flush=True)
+                results.append(row)
+    return results
+
+
+def _format_row(row):
+    if row["status"] != "ok":
+        return f"{row['benchmark']:<18}{row['size']:<12}ERROR {row['error']}"
+    return f"{row['benchmark']:<18}{row['size']:<12}min {row['min_s'] * 1e3:10.2f} ms   median {row['median_s'] * 1e3:10.2f} ms"
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def save_results(results, path=None):
+    commit = git_commit()
+    path = path or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    document = {
+        "commit": commit,
+        "created_utc": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count(), "numpy": np.__version__, "pandas": pd.__version__},
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    return path
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compara con un JSON de referencia. Devuelve las filas
+    (benchmark, size, base_s, new_s, ratio, regression) de los benchmarks
+    presentes en ambos.
+    """
+    base = {(r["benchmark"], r["size"]): r for r in baseline["results"] if r["status"] == "ok"}
+    rows = []
+    for r in results:
+        b = base.get((r["benchmark"], r["size"]))
+        if r["status"] != "ok" or b is None:
+            continue
+        ratio = r["min_s"] / b["min_s"] if b["min_s"] > 0 else float("inf")
+        rows.append((r["benchmark"], r["size"], b["min_s"], r["min_s"], ratio, ratio > threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks offline de SS91-V3")
+    parser.add_argument("--bench", action="append", choices=sorted(BENCHMARKS), help="Benchmark (repetible)")
+    parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES),
+                        help=f"Lista separada por comas o 'all' ({', '.join(SIZES)})")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Ruta del JSON (por defecto benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="JSON de referencia para detectar regresiones")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--verbose", action="store_true", help="Mostrar los logs de ss91_v3")
+    args = parser.parse_args(argv)
+    if not args.verbose:
+        logging.getLogger("ss91_v3").setLevel(logging.WARNING)
+
+    sizes = list(SIZES) if args.sizes == "all" else args.sizes.split(",")
+    results = run_benchmarks(args.bench or list(BENCHMARKS), sizes, args.repeat)
+    print(f"Resultados guardados en {save_results(results, args.output)}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            rows = compare(results, json.load(f), args.threshold)
+        regressions = 0
+        for name, size, base_s, new_s, ratio, regression in rows:
+            regressions += regression
+            flag = "  <-- REGRESIÓN" if regression else ""
+            print(f"{name:<18}{size:<12}{base_s * 1e3:10.2f} ms -> {new_s * 1e3:10.2f} ms  x{ratio:.2f}{flag}")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
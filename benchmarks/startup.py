@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque: tiempo de import y memoria de los puntos de entrada.
+
+Cada objetivo se importa en un proceso nuevo con `python -X importtime`;
+se toma el tiempo acumulado del módulo (mínimo de --repeat ejecuciones),
+la memoria máxima del proceso (ru_maxrss) y qué dependencias pesadas
+quedaron cargadas. Falla (exit 1) si un objetivo carga una dependencia
+que no le toca (comprobación estricta) o si memoria o tiempo superan la
+referencia guardada en benchmarks/startup_baseline.json más la tolerancia.
+
+El tiempo sólo se comprueba con --repeat >= TIME_GATE_REPEAT (con menos
+ejecuciones el mínimo todavía es ruido) y con margen relativo y absoluto.
+Tiempo y memoria sólo se comparan si la referencia se grabó con la misma
+versión de Python (la del workflow de CI).
+
+    python benchmarks/startup.py                 # dependencias y memoria
+    python benchmarks/startup.py --repeat 15     # además, tiempo de import
+    python benchmarks/startup.py --record --repeat 15   # guardar una referencia nueva
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+TIME_TOLERANCE = 1.3     # 30% más lento que la referencia...
+TIME_SLACK_US = 25_000   # ...más 25 ms absolutos (un import de ~75 ms varía más del 30%)
+TIME_GATE_REPEAT = 15    # ejecuciones mínimas para comprobar el tiempo
+MEMORY_TOLERANCE = 1.1   # 10% más memoria que la referencia
+
+HEAVY = ("yfinance", "pandas_ta", "pytrends", "vaderSentiment", "requests", "sherloock")
+# Objetivo -> dependencias que no debe cargar al importarse
+TARGETS = {
+    "collector": HEAVY,
+    "decitor": HEAVY + ("pandas",),
+    "ss91_v3.core": HEAVY + ("pandas",),
+    "orchestrator": HEAVY + ("pandas",),
+}
+
+_PROBE = (
+    "import resource, sys\n"
+    "import {target}\n"
+    "rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+    "loaded = [m for m in {forbidden!r} if m in sys.modules]\n"
+    "import json\n"
+    "print(json.dumps({{'maxrss_kb': rss, 'loaded': loaded}}))\n"
+)
+
+
+def parse_importtime(stderr, module):
+    """Tiempo acumulado (µs) de `module` importado en primer nivel, según -X importtime."""
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.rstrip() == f" {module}":
+            return int(cumulative)
+    raise ValueError(f"'{module}' no aparece en la salida de -X importtime.")
+
+
+def measure(target, forbidden=(), repeat=5):
+    """{"import_us", "maxrss_kb", "loaded"} de `target` (mínimos de `repeat` procesos)."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    runs = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                               _PROBE.format(target=target, forbidden=tuple(forbidden))],
+                              cwd=ROOT, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"No se pudo importar {target}:\n{proc.stderr[-2000:]}")
+        probe = json.loads(proc.stdout.strip().splitlines()[-1])
+        runs.append({"import_us": parse_importtime(proc.stderr, target), **probe})
+    return {
+        "import_us": min(r["import_us"] for r in runs),
+        "maxrss_kb": min(r["maxrss_kb"] for r in runs),
+        "loaded": sorted({m for r in runs for m in r["loaded"]}),
+    }
+
+
+def check(results, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE,
+          time_slack_us=TIME_SLACK_US, gate_time=True, gate_memory=True):
+    """
+    Lista de fallos (texto) de `results` frente a la referencia `baseline`.
+    Las dependencias cargadas siempre cuentan; tiempo y memoria, según
+    `gate_time` / `gate_memory`.
+    """
+    failures = []
+    base = baseline.get("targets", {}) if baseline else {}
+    for target, r in results.items():
+        if r["loaded"]:
+            failures.append(f"{target}: carga al importarse {', '.join(r['loaded'])}")
+        b = base.get(target)
+        if b is None:
+            continue
+        if gate_time and r["import_us"] > b["import_us"] * time_tolerance + time_slack_us:
+            failures.append(f"{target}: import {r['import_us'] / 1e3:.1f} ms > {b['import_us'] / 1e3:.1f} ms "
+                            f"x{time_tolerance} + {time_slack_us / 1e3:.0f} ms")
+        if gate_memory and r["maxrss_kb"] > b["maxrss_kb"] * memory_tolerance:
+            failures.append(f"{target}: memoria {r['maxrss_kb'] / 1024:.1f} MB > {b['maxrss_kb'] / 1024:.1f} MB "
+                            f"x{memory_tolerance}")
+    return failures
+
+
+def run(targets=None, repeat=5):
+    return {t: measure(t, TARGETS.get(t, HEAVY), repeat) for t in (targets or TARGETS)}
+
+
+def _python_minor(version):
+    return ".".join(str(version).split(".")[:2])
+
+
+def save_baseline(results, path=BASELINE_PATH, repeat=None):
+    document = {
+        "created_utc": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "repeat": repeat,
+        "machine": {"python": platform.python_version(), "platform": platform.platform()},
+        "targets": {t: {k: r[k] for k in ("import_us", "maxrss_kb")} for t, r in results.items()},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempo de import y memoria de arranque")
+    parser.add_argument("--target", action="append", choices=sorted(TARGETS), help="Objetivo (repetible)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--record", action="store_true", help="Guardar los resultados como referencia")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE)
+    parser.add_argument("--time-slack-ms", type=float, default=TIME_SLACK_US / 1e3)
+    parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = run(args.target, args.repeat)
+    for target, r in results.items():
+        loaded = f"   carga: {', '.join(r['loaded'])}" if r["loaded"] else ""
+        print(f"{target:<16}import {r['import_us'] / 1e3:8.1f} ms   maxrss {r['maxrss_kb'] / 1024:7.1f} MB{loaded}")
+
+    if args.record:
+        print(f"Referencia guardada en {save_baseline(results, args.baseline, args.repeat)}")
+        return
+    try:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"Sin referencia en {args.baseline}; sólo se comprueban las dependencias cargadas.")
+        baseline = None
+    gate_time = args.repeat >= TIME_GATE_REPEAT
+    gate_memory = True
+    recorded = _python_minor((baseline or {}).get("machine", {}).get("python", ""))
+    if baseline is not None and recorded != _python_minor(platform.python_version()):
+        print(f"La referencia es de Python {recorded} y este es {platform.python_version()}: "
+              "sólo se comprueban las dependencias cargadas.")
+        gate_time = gate_memory = False
+    elif not gate_time:
+        print(f"Tiempo sólo informativo (usa --repeat {TIME_GATE_REPEAT} para comprobarlo).")
+    failures = check(results, baseline, args.time_tolerance, args.memory_tolerance,
+                     args.time_slack_ms * 1e3, gate_time, gate_memory)
+    for failure in failures:
+        print(f"REGRESIÓN  {failure}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
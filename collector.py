@@ -1,10 +1,13 @@
 import os
-import json
 import datetime
-import yfinance as yf
 # Asegúrate de importar la nueva data_pipeline que te di
-from ss91_v3.data_pipeline import fetch_ohlcv, get_all_marginal_factors
-from ss91_v3.utils import upload_to_github, log
+from ss91_v3.data_pipeline import STATE_DIR, fetch_ohlcv, get_all_marginal_factors
+from ss91_v3 import metrics
+from ss91_v3.factor_cache import get_factor_cache
+from ss91_v3.snapshot_store import SnapshotStore, to_json
+from ss91_v3.utils import log, load_fx_config
+# multi_asset, correlation, storage y publisher se importan sólo en los
+# modos que los usan (COLLECT_MODE, OHLCV_CACHE, DEFER_UPLOAD)
 
 RESULTS_DIR = "results/snapshots"
 
@@ -12,32 +15,68 @@ def main():
     os.makedirs(RESULTS_DIR, exist_ok=True)
     today = datetime.date.today().isoformat()
     symbol = os.getenv("SYMBOL", "EURUSD=X")
+    # INCREMENTAL=1 reutiliza el estado de indicadores de la ejecución anterior
+    incremental = os.getenv("INCREMENTAL", "0") == "1"
+    # OHLCV_CACHE=1 sirve las velas desde la caché local (results/ohlcv)
+    store = None
+    if os.getenv("OHLCV_CACHE", "0") == "1":
+        from ss91_v3.storage import OHLCVStore
+        store = OHLCVStore()
+    # COLLECT_MODE=multi procesa todos los activos de fx_config.json
+    multi = os.getenv("COLLECT_MODE", "single") == "multi"
     snapshot_path = os.path.join(RESULTS_DIR, f"{today}.json") # Definido aquí
 
     try:
         log.info(f"Collector starting for {today}")
         
         # Estas funciones ahora vienen de tu nueva data_pipeline
-        df = fetch_ohlcv(symbol, period="1y") 
-        payload = get_all_marginal_factors(df)
+        if multi:
+            from ss91_v3.correlation import correlation_factors
+            from ss91_v3.multi_asset import collect_multi_asset
+            config = load_fx_config()
+            frames, multi_section = collect_multi_asset(config, period="1y")
+            payload = get_all_marginal_factors(frames[config["base_pair"]], symbol=config["base_pair"])
+            # Correlaciones móviles frente al par base como factores marginales;
+            # el estado se guarda en results/state y sólo se suman las velas nuevas
+            payload["marginal_factors"].update(correlation_factors(frames, config["base_pair"],
+                                                                   state_dir=STATE_DIR))
+            payload.update(multi_section)
+        else:
+            df = fetch_ohlcv(symbol, period="1y", incremental=incremental, store=store)
+            payload = get_all_marginal_factors(df, symbol=symbol)
 
+        # Tiempos de esta ejecución (yfinance, pandas_ta, fuentes marginales)
+        payload["timings"] = metrics.run_timings()
+
+        # Serializamos una sola vez (to_json usa default=str para los Timestamp)
+        content = to_json(payload)
         with open(snapshot_path, "w", encoding="utf-8") as f:
-            # Usamos un serializador de pandas si hay objetos Timestamp
-            json.dump(payload, f, indent=2, ensure_ascii=False, default=str)
+            f.write(content)
+
+        # Archivo histórico columnar para consultas por rango
+        SnapshotStore().append(payload)
 
-        upload_to_github(
-            f"snapshots/{today}.json",
-            json.dumps(payload, indent=2, ensure_ascii=False, default=str),
-        )
+        # DEFER_UPLOAD=1: el orquestador publica snapshots y decisiones juntos
+        if os.getenv("DEFER_UPLOAD", "0") != "1":
+            from ss91_v3.publisher import GitHubPublisher
+            publisher = GitHubPublisher()
+            publisher.add(f"snapshots/{today}.json", content)
+            publisher.publish(f"Snapshot {today}")
+            log.info("Snapshot saved successfully to GitHub.")
+        else:
+            log.info("Snapshot saved locally; GitHub upload deferred to the orchestrator (DEFER_UPLOAD=1).")
 
         # --- msg = ... (ELIMINADO) ---
         # --- send_to_ntfy(...) (ELIMINADO) ---
-        
-        log.info("Snapshot saved successfully to GitHub.")
+
+        # Dejamos terminar los refrescos en segundo plano de Trends/FRED
+        get_factor_cache().wait(timeout=30)
         log.info("Collector finished.")
     except Exception as e:
         log.error(f"Collector error: {e}")
         raise
+    finally:
+        metrics.write_prometheus()
 
 if __name__ == "__main__":
     main()
@@ -1,7 +1,8 @@
 import os
 import json
 import datetime
-from ss91_v3.utils import log, upload_to_github
+from ss91_v3 import metrics
+from ss91_v3.utils import log
 from ss91_v3.core import generate_decision # Importará el core del Paso 3
 
 RESULTS_DIR = "results/decisions"
@@ -14,15 +15,20 @@ def run_decitor():
         # Esta función la construiremos en el Paso 3
         # Por ahora, asumimos que falla o no existe
         decision_record, decision_raw, opp_text, context_msg = generate_decision()
+        decision_record["timings"] = metrics.run_timings()
 
+        content = json.dumps(decision_record, indent=2, ensure_ascii=False)
         local_path = os.path.join(RESULTS_DIR, f"{today}.json")
         with open(local_path, "w", encoding="utf-8") as f:
-            json.dump(decision_record, f, indent=2, ensure_ascii=False)
+            f.write(content)
 
-        upload_to_github(
-            f"decisions/{today}.json",
-            json.dumps(decision_record, indent=2, ensure_ascii=False)
-        )
+        # DEFER_UPLOAD=1: el orquestador publica snapshots y decisiones juntos
+        if os.getenv("DEFER_UPLOAD", "0") != "1":
+            # Import diferido: requests sólo se carga si hay que publicar
+            from ss91_v3.publisher import GitHubPublisher
+            publisher = GitHubPublisher()
+            publisher.add(f"decisions/{today}.json", content)
+            publisher.publish(f"Decision {today}")
 
         # --- full_msg = ... (ELIMINADO) ---
         # --- send_to_ntfy(...) (ELIMINADO) ---
@@ -34,6 +40,8 @@ def run_decitor():
         # (Si el 'generate_decision' aún no existe, fallará aquí)
         # raise # Comentado para que no detenga el script si core.py no existe
         log.warning("Skipping decitor logic (core.py likely not implemented).")
+    finally:
+        metrics.write_prometheus()
 
 
 if __name__ == "__main__":
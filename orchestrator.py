@@ -1,19 +1,133 @@
 #!/usr/bin/env python3
 """
-Simple orchestrator to run collector then decitor (for testing).
-In production, cron jobs run them individually.
+Ciclo completo SS91-V3 en un solo proceso.
+
+Etapas (ver ss91_v3/pipeline.py):
+
+    collect ──> indicators ──┐
+                             ├──> snapshot ──> decide ──> publish
+    factors ─────────────────┘
+
+`collect`/`indicators` y `factors` corren en paralelo y los datos pasan en
+memoria entre etapas (sin relanzar Python ni esperar con sleep). Con
+--stage se ejecuta una sola etapa para cron; sus dependencias se leen del
+disco (p.ej. `--stage decide` usa el snapshot de hoy).
+
+    python orchestrator.py
+    python orchestrator.py --stage decide
+    python orchestrator.py --stage snapshot --with-deps
 """
-import time
-import subprocess
+import argparse
+import datetime
+import json
+import os
+from ss91_v3 import metrics
+from ss91_v3.factor_cache import get_factor_cache
+from ss91_v3.pipeline import Pipeline, Stage, report_to_dict
+from ss91_v3.utils import log
+# Cada etapa importa lo suyo (pandas, fuentes, publisher...): `--stage decide`
+# no paga el arranque de las etapas que no ejecuta
+
+SNAPSHOTS_DIR = "results/snapshots"
+DECISIONS_DIR = "results/decisions"
+REPORT_PATH = os.path.join("results", "state", "pipeline_report.json")
+
+
+def build_pipeline(symbol=None, period="1y", today=None, workers=4):
+    symbol = symbol or os.getenv("SYMBOL", "EURUSD=X")
+    today = today or datetime.date.today().isoformat()
+    snapshot_path = os.path.join(SNAPSHOTS_DIR, f"{today}.json")
+    decision_path = os.path.join(DECISIONS_DIR, f"{today}.json")
+
+    def collect():
+        from ss91_v3.data_pipeline import download_ohlcv
+        from ss91_v3.storage import OHLCVStore
+        # OHLCV_CACHE=1 sirve las velas desde la caché local (results/ohlcv)
+        download = OHLCVStore().get if os.getenv("OHLCV_CACHE", "0") == "1" else download_ohlcv
+        df = download(symbol, interval="1d", period=period)
+        if df.empty:
+            raise ValueError("No se pudieron obtener datos de yfinance.")
+        return df
+
+    def indicators(collect):
+        from ss91_v3.data_pipeline import compute_indicators
+        return compute_indicators(collect)
+
+    def factors():
+        from ss91_v3.data_pipeline import api_keys_from_env
+        from ss91_v3.factor_registry import requested_fields
+        from ss91_v3.factors import collect_marginal_factors
+        return collect_marginal_factors(api_keys_from_env(), fields=requested_fields())
+
+    def snapshot(indicators, factors):
+        from ss91_v3.data_pipeline import build_payload
+        from ss91_v3.snapshot_store import SnapshotStore, to_json
+        payload = build_payload(indicators, *factors, symbol=symbol)
+        payload["timings"] = metrics.run_timings()
+        os.makedirs(SNAPSHOTS_DIR, exist_ok=True)
+        with open(snapshot_path, "w", encoding="utf-8") as f:
+            f.write(to_json(payload))
+        SnapshotStore().append(payload)
+        return payload
+
+    def load_snapshot():
+        from ss91_v3.core import load_snapshot
+        return load_snapshot(today)
+
+    def decide(snapshot):
+        # Import diferido: sólo las corridas que deciden cargan core/Sherloock
+        from ss91_v3.core import generate_decision
+        decision_record = generate_decision(snapshot)[0]
+        decision_record["timings"] = metrics.run_timings()
+        os.makedirs(DECISIONS_DIR, exist_ok=True)
+        with open(decision_path, "w", encoding="utf-8") as f:
+            json.dump(decision_record, f, indent=2, ensure_ascii=False)
+        return decision_record
+
+    def load_decision():
+        with open(decision_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def publish(snapshot, decide):
+        from ss91_v3.publisher import GitHubPublisher
+        from ss91_v3.snapshot_store import to_json
+        publisher = GitHubPublisher()
+        publisher.add(f"snapshots/{today}.json", to_json(snapshot))
+        publisher.add(f"decisions/{today}.json", json.dumps(decide, indent=2, ensure_ascii=False))
+        return publisher.publish(f"Daily cycle {today}")
+
+    return Pipeline([
+        Stage("collect", collect, retries=2),
+        Stage("indicators", indicators, deps=("collect",)),
+        Stage("factors", factors),
+        Stage("snapshot", snapshot, deps=("indicators", "factors"), load=load_snapshot),
+        Stage("decide", decide, deps=("snapshot",), load=load_decision),
+        Stage("publish", publish, deps=("snapshot", "decide"), retries=2),
+    ], workers=workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ciclo SS91-V3 en proceso")
+    parser.add_argument("--stage", action="append", help="Ejecutar sólo esta etapa (repetible)")
+    parser.add_argument("--with-deps", action="store_true", help="Con --stage, ejecutar también sus dependencias")
+    args = parser.parse_args(argv)
+
+    pipeline = build_pipeline()
+    _, report = pipeline.run(targets=args.stage, with_deps=args.with_deps or not args.stage)
+    summary = report_to_dict(report)
+
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    metrics.write_prometheus()
+    # Dejamos terminar los refrescos en segundo plano de Trends/FRED
+    get_factor_cache().wait(timeout=30)
 
-def run_collector():
-    subprocess.run(["python","collector.py"])
+    failed = [name for name, r in summary.items() if r["status"] in ("failed", "skipped")]
+    if failed:
+        log.error(f"Etapas con error: {failed}")
+        raise SystemExit(1)
 
-def run_decitor():
-    subprocess.run(["python","decitor.py"])
 
-if __name__=="__main__":
-    run_collector()
-    # wait a couple seconds (simulate)
-    time.sleep(2)
-    run_decitor()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Motor de backtest vectorizado.
+
+Toma el DataFrame de indicadores de `fetch_ohlcv` UNA sola vez y evalúa las
+reglas de `core.generate_decision` (Pánico / Euforia / Rango) como máscaras
+NumPy sobre todo el histórico. Señales, posiciones y PnL salen en una sola
+pasada, sin bucles por fila ni llamadas a APIs externas.
+"""
+import numpy as np
+import pandas as pd
+from ss91_v3.strategy import evaluate_rules, rule_signals
+from ss91_v3.fibonacci import rolling_max, rolling_min
+
+# Ventana por defecto del ratio Fibonacci: ~1 año de velas diarias
+# (core.py usa el máximo/mínimo "1A" del snapshot).
+DEFAULT_FIBO_LOOKBACK = 252
+
+
+def fibo_position_ratio(high, low, close, lookback=DEFAULT_FIBO_LOOKBACK):
+    """
+    Ratio de posición Fibonacci punto-a-punto: (close - low) / (high - low)
+    usando el máximo/mínimo de las últimas `lookback` velas (sin mirar al
+    futuro). Igual que compute_fibonacci_levels, un rango nulo da 0.5.
+    """
+    close = np.asarray(close, dtype=float)
+    # O(n) sea cual sea `lookback` (ver fibonacci.py)
+    hh = rolling_max(high, lookback)
+    ll = rolling_min(low, lookback)
+    span = hh - ll
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(span == 0, 0.5, (close - ll) / span)
+    return ratio
+
+
+def positions_from_signals(signals, sticky=True):
+    """
+    Posición resultante de cada vela.
+
+    - sticky=True: se entra con la señal y se mantiene hasta una señal contraria.
+    - sticky=False: sólo se está en mercado en las velas con señal.
+    """
+    signals = np.asarray(signals, dtype=np.int8)
+    if not sticky:
+        return signals.copy()
+    # Forward-fill vectorizado de la última señal distinta de HOLD
+    idx = np.where(signals != 0, np.arange(signals.size), 0)
+    np.maximum.accumulate(idx, out=idx)
+    positions = signals[idx]
+    return positions
+
+
+def simple_returns(close):
+    """Retorno simple de cada vela respecto a la anterior (0 en la primera)."""
+    close = np.asarray(close, dtype=float)
+    returns = np.zeros_like(close)
+    returns[1:] = close[1:] / close[:-1] - 1.0
+    return returns
+
+
+def pnl_from_positions(returns, positions, cost=0.0):
+    """PnL por vela: la posición de t-1 cobra el retorno de t, menos costes de cambio."""
+    held = np.zeros_like(returns)
+    held[1:] = positions[:-1]
+    turnover = np.abs(np.diff(positions, prepend=0).astype(float))
+    return held * returns - cost * turnover
+
+
+def run_vectorized_backtest(df, sentiment=0.5, gtrends_crisis=0.0, thresholds=None,
+                            fibo_lookback=DEFAULT_FIBO_LOOKBACK, sticky=True, cost=0.0,
+                            rsi_col="RSI_14"):
+    """
+    Backtest de todo el histórico en una sola pasada.
+
+    `sentiment` y `gtrends_crisis` pueden ser escalares o arrays alineados con
+    `df` (por defecto los mismos valores neutros que usa core.py). La posición
+    decidida al cierre de la vela t se aplica al retorno de t+1, así que no hay
+    sesgo de anticipación. `cost` es el coste por unidad de cambio de posición.
+
+    Devuelve un DataFrame con: close, rsi, fibo_ratio, signal, position,
+    returns, pnl y equity.
+    """
+    close = df["close"].to_numpy(dtype=float)
+    rsi = df[rsi_col].to_numpy(dtype=float)
+    fibo_ratio = fibo_position_ratio(df["high"], df["low"], close, fibo_lookback)
+
+    panic, euphoria = evaluate_rules(rsi, fibo_ratio, sentiment, gtrends_crisis, thresholds)
+    signals = rule_signals(np.broadcast_to(panic, close.shape), np.broadcast_to(euphoria, close.shape))
+    positions = positions_from_signals(signals, sticky=sticky)
+
+    returns = simple_returns(close)
+    pnl = pnl_from_positions(returns, positions, cost)
+    equity = np.cumprod(1.0 + pnl)
+
+    index = df["date"] if "date" in df.columns else df.index
+    return pd.DataFrame({
+        "close": close,
+        "rsi": rsi,
+        "fibo_ratio": fibo_ratio,
+        "signal": signals,
+        "position": positions,
+        "returns": returns,
+        "pnl": pnl,
+        "equity": equity,
+    }, index=pd.Index(index, name="date"))
+
+
+def summarize(result, periods_per_year=252):
+    """Métricas básicas de un resultado de run_vectorized_backtest."""
+    return summarize_arrays(
+        result["pnl"].to_numpy(dtype=float),
+        result["position"].to_numpy(),
+        result["signal"].to_numpy(),
+        periods_per_year,
+    )
+
+
+def summarize_arrays(pnl, positions, signals, periods_per_year=252):
+    """Las métricas de `summarize` directamente sobre arrays (sin DataFrame)."""
+    equity = np.cumprod(1.0 + pnl)
+    # PnL de las velas en las que había posición abierta (posición de t-1)
+    active = pnl[1:][positions[:-1] != 0]
+    std = pnl.std() if pnl.size else 0.0
+    peak = np.maximum.accumulate(equity) if equity.size else equity
+    return {
+        "total_return": float(equity[-1] - 1.0) if equity.size else 0.0,
+        "sharpe": float(pnl.mean() / std * np.sqrt(periods_per_year)) if std > 0 else 0.0,
+        "max_drawdown": float((equity / peak - 1.0).min()) if equity.size else 0.0,
+        "n_signals": int(np.count_nonzero(signals)),
+        "hit_rate": float((active > 0).mean()) if active.size else 0.0,
+    }
@@ -1,21 +1,55 @@
 """
-Simple backtest stub: iterate historical snapshots and compute decisions.
-Use for initial validation before full vectorbt/backtrader integration.
+Simple backtest entry point: fetch the indicator frame once and run the
+vectorized engine in ss91_v3.backtest over the whole history.
+
+With `factor_history` (a FactorHistory), sentiment and Google Trends are
+joined point-in-time from the recorded values instead of the neutral
+defaults, without touching the network. `require_factors=True` refuses
+to run without recorded factors (sweeps and robustness reports need them).
 """
 import pandas as pd
-from ss91_v3.data_pipeline import fetch_ohlcv, get_all_marginal_factors
-from ss91_v3.core import SS91Core
+from ss91_v3.data_pipeline import fetch_ohlcv
+from ss91_v3.backtest import run_vectorized_backtest
+from ss91_v3.factor_history import join_factors
+from ss91_v3.factors import DEFAULT_FACTORS
+from ss91_v3.fibonacci import fibo_lookback_from_config
+from ss91_v3.utils import log
+
+# Factors the strategy rules read, with the neutral value used when missing
+STRATEGY_FACTORS = {
+    "reddit_vader_avg": DEFAULT_FACTORS["sentiment"]["reddit_vader_avg"],
+    "gtrends_recession": DEFAULT_FACTORS["interest"]["gtrends_recession"],
+}
+
+
+def join_strategy_factors(df, factor_history, require=False):
+    """
+    Join sentiment and Trends point-in-time onto the bar frame `df`.
+
+    With require=True a ValueError is raised when the history has never
+    recorded one of them: with the neutral defaults no rule can fire, so a
+    backtest, sweep or robustness run would only measure zeros.
+    """
+    recorded = {c for source in factor_history.sources for c in factor_history.columns(source)}
+    missing = [c for c in STRATEGY_FACTORS if c not in recorded]
+    if missing and require:
+        raise ValueError(f"No recorded history for {missing} in {factor_history.root}. "
+                         "Record it first with SS91_FACTOR_MODE=record.")
+    df = join_factors(df, factor_history, columns=list(STRATEGY_FACTORS), defaults=STRATEGY_FACTORS)
+    if not missing:
+        covered = factor_history.asof(pd.DatetimeIndex(df["date"] if "date" in df.columns else df.index),
+                                      columns=list(STRATEGY_FACTORS)).notna().all(axis=1).mean()
+        log.info(f"Recorded factors cover {covered:.0%} of the bars; the rest use the neutral defaults.")
+    return df
+
 
-def run_backtest(symbol='EURUSD=X'):
-    df = fetch_ohlcv(symbol, period='1y')
-    core = SS91Core()
-    results = []
-    for date in df.index[60:]:
-        factors = get_all_marginal_factors(date.strftime('%Y-%m-%d'), df)
-        price = float(df.loc[date,'Close'])
-        atr = float(df.loc[date,'ATRr_14'])
-        atr_ma = float(df.loc[date,'ATR_MA_20'])
-        dec = core.decide(factors, price, atr, atr_ma)
-        dec['date'] = str(date.date())
-        results.append(dec)
-    return pd.DataFrame(results)
+def run_backtest(symbol='EURUSD=X', period='1y', interval='1d', store=None, factor_history=None,
+                 require_factors=False, **kwargs):
+    # Fibonacci window: indicators.lookback_period_days in fx_config.json
+    kwargs.setdefault("fibo_lookback", fibo_lookback_from_config())
+    df = fetch_ohlcv(symbol, period=period, interval=interval, store=store)
+    if factor_history is not None:
+        df = join_strategy_factors(df, factor_history, require=require_factors)
+        kwargs.setdefault("sentiment", df["reddit_vader_avg"].to_numpy())
+        kwargs.setdefault("gtrends_crisis", df["gtrends_recession"].to_numpy())
+    return run_vectorized_backtest(df, **kwargs)
@@ -0,0 +1,146 @@
+"""
+Indicadores por bloques sobre históricos que no caben en memoria.
+
+`fetch_ohlcv` carga todo el histórico en un DataFrame y `ffill().bfill()`
+hace copias completas. Aquí las velas se leen de la caché columnar
+(storage.ColumnarTable, archivos memory-mapped) en bloques de
+`chunk_size` filas; cada bloque avanza el mismo `IndicatorState` que el
+modo incremental (el estado de calentamiento cruza la frontera entre
+bloques) y se añade a otra ColumnarTable con las columnas de
+INDICATOR_COLUMNS. La memoria pico depende de `chunk_size`, no del
+tamaño del histórico.
+
+Detalles que reproducen el resultado de `fetch_ohlcv`:
+
+- DPO mira `t` velas al futuro: las últimas `t` filas de cada bloque se
+  retienen hasta que el bloque siguiente completa su valor.
+- ffill arrastra el último valor válido de cada columna entre bloques; el
+  bfill sólo afecta a las filas de calentamiento del principio, que se
+  parchean en el sitio al terminar.
+
+    python -m ss91_v3.chunked --symbol EURUSD=X --interval 1m --chunk-size 200000
+"""
+import argparse
+import os
+import time
+import numpy as np
+from ss91_v3.indicators import DPO_COLUMN, INDICATOR_COLUMNS, IndicatorState
+from ss91_v3.storage import ColumnarTable, OHLCVStore, _safe_name
+from ss91_v3.utils import log
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def indicator_table(store, symbol, interval="1d"):
+    """Tabla de indicadores junto a la caché de velas: <root>/<símbolo>/<intervalo>_indicators."""
+    return ColumnarTable(os.path.join(store.root, _safe_name(symbol), f"{_safe_name(interval)}_indicators"))
+
+
+def _ffill(block, last_valid):
+    """ffill por columnas de `block` empezando con `last_valid` (NaN = sin valor previo)."""
+    rows = np.arange(len(block))[:, None]
+    idx = np.where(np.isnan(block), -1, rows)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    filled = np.take_along_axis(block, np.maximum(idx, 0), axis=0)
+    return np.where(idx >= 0, filled, last_valid)
+
+
+class _Writer:
+    """Añade filas a la tabla destino aplicando el ffill entre bloques."""
+
+    def __init__(self, source, output, fill):
+        self.source = source
+        self.output = output
+        self.fill = fill
+        self.written = 0
+        self.last_valid = np.full(len(INDICATOR_COLUMNS), np.nan)
+        self.first_valid = np.full(len(INDICATOR_COLUMNS), -1)
+
+    def write(self, block):
+        if not len(block):
+            return
+        i0 = self.written
+        valid = ~np.isnan(block)
+        seen = valid.any(axis=0) & (self.first_valid < 0)
+        self.first_valid[seen] = i0 + valid[:, seen].argmax(axis=0)
+        if self.fill:
+            block = _ffill(block, self.last_valid)
+            self.last_valid = block[-1]
+        self.output.append(self.source.timestamps(i0, i0 + len(block)),
+                           {c: block[:, j] for j, c in enumerate(INDICATOR_COLUMNS)})
+        self.written += len(block)
+
+    def backfill(self):
+        """bfill: las filas anteriores al primer valor válido toman ese valor."""
+        for j, column in enumerate(INDICATOR_COLUMNS):
+            first = int(self.first_valid[j])
+            if first > 0:
+                value = self.output.column(column, first, first + 1)[0]
+                self.output.write_rows(column, 0, np.full(first, value))
+
+
+def compute_indicators_chunked(source, output, chunk_size=DEFAULT_CHUNK_SIZE, fill=True):
+    """
+    Calcula INDICATOR_COLUMNS para todas las velas de `source` (ColumnarTable
+    con high/low/close) y las escribe en `output` (se vacía antes), con el
+    mismo índice temporal. Con fill=True el resultado es el de
+    compute_indicators (ffill + bfill). Devuelve el número de filas.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size debe ser >= 1")
+    output.clear()
+    n = len(source)
+    state = IndicatorState()
+    writer = _Writer(source, output, fill)
+    hold = state.dpo.t
+    pending = np.empty((0, len(INDICATOR_COLUMNS)))
+    start = time.perf_counter()
+
+    for i0 in range(0, n, chunk_size):
+        i1 = min(n, i0 + chunk_size)
+        # Un memmap por bloque: las páginas leídas se liberan con él
+        values, revisions = state.advance(source.column("high", i0, i1), source.column("low", i0, i1),
+                                          source.column("close", i0, i1))
+        block = np.vstack([pending, values])
+        block_start = i0 - len(pending)
+        for pos, value in revisions:
+            block[pos - block_start, DPO_COLUMN] = value
+        # Las últimas `hold` filas aún pueden recibir su DPO
+        keep = len(block) if i1 == n else max(0, len(block) - hold)
+        writer.write(block[:keep])
+        pending = block[keep:]
+        log.info(f"[chunked] {i1}/{n} velas")
+
+    writer.write(pending)
+    if fill:
+        writer.backfill()
+    log.info(f"[chunked] {n} velas en {time.perf_counter() - start:.1f}s (bloques de {chunk_size}).")
+    return writer.written
+
+
+def read_with_indicators(source, output, start=None, end=None, columns=None):
+    """DataFrame de velas + indicadores en el rango dado (como fetch_ohlcv)."""
+    bars = source.read(columns=columns, start=start, end=end)
+    indicators = output.read(start=start, end=end)
+    return bars.join(indicators)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indicadores por bloques sobre la caché OHLCV")
+    parser.add_argument("--symbol", default="EURUSD=X")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--no-fill", action="store_true", help="No rellenar NaN (ffill/bfill)")
+    args = parser.parse_args(argv)
+
+    store = OHLCVStore()
+    source = store.table(args.symbol, args.interval)
+    if not len(source):
+        raise SystemExit(f"Sin velas en caché para {args.symbol} ({args.interval}). Ejecuta antes OHLCVStore.update.")
+    output = indicator_table(store, args.symbol, args.interval)
+    rows = compute_indicators_chunked(source, output, args.chunk_size, fill=not args.no_fill)
+    print(f"{rows} filas -> {output.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,95 +2,113 @@ import os
 import json
 import datetime
 import re
+import string
 from ss91_v3.utils import log
-from sherloock import Sherloock  # Importa tu IA desde el paquete instalado
-
-# Instanciamos el motor de razonamiento UNA SOLA VEZ.
-# (sherloock cargará sus modelos internos aquí)
-try:
-    SHERLOOCK_ENGINE = Sherloock()
-    log.info("Motor de razonamiento Sherloock inicializado.")
-except Exception as e:
-    log.error(f"Error fatal: No se pudo inicializar Sherloock. {e}")
-    # Si Sherloock no carga, creamos una instancia 'None'
-    SHERLOOCK_ENGINE = None
-
-def generate_decision():
+from ss91_v3 import metrics
+from ss91_v3.strategy import RANGE_CONTEXT, SNAPSHOT_FIELDS, CompiledRules, load_rules, load_thresholds
+# Sherloock se construye de forma diferida en engine.py (no al importar)
+from ss91_v3 import engine
+
+def load_snapshot(day=None):
     """
-    Esta es la función principal del "Traductor".
-    1. Lee los datos del snapshot.
-    2. Aplica la lógica de "El Santo Grial".
-    3. Formula un comando para Sherloock.
-    4. Interpreta la respuesta de Sherloock.
+    Snapshot del día `day` (por defecto hoy): primero el JSON de
+    results/snapshots y, si no existe, el archivo histórico columnar.
     """
-    log.info("Iniciando el 'Traductor Estratégico' (core.py)...")
-    
-    if SHERLOOCK_ENGINE is None:
-        log.error("Sherloock no está disponible. Abortando decisión.")
-        raise ImportError("El motor Sherloock no pudo ser inicializado.")
-
-    # 1. LEER LOS DATOS DEL SNAPSHOT
-    # (El .yml del Paso 2 asegura que este archivo exista)
-    today = datetime.date.today().isoformat()
-    snapshot_path = os.path.join("results", "snapshots", f"{today}.json")
+    day = day or datetime.date.today().isoformat()
+    snapshot_path = os.path.join("results", "snapshots", f"{day}.json")
     
     try:
         with open(snapshot_path, "r") as f:
             data = json.load(f)
             log.info(f"Snapshot '{snapshot_path}' cargado exitosamente.")
+            return data
     except FileNotFoundError:
+        # Import diferido: el archivo histórico (pandas) sólo hace falta sin JSON
+        from ss91_v3.snapshot_store import SnapshotStore
+        data = SnapshotStore().latest(on=day)
+        if data is not None:
+            log.info(f"Snapshot del {day} cargado desde el archivo histórico.")
+            return data
         log.error(f"Error Crítico: No se encontró el snapshot '{snapshot_path}'.")
         raise
     except json.JSONDecodeError:
         log.error(f"Error Crítico: El snapshot '{snapshot_path}' está corrupto.")
         raise
 
+def _compile_rules(rules, thresholds):
+    """`rules` ya compiladas tal cual; si no, se compilan (por defecto con fx_config.json)."""
+    if isinstance(rules, CompiledRules):
+        return rules
+    return CompiledRules(rules if rules is not None else load_rules(),
+                         thresholds if thresholds is not None else load_thresholds())
+
+
+@metrics.timed("generate_decision")
+def generate_decision(data=None, thresholds=None, rules=None):
+    """
+    Esta es la función principal del "Traductor".
+    1. Lee los datos del snapshot (o usa `data` si se le pasa ya cargado).
+    2. Aplica la lógica de "El Santo Grial" (reglas de strategy.py; `rules`
+       por defecto las de fx_config.json). Con `rules` ya compiladas
+       (CompiledRules, como hace streaming) no se relee fx_config.json en
+       cada llamada y `thresholds` se ignora.
+    3. Formula un comando para Sherloock.
+    4. Interpreta la respuesta de Sherloock.
+    """
+    log.info("Iniciando el 'Traductor Estratégico' (core.py)...")
+
+    # 1. LEER LOS DATOS DEL SNAPSHOT
+    # (El .yml del Paso 2 asegura que este archivo exista)
+    if data is None:
+        data = load_snapshot()
+
     # 2. EXTRAER LOS FACTORES (Gasolina)
     # Extraemos los datos de forma segura usando .get()
     ohlc = data.get('ohlc_latest', {})
     fibo = data.get('fibonacci', {})
-    marginals = data.get('marginal_factors', {})
 
-    # Factores clave para la estrategia
-    rsi = ohlc.get('RSI_14', 50.0)
-    fibo_ratio = fibo.get('position_ratio', 0.5) # 0.0=Mínimo 1A, 1.0=Máximo 1A
-    sentimiento = marginals.get('reddit_vader_avg', 0.5) # 0.0=Pánico, 1.0=Euforia
-    gtrends_crisis = marginals.get('gtrends_recession', 0.0)
-    
+    # Factores clave para la estrategia (sección, clave y valor por defecto en SNAPSHOT_FIELDS)
+    values = {field: data.get(section, {}).get(key, default)
+              for field, (section, key, default) in SNAPSHOT_FIELDS.items()}
+    rsi = values["rsi"]
+    fibo_ratio = values["fibo_ratio"]  # 0.0=Mínimo 1A, 1.0=Máximo 1A
+    sentimiento = values["sentiment"]  # 0.0=Pánico, 1.0=Euforia
+    gtrends_crisis = values["gtrends_crisis"]
+
     # Este 'recent_prices' lo añadiremos en el Paso 3.B
     precios_recientes = ohlc.get('recent_prices', [ohlc.get('close', 1.05)])
     soporte_fibo = fibo.get('low_1y', 1.0) # El soporte más fuerte
 
     # 3. APLICAR LA ESTRATEGIA (Formular el Comando)
-    comando_para_sherloock = ""
-    context_msg = "Evaluando..."
     decision_raw = "HOLD" # Por defecto
     opp_text = "Sin ejecución de Sherloock."
 
-    # --- Estrategia 1: Pánico y Sobreventa Extrema ---
-    if rsi < 30 and fibo_ratio < 0.2 and sentimiento < 0.35 and gtrends_crisis > 0.5:
-        context_msg = f"Pánico Detectado (RSI:{rsi:.0f}, Fibo:{fibo_ratio:.2f}, Sent:{sentimiento:.2f}). Optimizando entrada (PuLP)."
-        # Usamos el optimizador PuLP de Sherloock para encontrar la mejor entrada
-        # por encima del soporte del último año.
-        comando_para_sherloock = f"forecast {precios_recientes} with_limit {soporte_fibo}"
-
-    # --- Estrategia 2: Euforia y Sobrecompra Extrema ---
-    elif rsi > 70 and fibo_ratio > 0.8 and sentimiento > 0.8:
-        context_msg = f"Euforia Detectada (RSI:{rsi:.0f}, Fibo:{fibo_ratio:.2f}, Sent:{sentimiento:.2f}). Verificando restricción (Z3)."
-        # Usamos el motor lógico Z3 de Sherloock para verificar una "Crisis de Credibilidad"
-        # (Este es un ejemplo, puedes refinar la lógica de Z3)
-        comando_para_sherloock = "solve parallel euforia_check where x > 100"
-
-    # --- Estrategia 3: Mercado en Rango ---
+    # Las reglas viven en strategy.py como datos (las comparte el backtest
+    # vectorizado); reglas y umbrales salen de fx_config.json
+    compiled = _compile_rules(rules, thresholds)
+    fired = int(compiled.fire(values))
+    template = {**values, "recent_prices": precios_recientes, "low_1y": soporte_fibo,
+                "close": ohlc.get('close', 1.05)}
+    if fired >= 0:
+        rule = compiled.rules[fired]
+        context_msg = rule.get("context", rule["name"]).format(**template)
+        comando_para_sherloock = rule.get("command", "").format(**template)
     else:
-        context_msg = f"Mercado en Rango (RSI:{rsi:.0f}, Fibo:{fibo_ratio:.2f}). Sin señal."
-        decision_raw = "HOLD"
+        # --- Mercado en Rango ---
+        context_msg = RANGE_CONTEXT.format(**template)
+        comando_para_sherloock = ""
 
     # 4. LLAMAR A SHERLOOCK (El Motor)
+    # Sherloock se carga aquí, sólo si hay comando (o se usa el worker)
+    if comando_para_sherloock and not engine.is_available():
+        log.error("Sherloock no está disponible. Abortando decisión.")
+        raise ImportError("El motor Sherloock no pudo ser inicializado.")
+
     if comando_para_sherloock:
         log.info(f"Ejecutando comando para Sherloock: {comando_para_sherloock}")
         try:
-            respuesta_sherloock = SHERLOOCK_ENGINE.reason(comando_para_sherloock)
+            with metrics.span("sherloock_reason"):
+                respuesta_sherloock = engine.reason(comando_para_sherloock)
             log.info(f"Respuesta de Sherloock: {respuesta_sherloock}")
             
             # 5. INTERPRETAR RESPUESTA
@@ -105,7 +123,7 @@ def generate_decision():
 
     # 6. FORMATEAR SALIDA
     decision_record = {
-        "symbol": "EURUSD=X",
+        "symbol": data.get("symbol", "EURUSD=X"),
         "timestamp_utc": str(datetime.datetime.utcnow()),
         "decision": decision_raw,
         "context": context_msg,
@@ -120,6 +138,126 @@ def generate_decision():
     
     return decision_record, decision_raw, opp_text, context_msg
 
+def snapshot_table(snapshots):
+    """
+    Tabla (DataFrame) de snapshots con el formato de build_payload: una
+    fila por snapshot con symbol, snapshot_time_utc, los campos de regla,
+    close, low_1y y recent_prices.
+    """
+    import pandas as pd
+    rows = []
+    for data in snapshots:
+        ohlc = data.get("ohlc_latest", {})
+        row = {"symbol": data.get("symbol", "EURUSD=X"), "snapshot_time_utc": data.get("snapshot_time_utc")}
+        for field, (section, key, default) in SNAPSHOT_FIELDS.items():
+            row[field] = data.get(section, {}).get(key, default)
+        row["close"] = ohlc.get("close", 1.05)
+        row["low_1y"] = data.get("fibonacci", {}).get("low_1y", 1.0)
+        row["recent_prices"] = ohlc.get("recent_prices", [row["close"]])
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def _table_column(table, names, default):
+    """Primera columna de `names` presente en `table` (NaN -> default), o `default`."""
+    import numpy as np
+    import pandas as pd
+    for name in names:
+        if name in table.columns:
+            return pd.to_numeric(table[name], errors="coerce").fillna(default).to_numpy(dtype=float)
+    return np.full(len(table), float(default))
+
+
+@metrics.timed("generate_decisions")
+def generate_decisions(table, thresholds=None, rules=None):
+    """
+    Decisiones para muchos símbolos y velas en una sola llamada.
+
+    `table` es un DataFrame con los campos de regla (por nombre, p.ej. de
+    snapshot_table, o aplanados como los de SnapshotStore.query:
+    "ohlc_latest.RSI_14"...). Las tablas aplanadas no tienen recent_prices:
+    si una regla disparada lo usa en su comando se lanza ValueError (para
+    el archivo histórico, snapshot_table(store.records(...))). Las reglas se evalúan como predicados
+    vectorizados sobre toda la tabla; sólo las filas que disparan una regla
+    pasan a Sherloock, con los comandos deduplicados y enviados en lote
+    (engine.reason_many).
+
+    Devuelve un DataFrame alineado con `table`: symbol, snapshot_time_utc,
+    campos de regla, rule ("range" si ninguna), decision, command y
+    sherloock_output.
+    """
+    import numpy as np
+    import pandas as pd
+
+    compiled = _compile_rules(rules, thresholds)
+    n = len(table)
+    columns = {field: _table_column(table, (field, f"{section}.{key}"), default)
+               for field, (section, key, default) in SNAPSHOT_FIELDS.items()}
+    fired = compiled.fire(columns) if n else np.zeros(0, dtype=int)
+
+    out = pd.DataFrame({
+        "symbol": table["symbol"].to_numpy() if "symbol" in table.columns else np.full(n, "EURUSD=X"),
+        "snapshot_time_utc": table["snapshot_time_utc"].to_numpy() if "snapshot_time_utc" in table.columns
+        else table.index.to_numpy(),
+        **columns,
+    })
+    # fired == -1 toma el último nombre: "range"
+    out["rule"] = np.array([r["name"] for r in compiled.rules] + ["range"], dtype=object)[fired]
+    out["decision"] = "HOLD"
+    out["command"] = ""
+    out["sherloock_output"] = "Sin ejecución de Sherloock."
+
+    rows = np.flatnonzero(fired >= 0)
+    log.info(f"[DECISIONES] {n} filas evaluadas; {rows.size} disparan una regla.")
+    if not rows.size:
+        return out
+    if not engine.is_available():
+        log.error("Sherloock no está disponible. Abortando decisiones.")
+        raise ImportError("El motor Sherloock no pudo ser inicializado.")
+
+    if "recent_prices" not in table.columns:
+        # Las columnas aplanadas no guardan listas: sin recent_prices el comando
+        # no sería el mismo que el de generate_decision para ese snapshot
+        used = {name for r in set(fired[rows]) for _, name, _, _ in
+                string.Formatter().parse(compiled.rules[r].get("command", "")) if name}
+        if "recent_prices" in used:
+            raise ValueError("La tabla no tiene 'recent_prices' y las reglas disparadas lo usan. "
+                             "Usa snapshot_table(SnapshotStore.records(...)).")
+    close = _table_column(table, ("close", "ohlc_latest.close"), 1.05)
+    low_1y = _table_column(table, ("low_1y", "fibonacci.low_1y"), 1.0)
+    recent = table["recent_prices"].to_numpy() if "recent_prices" in table.columns else None
+    # Sólo las filas con señal: el coste en Python escala con las señales, no con la tabla
+    commands = []
+    for i in rows:
+        rule = compiled.rules[fired[i]]
+        template = {field: float(columns[field][i]) for field in columns}
+        template.update(close=float(close[i]), low_1y=float(low_1y[i]),
+                        recent_prices=list(recent[i]) if recent is not None else None)
+        commands.append(rule.get("command", "").format(**template))
+
+    with metrics.span("sherloock_reason"):
+        answers = engine.reason_many([c for c in commands if c])
+    metrics.inc("ss91_decision_signals_total", value=len(commands))
+    metrics.inc("ss91_sherloock_commands_total", value=len(answers))
+    decisions, outputs = [], []
+    for i, command in zip(rows, commands):
+        answer = answers.get(command)
+        if isinstance(answer, Exception):
+            log.error(f"Sherloock.reason() falló para {out.at[i, 'symbol']}: {answer}")
+            decision, text = "HOLD", str(answer)
+        elif answer is None:
+            decision, text = "HOLD", "Regla sin comando para Sherloock."
+        else:
+            decision, text = interpretar_respuesta_sherloock(answer, close[i])
+        decisions.append(decision)
+        outputs.append(text)
+    out.loc[rows, "decision"] = decisions
+    out.loc[rows, "command"] = commands
+    out.loc[rows, "sherloock_output"] = outputs
+    return out
+
+
+@metrics.timed("interpretar_respuesta_sherloock")
 def interpretar_respuesta_sherloock(respuesta: str, precio_actual: float) -> tuple[str, str]:
     """
     Traduce la respuesta de texto de Sherloock a una decisión de trading.
@@ -0,0 +1,214 @@
+"""
+Correlaciones móviles entre el par base y los activos relacionados.
+
+Dos caminos con el mismo resultado:
+
+- `rolling_correlation`: histórico completo vectorizado (para backtests).
+  Sumas prefijo de los retornos y de sus productos cruzados; cada ventana
+  sale de una resta, O(n · activos²) independientemente de `window`.
+- `RollingCorrelation`: vela a vela. Mantiene las sumas y los productos
+  cruzados de la ventana y al llegar un retorno suma el nuevo y resta el
+  que sale, O(activos²) por vela. Cada `resync_every` velas recalcula las
+  sumas desde la ventana para que no se acumule error de redondeo.
+
+`correlation_factors` produce las claves `corr_<activo>` (-1..1) que van a
+la sección `marginal_factors` del snapshot. Con `state_dir` guarda el
+estado de `RollingCorrelation` (JSON, junto al de los indicadores) y en
+la siguiente ejecución sólo le pasa las velas nuevas.
+"""
+import copy
+import json
+import os
+import re
+from collections import deque
+import numpy as np
+import pandas as pd
+
+DEFAULT_CORR_WINDOW = 60
+
+
+def factor_key(symbol):
+    """'GBPUSD=X' -> 'gbpusd', '^DAX' -> 'dax' (nombres de factor)."""
+    return re.sub(r"[^a-z0-9]", "", symbol.lower().removesuffix("=x"))
+
+
+def _corr_from_moments(count, sums, cross):
+    """Matriz de correlación a partir de n, Σx (k) y Σxxᵀ (k×k); broadcasting sobre ejes previos."""
+    mean = sums / count[..., None]
+    cov = cross / count[..., None, None] - mean[..., :, None] * mean[..., None, :]
+    var = np.clip(np.diagonal(cov, axis1=-2, axis2=-1), 0.0, None)
+    std = np.sqrt(var)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / (std[..., :, None] * std[..., None, :])
+    corr = np.clip(corr, -1.0, 1.0)
+    # Varianza nula (precio plano) -> sin correlación definida
+    flat = std <= 1e-12 * np.maximum(1.0, np.abs(mean))
+    corr[flat[..., :, None] | flat[..., None, :]] = np.nan
+    return corr
+
+
+def rolling_correlation(returns, window=DEFAULT_CORR_WINDOW, min_periods=None):
+    """
+    Correlaciones móviles de `returns` (array n×k sin NaN). Devuelve un
+    array (n, k, k); las filas con menos de `min_periods` observaciones
+    (por defecto `window`) son NaN, como pandas rolling().corr().
+    """
+    x = np.asarray(returns, dtype=float)
+    n, k = x.shape
+    min_periods = window if min_periods is None else min_periods
+    out = np.full((n, k, k), np.nan)
+    if n == 0:
+        return out
+    # Centrar reduce la cancelación al restar sumas prefijo grandes
+    x = x - x.mean(axis=0)
+    zero = np.zeros((1, k))
+    sums = np.concatenate([zero, np.cumsum(x, axis=0)])
+    cross = np.concatenate([np.zeros((1, k, k)), np.cumsum(x[:, :, None] * x[:, None, :], axis=0)])
+    end = np.arange(1, n + 1)
+    start = np.maximum(0, end - window)
+    count = (end - start).astype(float)
+    valid = count >= max(min_periods, 2)
+    if valid.any():
+        e, s = end[valid], start[valid]
+        out[valid] = _corr_from_moments(count[valid], sums[e] - sums[s], cross[e] - cross[s])
+    return out
+
+
+class RollingCorrelation:
+    """Matriz de correlación de las últimas `window` observaciones, actualizada en O(k²)."""
+
+    def __init__(self, symbols, window=DEFAULT_CORR_WINDOW, resync_every=None):
+        self.symbols = list(symbols)
+        self.window = window
+        self.resync_every = resync_every or 50 * window
+        k = len(self.symbols)
+        self.buffer = deque(maxlen=window)
+        self.sums = np.zeros(k)
+        self.cross = np.zeros((k, k))
+        self._updates = 0
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def update(self, returns):
+        """Añade un vector de retornos (uno por símbolo, en el orden de `symbols`)."""
+        x = np.asarray(returns, dtype=float)
+        if x.shape != self.sums.shape or not np.isfinite(x).all():
+            raise ValueError(f"Se esperaba un vector finito de {len(self.sums)} retornos.")
+        if len(self.buffer) == self.window:
+            old = self.buffer[0]
+            self.sums -= old
+            self.cross -= np.outer(old, old)
+        self.buffer.append(x)
+        self.sums += x
+        self.cross += np.outer(x, x)
+        self._updates += 1
+        if self._updates % self.resync_every == 0:
+            self.resync()
+        return self
+
+    def resync(self):
+        """Recalcula las sumas desde la ventana (descarta el error acumulado)."""
+        window = np.array(self.buffer)
+        self.sums = window.sum(axis=0)
+        self.cross = window.T @ window
+
+    def matrix(self, min_periods=None):
+        """Correlaciones actuales como DataFrame k×k (NaN si faltan observaciones)."""
+        k = len(self.symbols)
+        count = len(self.buffer)
+        if count < max(self.window if min_periods is None else min_periods, 2):
+            corr = np.full((k, k), np.nan)
+        else:
+            corr = _corr_from_moments(np.array(float(count)), self.sums, self.cross)
+        return pd.DataFrame(corr, index=self.symbols, columns=self.symbols)
+
+    def against(self, base):
+        """Correlación de cada símbolo con `base` (Series sin el propio `base`)."""
+        return self.matrix()[base].drop(base)
+
+    def to_dict(self):
+        return {"symbols": self.symbols, "window": self.window, "resync_every": self.resync_every,
+                "updates": self._updates, "buffer": [row.tolist() for row in self.buffer]}
+
+    @classmethod
+    def from_dict(cls, data):
+        engine = cls(data["symbols"], data["window"], data["resync_every"])
+        engine.buffer.extend(np.asarray(row, dtype=float) for row in data["buffer"])
+        engine._updates = data["updates"]
+        if engine.buffer:
+            engine.resync()
+        return engine
+
+
+def aligned_returns(frames):
+    """Retornos simples alineados por fecha (otros calendarios arrastran el último cierre)."""
+    closes = pd.concat(
+        {sym: df.set_index(df.columns[0])["close"] for sym, df in frames.items()}, axis=1
+    ).sort_index().ffill()
+    return closes.pct_change(fill_method=None).dropna(how="any")
+
+
+def rolling_correlation_frame(frames, base, window=DEFAULT_CORR_WINDOW):
+    """Histórico de corr(base, activo) por fecha: DataFrame con una columna por activo relacionado."""
+    returns = aligned_returns(frames)
+    symbols = list(returns.columns)
+    corr = rolling_correlation(returns.to_numpy(), window)[:, symbols.index(base), :]
+    out = pd.DataFrame(corr, index=returns.index, columns=symbols)
+    return out.drop(columns=[base])
+
+
+def _state_path(state_dir, base):
+    return os.path.join(state_dir, f"correlation_{factor_key(base)}.json")
+
+
+def load_correlation_state(state_dir, base, symbols, window):
+    """(RollingCorrelation, última fecha consolidada) guardados, o (None, None) si no sirven."""
+    try:
+        with open(_state_path(state_dir, base), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        engine = RollingCorrelation.from_dict(data["engine"])
+    except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return None, None
+    if engine.symbols != list(symbols) or engine.window != window:
+        return None, None  # Cambió la lista de activos o la ventana
+    return engine, pd.Timestamp(data["last"])
+
+
+def save_correlation_state(state_dir, base, engine, last):
+    path = _state_path(state_dir, base)
+    os.makedirs(state_dir, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"last": pd.Timestamp(last).isoformat(), "engine": engine.to_dict()}, f)
+    os.replace(tmp, path)
+
+
+def correlation_factors(frames, base, window=DEFAULT_CORR_WINDOW, state_dir=None):
+    """
+    Factores marginales `corr_<activo>` con la correlación de las últimas
+    `window` velas frente al par base (None si no hay datos suficientes).
+
+    Con `state_dir` el estado se conserva entre ejecuciones: sólo se suman
+    las velas posteriores a la última guardada. La última vela puede seguir
+    abierta, así que entra en el valor del snapshot pero no en el estado.
+    """
+    returns = aligned_returns(frames)
+    symbols = list(returns.columns)
+    engine, last = load_correlation_state(state_dir, base, symbols, window) if state_dir else (None, None)
+    if engine is None:
+        engine = RollingCorrelation(symbols, window)
+        new = returns.iloc[-window:]
+    else:
+        new = returns[returns.index > last]
+    for row in new.to_numpy()[:-1]:
+        engine.update(row)
+    if state_dir and len(new) > 1:
+        save_correlation_state(state_dir, base, engine, new.index[-2])
+    current = copy.deepcopy(engine)
+    if len(new):
+        current.update(new.to_numpy()[-1])
+    return {
+        f"corr_{factor_key(sym)}": None if pd.isna(value) else round(float(value), 6)
+        for sym, value in current.against(base).items()
+    }
@@ -1,30 +1,83 @@
-import yfinance as yf
 import pandas as pd
-import pandas_ta as ta
 import numpy as np
 import json
 import os
-import requests
 from ss91_v3.utils import log
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from pytrends.request import TrendReq
+from ss91_v3 import metrics
+# yfinance, pandas_ta y las fuentes de factores (requests, pytrends, VADER)
+# se importan en su primer uso: quien sólo lee snapshots no los carga
+from ss91_v3.indicators import IndicatorState, INDICATOR_COLUMNS, load_indicator_state, save_indicator_state
+from ss91_v3.storage import period_cutoff
 
 # =============================================================================
 # 1. CÁLCULO DE FACTORES TÉCNICOS (Usando pandas_ta)
 # =============================================================================
-def fetch_ohlcv(symbol, period="1y", interval="1d"):
+STATE_DIR = os.path.join("results", "state")
+
+def _normalize_columns(df):
+    """Columnas en minúsculas y la temporal siempre como 'date'."""
+    # --- CORRECCIÓN 1: Manejar nombres de columna (string o tupla) ---
+    df.columns = [c[0].lower() if isinstance(c, tuple) else c.lower() for c in df.columns]
+    # yfinance llama 'Datetime' al índice de las velas intradía
+    return df.rename(columns={df.columns[0]: "date"})
+
+
+def download_ohlcv(symbol, interval="1d", **kwargs):
+    """
+    Descarga velas de yfinance y normaliza las columnas a minúsculas, con
+    la columna temporal como 'date' también en intervalos intradía.
+    `kwargs` se pasa tal cual a yf.download (period=... o start=...).
+    """
+    import yfinance as yf
+    df = yf.download(symbol, interval=interval, progress=False, **kwargs)
+    if df.empty:
+        return df
+    return _normalize_columns(df.reset_index())
+
+@metrics.timed("fetch_ohlcv")
+def fetch_ohlcv(symbol, period="1y", interval="1d", incremental=False, state_dir=STATE_DIR, store=None):
     """
     Obtiene datos de yfinance Y calcula todos los indicadores técnicos.
+
+    Con incremental=True persiste el estado de los indicadores en `state_dir`
+    y en cada ejecución sólo descarga y procesa las velas nuevas.
+    Con `store` (un storage.OHLCVStore) las velas salen de la caché local y
+    sólo se descarga la cola que falta.
     """
+    download = store.get if store is not None else download_ohlcv
+    if incremental:
+        return _fetch_ohlcv_incremental(symbol, period, interval, state_dir, download)
+
     log.info("Obteniendo datos de mercado de yfinance...")
-    df = yf.download(symbol, period=period, interval=interval, progress=False)
+    with metrics.span("yfinance_download"):
+        df = download(symbol, interval=interval, period=period)
     if df.empty:
         raise ValueError("No se pudieron obtener datos de yfinance.")
-    
-    df = df.reset_index()
+    return compute_indicators(df)
 
-    # --- CORRECCIÓN 1: Manejar nombres de columna (string o tupla) ---
-    df.columns = [c[0].lower() if isinstance(c, tuple) else c.lower() for c in df.columns]
+def download_ohlcv_batch(symbols, interval="1d", **kwargs):
+    """
+    Descarga varios símbolos en una sola llamada a yfinance.
+    Devuelve un dict símbolo -> DataFrame con el formato de download_ohlcv.
+    """
+    import yfinance as yf
+    raw = yf.download(list(symbols), interval=interval, progress=False, group_by="ticker", **kwargs)
+    frames = {}
+    for symbol in symbols:
+        if raw.empty or symbol not in raw.columns.get_level_values(0):
+            log.warning(f"Sin datos de yfinance para {symbol}.")
+            continue
+        frames[symbol] = _normalize_columns(raw[symbol].dropna(how="all").reset_index())
+    return frames
+
+@metrics.timed("pandas_ta")
+def compute_indicators(df):
+    """
+    Añade los indicadores técnicos de pandas_ta a un DataFrame de velas.
+    Es una función de módulo para poder repartirla en un pool de procesos.
+    """
+    import pandas_ta  # noqa: F401  (registra el accesor df.ta)
+    df = df.copy()
 
     # --- Añadimos todos los indicadores técnicos reales ---
     log.info("Calculando factores técnicos con pandas_ta...")
@@ -42,130 +95,122 @@ def fetch_ohlcv(symbol, period="1y", interval="1d"):
     log.info("Datos técnicos calculados.")
     return df
 
+def _fetch_ohlcv_incremental(symbol, period, interval, state_dir, download=download_ohlcv):
+    """
+    Modo incremental de fetch_ohlcv.
+
+    Guarda en disco las velas con los indicadores sin rellenar y el estado de
+    ss91_v3.indicators tras la penúltima vela. La última vela se considera
+    provisional (puede seguir abierta), así que se vuelve a descargar y a
+    procesar junto con las nuevas.
+    """
+    key = symbol.replace("^", "").replace("/", "_").replace("=", "_")
+    state_path = os.path.join(state_dir, f"{key}_{interval}.state.json")
+    frame_path = os.path.join(state_dir, f"{key}_{interval}.pkl")
+
+    state = load_indicator_state(state_path)
+    stored = pd.read_pickle(frame_path) if state is not None and os.path.exists(frame_path) else None
+
+    if stored is None or state.rows != len(stored) - 1:
+        log.info(f"Sin estado incremental para {symbol} ({interval}). Cálculo completo.")
+        bars = download(symbol, interval=interval, period=period)
+        if bars.empty:
+            raise ValueError("No se pudieron obtener datos de yfinance.")
+        state = IndicatorState()
+        committed = 0
+    else:
+        time_col = stored.columns[0]
+        last_ts = stored[time_col].iloc[-1]
+        log.info(f"Descargando velas de {symbol} desde {last_ts}...")
+        new = download(symbol, interval=interval, start=last_ts)
+        new = new[new[time_col] >= last_ts] if not new.empty else new
+        if new.empty:
+            new = stored.iloc[-1:]
+        # Reprocesamos la vela provisional y añadimos las nuevas
+        bars = pd.concat([stored.iloc[:-1], new[stored.columns.intersection(new.columns)]], ignore_index=True)
+        committed = len(stored) - 1
+
+    for col in INDICATOR_COLUMNS:
+        if col not in bars.columns:
+            bars[col] = np.nan
+    pending = bars.iloc[committed:]
+    log.info(f"Actualizando indicadores de {len(pending)} velas nuevas...")
+
+    # Avanzamos hasta la penúltima vela (estado persistido) y luego la última
+    col_idx = [bars.columns.get_loc(c) for c in INDICATOR_COLUMNS]
+    values, revisions = state.advance(pending["high"].iloc[:-1], pending["low"].iloc[:-1], pending["close"].iloc[:-1])
+    save_indicator_state(state_path, state)
+    last_values, last_revisions = state.advance(pending["high"].iloc[-1:], pending["low"].iloc[-1:], pending["close"].iloc[-1:])
+    bars.iloc[committed:, col_idx] = np.vstack([values, last_values])
+    dpo_idx = bars.columns.get_loc("DPO_14")
+    for pos, value in revisions + last_revisions:
+        bars.iat[pos, dpo_idx] = value
+
+    os.makedirs(state_dir, exist_ok=True)
+    bars.to_pickle(frame_path)
+
+    cutoff = period_cutoff(period, bars[bars.columns[0]].iloc[-1])
+    df = bars if cutoff is None else bars[bars[bars.columns[0]] >= cutoff]
+    df = df.reset_index(drop=True).ffill().bfill()
+    log.info("Datos técnicos actualizados (modo incremental).")
+    return df
+
 # =============================================================================
 # 2. CÁLCULO DE FACTORES EXTERNOS (Sentimiento, Interés, Macro)
 # =============================================================================
-def get_all_marginal_factors(df):
+def get_all_marginal_factors(df, deadlines=None, fields=None, symbol="EURUSD=X"):
     """
     Función principal que recolecta todos los factores
     técnicos, de sentimiento, interés y macro.
+
+    Las fuentes externas se consultan en paralelo, cada una con su plazo
+    (ver ss91_v3.factors); el snapshot registra en `factor_sources` cuáles
+    usaron valores por defecto y cuánto tardó cada una. Sólo se consultan
+    las fuentes de los campos `fields` (por defecto SS91_FACTORS, es decir,
+    los que lee la estrategia; ver factor_registry.requested_fields).
+    `symbol` es el par con el que se etiqueta el snapshot.
     """
+    from ss91_v3.factors import collect_marginal_factors
+    from ss91_v3.factor_registry import requested_fields
     log.info("Iniciando recolección de factores marginales...")
-    
-    # --- A. Factores de Sentimiento (Reddit + VADER) ---
-    def _get_sentiment_factors(api_keys):
-        log.info("Obteniendo factor de sentimiento (Reddit)...")
-        try:
-            auth = requests.auth.HTTPBasicAuth(
-                api_keys['REDDIT_CLIENT_ID'], 
-                api_keys['REDDIT_SECRET']
-            )
-            token = requests.post('https://www.reddit.com/api/v1/access_token', 
-                                  auth=auth,
-                                  data={'grant_type': 'client_credentials'},
-                                  headers={'User-Agent': 'ss91_script'}).json().get('access_token')
-            
-            headers = {'Authorization': f'bearer {token}', 'User-Agent': 'ss91_script'}
-            subs = ['Forex', 'wallstreetbets', 'economics']
-            scores = []
-            analyzer = SentimentIntensityAnalyzer()
-            
-            for sub in subs:
-                posts = requests.get(f"https://oauth.reddit.com/r/{sub}/new?limit=50", headers=headers).json()
-                for p in posts.get('data', {}).get('children', []):
-                    text = p['data'].get('title', '')
-                    score = analyzer.polarity_scores(text)['compound']
-                    scores.append(score)
-            
-            if not scores:
-                return {"reddit_vader_avg": 0.5} 
-
-            avg_score = sum(scores) / len(scores)
-            normalized_score = (avg_score + 1) / 2.0
-            return {"reddit_vader_avg": round(normalized_score, 6)}
-        
-        except Exception as e:
-            log.error(f"Error en factor de sentimiento: {e}")
-            return {"reddit_vader_avg": 0.5}
-
-    # --- B. Factores de Interés (Google Trends) ---
-    def _get_interest_factors():
-        log.info("Obteniendo factor de interés (Google Trends)...")
-        try:
-            pytrends = TrendReq(hl='en-US', tz=360)
-            pytrends.build_payload(kw_list=['EURUSD', 'recession', 'forex trading'], timeframe='now 1-d')
-            df_trends = pytrends.interest_over_time()
-            
-            if df_trends.empty:
-                return {"gtrends_eurusd": 0, "gtrends_recession": 0}
-            
-            interest = df_trends.iloc[-1]
-            return {
-                "gtrends_eurusd": round(interest.get('EURUSD', 0) / 100.0, 6),
-                "gtrends_recession": round(interest.get('recession', 0) / 100.0, 6)
-            }
-        except Exception as e:
-            log.error(f"Error en factor de interés: {e}")
-            return {"gtrends_eurusd": 0, "gtrends_recession": 0}
-
-    # --- C. Factores Macro (FRED) ---
-    def _get_macro_factors(api_keys):
-        log.info("Obteniendo factor macro (FRED)...")
-        try:
-            fred_key = api_keys['FRED_API_KEY']
-            url = f"https://api.stlouisfed.org/fred/series/observations?series_id=TERMCBCCALLNS&api_key={fred_key}&file_type=json"
-            data = requests.get(url).json()
-
-            # --- CORRECCIÓN 2: Manejar datos faltantes de FRED ('.') ---
-            latest_obs = data['observations'][-1]['value']
-            if latest_obs == ".":
-                log.warning("Dato de FRED no disponible ('.'). Usando el penúltimo valor.")
-                latest_obs = data['observations'][-2]['value']
-                # Si ambos fallan, asigna un valor por defecto
-                if latest_obs == ".": latest_obs = "1.0e12" 
-            
-            latest_debt = float(latest_obs)
-            # -----------------------------------------------------------
-            
-            normalized_debt = max(0.0, min(1.0, latest_debt / 1.1e12))
-            return {"fred_debt_norm": round(normalized_debt, 6)}
-        except Exception as e:
-            log.error(f"Error en factor macro: {e}")
-            return {"fred_debt_norm": 0.5}
-
-    # --- D. Orquestación y Construcción del Payload Final ---
-    try:
-        api_keys = {
-            "REDDIT_CLIENT_ID": os.getenv("REDDIT_CLIENT_ID"),
-            "REDDIT_SECRET": os.getenv("REDDIT_SECRET"),
-            "FRED_API_KEY": os.getenv("FRED_API_KEY")
-        }
-        
-        sentiment_factors = _get_sentiment_factors(api_keys)
-        interest_factors = _get_interest_factors()
-        macro_factors = _get_macro_factors(api_keys)
-        
-        marginal_factors = {**sentiment_factors, **interest_factors, **macro_factors}
 
-        latest_technicals = df.iloc[-1].to_dict()
-        # Añadimos los 5 últimos precios de cierre para el comando "forecast"
-        latest_technicals["recent_prices"] = df["close"].iloc[-5:].tolist()
-        
-        fibo = compute_fibonacci_levels(df)
-
-        payload = {
-            "snapshot_time_utc": str(pd.Timestamp.utcnow()),
-            "symbol": "EURUSD=X",
-            "ohlc_latest": latest_technicals,
-            "fibonacci": fibo,
-            "marginal_factors": marginal_factors
-        }
-        return payload
+    # --- Orquestación y Construcción del Payload Final ---
+    try:
+        marginal_factors, source_report = collect_marginal_factors(
+            api_keys_from_env(), deadlines=deadlines, fields=requested_fields(fields))
+        return build_payload(df, marginal_factors, source_report, symbol=symbol)
     
     except Exception as e:
         log.error(f"Error al generar factores marginales: {e}")
         raise
 
+def api_keys_from_env():
+    """Credenciales de Reddit y FRED desde el entorno (.env)."""
+    return {
+        "REDDIT_CLIENT_ID": os.getenv("REDDIT_CLIENT_ID"),
+        "REDDIT_SECRET": os.getenv("REDDIT_SECRET"),
+        "FRED_API_KEY": os.getenv("FRED_API_KEY")
+    }
+
+def build_payload(df, marginal_factors, source_report, symbol="EURUSD=X"):
+    """Snapshot a partir de las velas con indicadores y los factores ya recolectados."""
+    latest_technicals, fibo = summarize_technicals(df)
+    return {
+        "snapshot_time_utc": str(pd.Timestamp.utcnow()),
+        "symbol": symbol,
+        "ohlc_latest": latest_technicals,
+        "fibonacci": fibo,
+        "marginal_factors": marginal_factors,
+        "factor_sources": source_report
+    }
+
+def summarize_technicals(df):
+    """Última fila de indicadores (+ precios recientes) y niveles de Fibonacci."""
+    latest_technicals = df.iloc[-1].to_dict()
+    # Añadimos los 5 últimos precios de cierre para el comando "forecast"
+    latest_technicals["recent_prices"] = df["close"].iloc[-5:].tolist()
+    return latest_technicals, compute_fibonacci_levels(df)
+
 # =============================================================================
 # 3. CÁLCULO DE FIBONACCI (Sin cambios, de tu código)
 # =============================================================================
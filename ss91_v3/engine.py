@@ -0,0 +1,218 @@
+"""
+Motor Sherloock compartido por el proceso.
+
+- `get_engine()`: construye Sherloock la primera vez que se necesita (no al
+  importar) y lo reutiliza después; core.py y sher_adapter.py comparten la
+  misma instancia.
+- `reason(command)`: llamada memoizada por el texto exacto del comando.
+- `reason_many(commands)`: varios comandos de una vez, sin repetir los
+  iguales; con worker viajan en un único mensaje.
+- Modo worker: un proceso de larga vida mantiene Sherloock cargado y atiende
+  `reason()` por un socket local (multiprocessing.connection). Si la
+  variable SHERLOOCK_WORKER tiene una dirección ("host:puerto" o ruta de
+  socket Unix), `reason()` se delega al worker:
+
+      python -m ss91_v3.engine --serve 127.0.0.1:6091
+"""
+import argparse
+import functools
+import os
+import threading
+# multiprocessing.connection se importa al usar el worker: core arranca sin él
+from ss91_v3.utils import log
+
+REASON_CACHE_SIZE = 1024
+DEFAULT_AUTHKEY = b"ss91"
+
+_ENGINE = None
+_ENGINE_LOCK = threading.Lock()
+_WORKER = None
+
+
+def _build_engine():
+    from sherloock import Sherloock  # import diferido: carga los modelos
+    return Sherloock()
+
+
+def get_engine():
+    """Instancia de Sherloock del proceso. Lanza ImportError si no se puede crear."""
+    global _ENGINE
+    if _ENGINE is None:
+        with _ENGINE_LOCK:
+            if _ENGINE is None:
+                try:
+                    _ENGINE = _build_engine()
+                    log.info("Motor de razonamiento Sherloock inicializado.")
+                except Exception as e:
+                    log.error(f"Error fatal: No se pudo inicializar Sherloock. {e}")
+                    raise ImportError("El motor Sherloock no pudo ser inicializado.") from e
+    return _ENGINE
+
+
+def parse_address(address):
+    """'host:puerto' -> (host, puerto); cualquier otra cosa es un socket Unix."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1", int(port))
+    return address
+
+
+def _authkey():
+    return os.getenv("SHERLOOCK_AUTHKEY", "").encode() or DEFAULT_AUTHKEY
+
+
+class WorkerClient:
+    """Cliente de un worker Sherloock (una conexión, reutilizada entre llamadas)."""
+
+    def __init__(self, address, authkey=None):
+        self.address = parse_address(address) if isinstance(address, str) else address
+        self.authkey = authkey or _authkey()
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def reason(self, command):
+        with self._lock:
+            if self._conn is None:
+                from multiprocessing.connection import Client
+                self._conn = Client(self.address, authkey=self.authkey)
+            try:
+                self._conn.send(command)
+                status, value = self._conn.recv()
+            except (EOFError, OSError):
+                self._conn = None
+                raise
+        if status == "error":
+            raise RuntimeError(value)
+        return value
+
+    def reason_many(self, commands):
+        """Lista de (status, valor) de `commands` en un solo viaje al worker."""
+        return self.reason(list(commands))
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _get_worker():
+    global _WORKER
+    address = os.getenv("SHERLOOCK_WORKER")
+    if not address:
+        return None
+    if _WORKER is None:
+        _WORKER = WorkerClient(address)
+    return _WORKER
+
+
+def is_available():
+    """True si hay worker configurado o Sherloock se puede cargar en este proceso."""
+    if _get_worker() is not None:
+        return True
+    try:
+        get_engine()
+        return True
+    except ImportError:
+        return False
+
+
+@functools.lru_cache(maxsize=REASON_CACHE_SIZE)
+def reason(command):
+    """
+    `Sherloock.reason(command)` memoizado por el comando exacto. Los errores
+    no se guardan en caché (se reintentan en la siguiente llamada).
+    """
+    worker = _get_worker()
+    if worker is not None:
+        return worker.reason(command)
+    return get_engine().reason(command)
+
+
+def reason_many(commands):
+    """
+    {comando: respuesta} de los comandos distintos de `commands`. Un comando
+    que falla queda con su excepción como valor (no se guarda en caché).
+    """
+    unique = list(dict.fromkeys(commands))
+    worker = _get_worker()
+    if worker is not None and unique:
+        replies = worker.reason_many(unique)
+        return {c: value if status == "ok" else RuntimeError(value) for c, (status, value) in zip(unique, replies)}
+    results = {}
+    for command in unique:
+        try:
+            results[command] = reason(command)
+        except Exception as e:
+            results[command] = e
+    return results
+
+
+def clear_reason_cache():
+    reason.cache_clear()
+
+
+def serve(address, engine=None, authkey=None, ready=None):
+    """
+    Atiende comandos `reason` en `address` hasta recibir None. Cada conexión
+    se sirve en su propio hilo; el motor se carga una sola vez.
+    """
+    engine = engine or get_engine()
+    memo = functools.lru_cache(maxsize=REASON_CACHE_SIZE)(engine.reason)
+    from multiprocessing.connection import Client, Listener
+    listener = Listener(parse_address(address) if isinstance(address, str) else address,
+                        authkey=authkey or _authkey())
+    stop = threading.Event()
+    log.info(f"Worker Sherloock escuchando en {listener.address}")
+    if ready is not None:
+        ready(listener.address)
+
+    def answer(command):
+        try:
+            return ("ok", memo(command))
+        except Exception as e:
+            return ("error", str(e))
+
+    def handle(conn):
+        with conn:
+            while True:
+                try:
+                    command = conn.recv()
+                except EOFError:
+                    return
+                if command is None:
+                    stop.set()
+                    # Desbloquea accept() para salir del bucle principal
+                    try:
+                        Client(listener.address, authkey=authkey or _authkey()).close()
+                    except OSError:
+                        pass
+                    return
+                if isinstance(command, list):
+                    # Lote (reason_many): una respuesta (status, valor) por comando
+                    conn.send(("ok", [answer(c) for c in command]))
+                else:
+                    conn.send(answer(command))
+
+    with listener:
+        while not stop.is_set():
+            try:
+                conn = listener.accept()
+            except OSError:
+                continue
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+    log.info("Worker Sherloock detenido.")
+
+
+def stop_worker(address, authkey=None):
+    """Pide al worker en `address` que termine."""
+    from multiprocessing.connection import Client
+    with Client(parse_address(address), authkey=authkey or _authkey()) as conn:
+        conn.send(None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker persistente de Sherloock")
+    parser.add_argument("--serve", metavar="ADDRESS", required=True,
+                        help="host:puerto o ruta de socket Unix")
+    args = parser.parse_args()
+    serve(args.serve)
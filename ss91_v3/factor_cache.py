@@ -0,0 +1,154 @@
+"""
+Caché en disco con TTL para fuentes de factores externos.
+
+Cada clave guarda el último valor bueno y cuándo se obtuvo. Dentro del TTL
+se sirve tal cual; pasado el TTL se sirve el valor viejo al instante y se
+refresca en segundo plano (stale-while-revalidate). Sólo una caché vacía
+obliga a esperar a la fuente.
+
+También guarda series de FRED completas para pedir sólo las observaciones
+nuevas con `observation_start`.
+"""
+import json
+import os
+import threading
+import time
+from ss91_v3.utils import log
+
+FACTOR_CACHE_PATH = os.path.join("results", "state", "factor_cache.json")
+
+# TTL por fuente, en segundos
+DEFAULT_TTLS = {
+    "interest": 60 * 60,      # Google Trends: horario
+    "macro": 24 * 60 * 60,    # FRED TERMCBCCALLNS se publica mensualmente
+}
+
+
+class FactorCache:
+    def __init__(self, path=FACTOR_CACHE_PATH, clock=time.time, background=True):
+        self.path = path
+        self.clock = clock
+        self.background = background
+        self.status = {}  # clave -> "fresh" | "stale" | "miss"
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._refreshing = {}
+        if path:
+            self.load()
+
+    # --- Persistencia ---
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._entries = {}
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            snapshot = json.dumps(self._entries)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(snapshot)
+        os.replace(tmp, self.path)
+
+    # --- Acceso ---
+    def peek(self, key):
+        """Entrada guardada ({"value", "fetched_at"}) o None."""
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = {"value": value, "fetched_at": self.clock()}
+        self.save()
+
+    def get(self, key, fetch, ttl):
+        """
+        Valor de `key`. Sin entrada, llama a `fetch()` y espera (sus errores se
+        propagan). Con entrada caducada devuelve el valor viejo y lanza el
+        refresco en segundo plano.
+        """
+        entry = self.peek(key)
+        if entry is None:
+            self.status[key] = "miss"
+            value = fetch()
+            self.put(key, value)
+            return value
+        if self.clock() - entry["fetched_at"] < ttl:
+            self.status[key] = "fresh"
+            return entry["value"]
+        self.status[key] = "stale"
+        self._revalidate(key, fetch)
+        return entry["value"]
+
+    def _refresh(self, key, fetch):
+        try:
+            self.put(key, fetch())
+            log.info(f"[CACHE] '{key}' refrescado.")
+        except Exception as e:
+            # Nos quedamos con el último valor bueno
+            log.warning(f"[CACHE] No se pudo refrescar '{key}': {e}")
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def _revalidate(self, key, fetch):
+        with self._lock:
+            if key in self._refreshing:
+                return  # ya hay un refresco en curso
+            thread = None
+            if self.background:
+                thread = threading.Thread(target=self._refresh, args=(key, fetch), daemon=True,
+                                          name=f"ss91_refresh_{key}")
+            self._refreshing[key] = thread
+        if thread is None:
+            self._refresh(key, fetch)
+        else:
+            thread.start()
+
+    def wait(self, timeout=None):
+        """Espera a que terminen los refrescos en curso (fin del collector, tests)."""
+        with self._lock:
+            threads = [t for t in self._refreshing.values() if t is not None]
+        for thread in threads:
+            thread.join(timeout)
+
+
+def merge_observations(cached, new):
+    """
+    Une observaciones de FRED ({"date", "value"}) por fecha. Las nuevas
+    reemplazan a las guardadas (FRED revisa los últimos valores).
+    """
+    by_date = {obs["date"]: obs for obs in cached}
+    by_date.update({obs["date"]: obs for obs in new})
+    return [by_date[d] for d in sorted(by_date)]
+
+
+def fetch_fred_series(cache, series_id, fetch_page):
+    """
+    Serie de FRED completa a partir de la caché más las observaciones desde
+    la última fecha guardada. `fetch_page(observation_start)` debe devolver
+    la lista de observaciones (observation_start=None pide todo).
+    """
+    key = f"fred:{series_id}"
+    entry = cache.peek(key)
+    cached = entry["value"] if entry else []
+    start = cached[-1]["date"] if cached else None
+    observations = merge_observations(cached, fetch_page(start))
+    cache.put(key, observations)
+    return observations
+
+
+_FACTOR_CACHE = None
+
+
+def get_factor_cache():
+    """Caché del proceso (se carga del disco en el primer uso)."""
+    global _FACTOR_CACHE
+    if _FACTOR_CACHE is None:
+        _FACTOR_CACHE = FactorCache()
+    return _FACTOR_CACHE
@@ -0,0 +1,213 @@
+"""
+Histórico point-in-time de factores marginales (record / replay).
+
+Cada vez que una fuente (Reddit, Google Trends, FRED) entrega valores, se
+guardan con su instante `as_of`:
+
+- los valores derivados ("reddit_vader_avg", "gtrends_recession"...) en una
+  ColumnarTable por fuente, indexada por `as_of`, y
+- las respuestas crudas de la fuente en `raw/<fuente>.jsonl`, con su
+  posición en la tabla (como SnapshotStore).
+
+`asof(fechas)` resuelve, para cada fecha, el último valor registrado en
+o antes de ella con un searchsorted sobre el índice memory-mapped: unir
+años de velas con los factores cuesta O(velas · log registros) y no hace
+falta red. Con SS91_FACTOR_MODE=replay, `collect_marginal_factors` sirve
+los factores desde aquí en lugar de llamar a las APIs (CI sin red);
+con SS91_FACTOR_MODE=record llama a las APIs y lo registra todo.
+"""
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from ss91_v3.storage import ColumnarTable, _safe_name
+from ss91_v3.utils import log
+
+FACTOR_HISTORY_DIR = os.path.join("results", "factor_history")
+MODES = ("live", "record", "replay")
+
+_OFFSET = "_raw_offset"
+_LENGTH = "_raw_length"
+# Nunca se guardan credenciales en las respuestas registradas
+_SECRET_PARAMS = {"api_key", "client_secret", "password", "token", "access_token"}
+
+
+def factor_mode(mode=None):
+    """Modo de las fuentes: parámetro, SS91_FACTOR_MODE o "live"."""
+    mode = mode or os.getenv("SS91_FACTOR_MODE", "live")
+    if mode not in MODES:
+        raise ValueError(f"SS91_FACTOR_MODE desconocido: {mode} (opciones: {', '.join(MODES)})")
+    return mode
+
+
+def _utc(ts):
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def _to_ns(dates):
+    """Fechas (naive = UTC) como int64 ns UTC."""
+    index = pd.DatetimeIndex(dates)
+    index = index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")
+    return index.tz_localize(None).as_unit("ns").asi8
+
+
+class FactorHistory:
+    def __init__(self, root=FACTOR_HISTORY_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._tables = {}
+
+    def table(self, source):
+        if source not in self._tables:
+            self._tables[source] = ColumnarTable(os.path.join(self.root, "values", _safe_name(source)))
+        return self._tables[source]
+
+    def _raw_path(self, source):
+        return os.path.join(self.root, "raw", f"{_safe_name(source)}.jsonl")
+
+    @property
+    def sources(self):
+        directory = os.path.join(self.root, "values")
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name for name in os.listdir(directory) if len(self.table(name)))
+
+    # --- Registro ---
+    def record(self, source, values, raw=None, as_of=None):
+        """
+        Registra los valores derivados de `source` (dict nombre -> número) y,
+        opcionalmente, sus respuestas crudas. Devuelve el `as_of` usado;
+        dos registros de la misma fuente en el mismo instante se separan 1 ns.
+        """
+        as_of = _utc(as_of if as_of is not None else pd.Timestamp.now(tz="UTC"))
+        numeric = {k: float(v) for k, v in values.items() if isinstance(v, (int, float)) and not isinstance(v, bool)}
+        with self._lock:
+            table = self.table(source)
+            if len(table):
+                last = pd.Timestamp(int(table.index(len(table) - 1)[0]), tz="UTC")
+                if as_of <= last:
+                    if as_of < last:
+                        raise ValueError(f"as_of {as_of} anterior al último registro de {source} ({last}).")
+                    as_of = last + pd.Timedelta(1, "ns")
+            offset, length = -1.0, 0.0
+            if raw is not None:
+                line = (json.dumps(raw, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+                path = self._raw_path(source)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "ab") as f:
+                    offset = f.tell()
+                    f.write(line)
+                length = len(line)
+            data = {k: [v] for k, v in numeric.items()}
+            data[_OFFSET] = [offset]
+            data[_LENGTH] = [length]
+            table.append(pd.DatetimeIndex([as_of]), data)
+        return as_of
+
+    # --- Consultas ---
+    def _rows_asof(self, source, ns):
+        """Fila vigente en cada instante `ns` (-1 si no había registro aún)."""
+        return np.searchsorted(self.table(source).index(), ns, side="right") - 1
+
+    def columns(self, source):
+        return [c for c in self.table(source).columns if not c.startswith("_raw")]
+
+    def asof(self, dates, columns=None, sources=None, max_age=None):
+        """
+        DataFrame indexado por `dates` con el último valor registrado en o
+        antes de cada fecha (fechas naive se interpretan en UTC). `columns`
+        filtra factores por nombre; `max_age` (Timedelta o str) deja NaN los
+        valores demasiado viejos. Sin registro previo -> NaN.
+        """
+        ns = _to_ns(dates)
+        max_age = pd.Timedelta(max_age).value if max_age is not None else None
+        out = {}
+        for source in sources or self.sources:
+            table = self.table(source)
+            wanted = [c for c in self.columns(source) if columns is None or c in columns]
+            if not wanted or not len(table):
+                continue
+            rows = self._rows_asof(source, ns)
+            missing = rows < 0
+            if max_age is not None:
+                index = np.asarray(table.index())
+                missing |= (ns - index[np.maximum(rows, 0)]) > max_age
+            safe = np.maximum(rows, 0)
+            for column in wanted:
+                values = np.asarray(table.column(column))[safe]
+                out[column] = np.where(missing, np.nan, values)
+        df = pd.DataFrame(out, index=pd.DatetimeIndex(dates))
+        return df if columns is None else df.reindex(columns=[c for c in columns if c in df.columns])
+
+    def values_at(self, as_of=None, source=None):
+        """
+        Factores vigentes en `as_of` (por defecto ahora) como dict, de una
+        fuente o de todas. Los factores sin registro previo no aparecen.
+        """
+        as_of = _utc(as_of if as_of is not None else pd.Timestamp.now(tz="UTC"))
+        row = self.asof([as_of], sources=[source] if source else None).iloc[0]
+        return {k: float(v) for k, v in row.items() if not pd.isna(v)}
+
+    def raw_at(self, source, as_of=None):
+        """Respuestas crudas del último registro de `source` en o antes de `as_of`, o None."""
+        as_of = _utc(as_of if as_of is not None else pd.Timestamp.now(tz="UTC"))
+        if not len(self.table(source)):
+            return None
+        row = int(self._rows_asof(source, _to_ns([as_of]))[0])
+        if row < 0:
+            return None
+        table = self.table(source)
+        offset = int(table.column(_OFFSET, row, row + 1)[0])
+        length = int(table.column(_LENGTH, row, row + 1)[0])
+        if offset < 0:
+            return None
+        with open(self._raw_path(source), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+
+def _scrub(params):
+    return {k: v for k, v in (params or {}).items() if k not in _SECRET_PARAMS}
+
+
+class RecordingSession:
+    """
+    Envuelve una sesión de requests y apunta en `responses` cada GET
+    (url, parámetros sin credenciales, estado y JSON). Los POST (tokens de
+    Reddit) pasan sin registrarse.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.responses = []
+
+    def get(self, url, params=None, **kwargs):
+        response = self.session.get(url, params=params, **kwargs)
+        try:
+            body = response.json()
+        except ValueError:
+            body = response.text
+        self.responses.append({"url": url, "params": _scrub(params), "status": response.status_code, "json": body})
+        return response
+
+    def post(self, url, **kwargs):
+        return self.session.post(url, **kwargs)
+
+
+def join_factors(df, history, columns=None, defaults=None, time_col="date", **kwargs):
+    """
+    Añade a `df` (velas) las columnas de factores vigentes al inicio de cada
+    vela (sin mirar al futuro). Los huecos se rellenan con `defaults`.
+    """
+    dates = df[time_col] if time_col in df.columns else df.index
+    joined = history.asof(pd.DatetimeIndex(dates), columns=columns, **kwargs)
+    for column, value in (defaults or {}).items():
+        joined[column] = joined[column].fillna(value) if column in joined else value
+    out = df.copy()
+    if joined.columns.empty:
+        log.warning("Histórico de factores vacío: no se añadió ningún factor.")
+    for column in joined.columns:
+        out[column] = joined[column].to_numpy()
+    return out
@@ -0,0 +1,176 @@
+"""
+Registro declarativo de factores marginales.
+
+Cada nodo (`FactorSpec`) declara de qué depende (`inputs`: otros nodos o
+claves del contexto de la recolección, como las credenciales o la sesión
+HTTP), qué campos produce (`outputs`; sin outputs es un intermedio
+compartido, p.ej. los posts de Reddit), sus valores por defecto, su coste
+típico, su cadencia de refresco (`ttl`, para FactorCache) y su plazo.
+
+`FactorRegistry.sources_for(campos)` resuelve qué fuentes hacen falta
+para los campos que lee la estrategia y sólo esas se ejecutan: añadir un
+factor no añade latencia a quien no lo consume. `Evaluation` resuelve los
+nodos bajo demanda y memoiza cada uno, así que un intermedio que
+comparten varias fuentes se calcula una sola vez aunque esas fuentes
+corran en hilos distintos; con una fuente servida desde la caché, sus
+intermedios ni se calculan.
+"""
+import os
+import threading
+from dataclasses import dataclass, field
+from ss91_v3.strategy import consumed_factors, load_rules
+
+
+@dataclass
+class FactorSpec:
+    name: str
+    fn: object                # callable(**inputs) -> dict de factores (o valor intermedio)
+    inputs: tuple = ()        # nodos o claves del contexto
+    outputs: tuple = ()       # campos de factor que produce; vacío = intermedio
+    defaults: dict = field(default_factory=dict)  # valores si falla o vence el plazo
+    cost: float = 1.0         # segundos típicos (orden de lanzamiento y desempate)
+    ttl: float = None         # cadencia de refresco en segundos (None = siempre en vivo)
+    deadline: float = None    # plazo máximo desde el inicio de la recolección
+
+
+class FactorRegistry:
+    def __init__(self, specs=()):
+        self._specs = {}
+        for spec in specs:
+            self.register(spec)
+
+    def register(self, spec):
+        if spec.name in self._specs:
+            raise ValueError(f"Factor ya registrado: '{spec.name}'.")
+        self._specs[spec.name] = spec
+        return spec
+
+    def __contains__(self, name):
+        return name in self._specs
+
+    def __getitem__(self, name):
+        try:
+            return self._specs[name]
+        except KeyError:
+            raise KeyError(f"Factor desconocido: '{name}'.") from None
+
+    @property
+    def sources(self):
+        """Nodos que producen campos, en orden de registro."""
+        return [s for s in self._specs.values() if s.outputs]
+
+    @property
+    def fields(self):
+        """Campo -> fuente que lo produce (la más barata si hay varias)."""
+        producers = {}
+        for spec in sorted(self.sources, key=lambda s: -s.cost):
+            for name in spec.outputs:
+                producers[name] = spec.name
+        return producers
+
+    def sources_for(self, fields=None):
+        """Fuentes necesarias para `fields` (None = todas), de más a menos costosa."""
+        if fields is None:
+            names = {s.name for s in self.sources}
+        else:
+            producers = self.fields
+            unknown = [f for f in fields if f not in producers]
+            if unknown:
+                raise KeyError(f"Ningún factor registrado produce {unknown}.")
+            names = {producers[f] for f in fields}
+        return [s.name for s in sorted(self.sources, key=lambda s: -s.cost) if s.name in names]
+
+    def upstream(self, names, provided=()):
+        """
+        Nodos de los que dependen `names` (incluidos), en orden topológico.
+        Las claves de `provided` (contexto) son hojas; cualquier otra
+        entrada debe estar registrada y el grafo no puede tener ciclos.
+        """
+        order, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done or name in provided:
+                return
+            if name in visiting:
+                raise ValueError(f"Ciclo de dependencias en el factor '{name}'.")
+            visiting.add(name)
+            for dep in self[name].inputs:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in names:
+            visit(name)
+        return order
+
+    def defaults(self, names=None):
+        """Valores por defecto de las fuentes `names` (None = todas), por fuente."""
+        return {s.name: dict(s.defaults) for s in self.sources if names is None or s.name in names}
+
+
+class Evaluation:
+    """
+    Una recolección sobre un registro. `resolve(nodo)` calcula el nodo (y,
+    bajo demanda, sus entradas) una única vez; los errores también se
+    memoizan. `overrides` sustituye nodos por callables sin argumentos y
+    `wrap(spec, call)` envuelve el cálculo de cada nodo (p.ej. con la
+    caché con TTL).
+    """
+
+    def __init__(self, registry, context=None, overrides=None, wrap=None):
+        self.registry = registry
+        self.values = dict(context or {})
+        self.overrides = dict(overrides or {})
+        self.wrap = wrap
+        self.computed = []  # nodos calculados, en orden
+        self._errors = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def _lock(self, name):
+        with self._guard:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def resolve(self, name):
+        if name in self.values:
+            return self.values[name]
+        with self._lock(name):
+            if name in self.values:
+                return self.values[name]
+            if name in self._errors:
+                raise self._errors[name]
+            try:
+                value = self._compute(name)
+            except Exception as e:
+                self._errors[name] = e
+                raise
+            self.values[name] = value
+            self.computed.append(name)
+            return value
+
+    def _compute(self, name):
+        if name in self.overrides:
+            call = self.overrides[name]
+        else:
+            spec = self.registry[name]
+            call = lambda: spec.fn(**{dep: self.resolve(dep) for dep in spec.inputs})
+        if self.wrap is not None and name in self.registry:
+            call = self.wrap(self.registry[name], call)
+        return call()
+
+
+def requested_fields(value=None):
+    """
+    Campos a recolectar según `value` (lista o texto) o SS91_FACTORS:
+    "strategy" (por defecto, los que leen las reglas de fx_config.json),
+    "all" (None = todos) o una lista separada por comas.
+    """
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    value = value or os.getenv("SS91_FACTORS", "strategy")
+    if value == "strategy":
+        return list(consumed_factors(load_rules()))
+    if value == "all":
+        return None
+    return [f.strip() for f in value.split(",") if f.strip()]
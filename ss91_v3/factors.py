@@ -0,0 +1,323 @@
+"""
+Fuentes de factores marginales (Sentimiento, Interés, Macro).
+
+Cada fuente corre en su propio hilo con un plazo máximo (deadline). Si el
+plazo vence o la fuente falla, se usan los valores por defecto de siempre y
+el informe lo deja registrado. El tiempo total queda acotado por la fuente
+más lenta, no por la suma de todas.
+
+Las fuentes y sus intermedios están declarados en REGISTRY (ver
+factor_registry.py): con `fields` sólo se ejecutan las fuentes que
+producen esos campos.
+
+Con SS91_FACTOR_MODE=record cada resultado (y las respuestas crudas) se
+guarda en el histórico point-in-time (factor_history.py); con
+SS91_FACTOR_MODE=replay los factores salen de ese histórico sin red.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import requests
+from requests.adapters import HTTPAdapter
+from ss91_v3.utils import log
+from ss91_v3 import metrics
+from ss91_v3.sentiment import SentimentCache, score_posts, text_key
+from ss91_v3.factor_cache import DEFAULT_TTLS, fetch_fred_series, get_factor_cache
+from ss91_v3.factor_history import FactorHistory, RecordingSession, factor_mode
+from ss91_v3.factor_registry import Evaluation, FactorRegistry, FactorSpec
+
+ENDPOINTS = {
+    "reddit_auth": "https://www.reddit.com/api/v1/access_token",
+    "reddit_api": "https://oauth.reddit.com",
+    "fred": "https://api.stlouisfed.org/fred/series/observations",
+}
+
+# Valores por defecto (los mismos que usaba get_all_marginal_factors)
+DEFAULT_FACTORS = {
+    "sentiment": {"reddit_vader_avg": 0.5},
+    "interest": {"gtrends_eurusd": 0, "gtrends_recession": 0},
+    "macro": {"fred_debt_norm": 0.5},
+}
+
+# Plazo máximo por fuente, en segundos
+DEFAULT_DEADLINES = {"sentiment": 20.0, "interest": 15.0, "macro": 10.0}
+
+# Timeout de cada petición HTTP individual (conexión, lectura)
+REQUEST_TIMEOUT = (3.05, 10)
+
+_SESSION = None
+_SENTIMENT_CACHE = None
+
+
+def make_session(pool_size=10):
+    """Sesión HTTP con pool de conexiones reutilizables."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """Sesión compartida del proceso (se crea en el primer uso)."""
+    global _SESSION
+    if _SESSION is None:
+        _SESSION = make_session()
+    return _SESSION
+
+
+def get_sentiment_cache():
+    """Caché de puntuaciones VADER del proceso (se carga del disco en el primer uso)."""
+    global _SENTIMENT_CACHE
+    if _SENTIMENT_CACHE is None:
+        _SENTIMENT_CACHE = SentimentCache()
+    return _SENTIMENT_CACHE
+
+
+# --- A. Factores de Sentimiento (Reddit + VADER) ---
+@metrics.timed("reddit_posts")
+def _get_reddit_posts(api_keys, session, endpoints=ENDPOINTS):
+    """Títulos recientes de los subreddits como [(id, texto)] (intermedio compartido)."""
+    log.info("Obteniendo posts de Reddit...")
+    auth = requests.auth.HTTPBasicAuth(
+        api_keys['REDDIT_CLIENT_ID'],
+        api_keys['REDDIT_SECRET']
+    )
+    token = session.post(endpoints["reddit_auth"],
+                         auth=auth,
+                         data={'grant_type': 'client_credentials'},
+                         headers={'User-Agent': 'ss91_script'},
+                         timeout=REQUEST_TIMEOUT).json().get('access_token')
+
+    headers = {'Authorization': f'bearer {token}', 'User-Agent': 'ss91_script'}
+    subs = ['Forex', 'wallstreetbets', 'economics']
+    posts = []
+
+    for sub in subs:
+        listing = session.get(f"{endpoints['reddit_api']}/r/{sub}/new?limit=50",
+                              headers=headers, timeout=REQUEST_TIMEOUT).json()
+        for p in listing.get('data', {}).get('children', []):
+            text = p['data'].get('title', '')
+            # El ID de Reddit (t3_xxx) identifica el post; si falta, hash del título
+            posts.append((p['data'].get('name') or text_key(text), text))
+    return posts
+
+
+@metrics.timed("factor_sentiment")
+def _get_sentiment_factors(api_keys=None, session=None, endpoints=ENDPOINTS, cache=None, posts=None):
+    log.info("Obteniendo factor de sentimiento (Reddit)...")
+    if posts is None:
+        posts = _get_reddit_posts(api_keys, session, endpoints)
+
+    # Sólo los posts que no se vieron en ejecuciones anteriores pasan por VADER
+    cache = cache if cache is not None else get_sentiment_cache()
+    scores = score_posts(posts, cache)
+    cache.save()
+
+    if not scores:
+        return {"reddit_vader_avg": 0.5}
+
+    avg_score = sum(scores) / len(scores)
+    normalized_score = (avg_score + 1) / 2.0
+    return {"reddit_vader_avg": round(normalized_score, 6)}
+
+
+# --- B. Factores de Interés (Google Trends) ---
+@metrics.timed("factor_interest")
+def _get_interest_factors(raw=None):
+    log.info("Obteniendo factor de interés (Google Trends)...")
+    from pytrends.request import TrendReq  # import diferido: pytrends es pesado
+    pytrends = TrendReq(hl='en-US', tz=360, timeout=REQUEST_TIMEOUT)
+    pytrends.build_payload(kw_list=['EURUSD', 'recession', 'forex trading'], timeframe='now 1-d')
+    df_trends = pytrends.interest_over_time()
+    if raw is not None:
+        # Modo record: la serie completa tal como la devolvió pytrends
+        raw.append({"interest_over_time": df_trends.reset_index().to_dict(orient="records")})
+
+    if df_trends.empty:
+        return {"gtrends_eurusd": 0, "gtrends_recession": 0}
+
+    interest = df_trends.iloc[-1]
+    return {
+        "gtrends_eurusd": round(interest.get('EURUSD', 0) / 100.0, 6),
+        "gtrends_recession": round(interest.get('recession', 0) / 100.0, 6)
+    }
+
+
+# --- C. Factores Macro (FRED) ---
+@metrics.timed("factor_macro")
+def _get_macro_factors(api_keys, session, endpoints=ENDPOINTS, cache=None):
+    log.info("Obteniendo factor macro (FRED)...")
+    fred_key = api_keys['FRED_API_KEY']
+
+    def fetch_page(observation_start):
+        params = {"series_id": "TERMCBCCALLNS", "api_key": fred_key, "file_type": "json"}
+        if observation_start:
+            # Sólo lo publicado desde la última observación guardada
+            params["observation_start"] = observation_start
+        data = session.get(endpoints["fred"], params=params, timeout=REQUEST_TIMEOUT).json()
+        return data['observations']
+
+    if cache is not None:
+        observations = fetch_fred_series(cache, "TERMCBCCALLNS", fetch_page)
+    else:
+        observations = fetch_page(None)
+
+    # --- CORRECCIÓN 2: Manejar datos faltantes de FRED ('.') ---
+    latest_obs = observations[-1]['value']
+    if latest_obs == ".":
+        log.warning("Dato de FRED no disponible ('.'). Usando el penúltimo valor.")
+        latest_obs = observations[-2]['value']
+        # Si ambos fallan, asigna un valor por defecto
+        if latest_obs == ".": latest_obs = "1.0e12"
+
+    latest_debt = float(latest_obs)
+    normalized_debt = max(0.0, min(1.0, latest_debt / 1.1e12))
+    return {"fred_debt_norm": round(normalized_debt, 6)}
+
+
+_ERROR_LABELS = {"sentiment": "sentimiento", "interest": "interés", "macro": "macro"}
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def _replay_source(history, name, as_of):
+    values = history.values_at(as_of, source=name)
+    if not values:
+        raise LookupError(f"sin registros de '{name}' hasta {as_of or 'ahora'} (modo replay)")
+    return values
+
+
+def collect_marginal_factors(api_keys, deadlines=None, session=None, endpoints=None, sources=None,
+                             factor_cache=None, ttls=None, mode=None, history=None, as_of=None,
+                             fields=None, registry=None):
+    """
+    Recolecta en paralelo las fuentes que producen `fields` (None = todas
+    las de `registry`, por defecto REGISTRY).
+
+    Devuelve `(factores, informe)`. El informe tiene, por fuente,
+    `fallback` (si se usaron los valores por defecto), `elapsed_s`,
+    `error` y, para las fuentes con TTL, el estado de la caché `cache`
+    (fresh / stale / miss). `sources` permite sustituir fuentes (nombre ->
+    callable sin argumentos), útil en tests.
+
+    `mode` ("live", "record" o "replay"; por defecto SS91_FACTOR_MODE)
+    decide si se usa el histórico point-in-time `history`. En replay, los
+    valores son los vigentes en `as_of` (por defecto SS91_REPLAY_AS_OF o
+    ahora) y no se toca la red.
+    """
+    registry = registry or REGISTRY
+    mode = factor_mode(mode)
+    names = registry.sources_for(fields)
+    if fields is None:
+        names += [name for name in (sources or {}) if name not in registry]
+    deadlines = {**{s.name: s.deadline for s in registry.sources if s.deadline}, **(deadlines or {})}
+    defaults = registry.defaults(names)
+    if mode != "live":
+        history = history if history is not None else FactorHistory()
+    if mode == "replay":
+        as_of = as_of or os.getenv("SS91_REPLAY_AS_OF") or None
+        calls = {name: (lambda name=name: _replay_source(history, name, as_of)) for name in names}
+        return _merge(*_run_sources(calls, deadlines, defaults))
+
+    ttls = {**{s.name: s.ttl for s in registry.sources if s.ttl}, **(ttls or {})}
+    session = session or get_session()
+    cache = factor_cache if factor_cache is not None else get_factor_cache()
+    context = {
+        "api_keys": api_keys,
+        "endpoints": {**ENDPOINTS, **(endpoints or {})},
+        "factor_cache": cache,
+        "reddit_session": session,
+        "fred_session": session,
+        "trends_raw": None,
+    }
+    raw = {}
+    if mode == "record":
+        reddit, fred = RecordingSession(session), RecordingSession(session)
+        raw = {"sentiment": reddit.responses, "macro": fred.responses, "interest": []}
+        context.update(reddit_session=reddit, fred_session=fred, trends_raw=raw["interest"])
+    registry.upstream([n for n in names if n in registry], provided=context)
+
+    def cached(spec, call):
+        # Trends y FRED pasan por la caché con TTL (stale-while-revalidate);
+        # con un acierto, los intermedios de la fuente ni se calculan
+        ttl = ttls.get(spec.name)
+        return (lambda: cache.get(spec.name, call, ttl)) if ttl else call
+
+    evaluation = Evaluation(registry, context, overrides=sources, wrap=cached)
+    calls = {name: (lambda name=name: evaluation.resolve(name)) for name in names}
+    by_source, report = _run_sources(calls, deadlines, defaults, cache, ttls)
+    if mode == "record":
+        for name, values in by_source.items():
+            if not report[name]["fallback"]:
+                # Sólo las llamadas que llegaron a la fuente traen respuestas crudas
+                history.record(name, values, raw=raw.get(name) or None)
+    return _merge(by_source, report)
+
+
+def _merge(by_source, report):
+    factors = {}
+    for values in by_source.values():
+        factors.update(values)
+    return factors, report
+
+
+def _run_sources(calls, deadlines, defaults, cache=None, ttls=()):
+    """Ejecuta las fuentes en paralelo con su plazo; devuelve ({fuente: valores}, informe)."""
+    by_source, report = {}, {}
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=max(1, len(calls)), thread_name_prefix="ss91_factor")
+    futures = {name: executor.submit(_timed, fn) for name, fn in calls.items()}
+    try:
+        for name, future in futures.items():
+            deadline = deadlines.get(name, max(deadlines.values(), default=max(DEFAULT_DEADLINES.values())))
+            remaining = max(0.0, deadline - (time.perf_counter() - start))
+            try:
+                values, elapsed = future.result(timeout=remaining)
+                report[name] = {"fallback": False, "elapsed_s": round(elapsed, 4), "error": None}
+                if name in ttls:
+                    report[name]["cache"] = cache.status.get(name)
+            except FutureTimeout:
+                log.error(f"Factor de {_ERROR_LABELS.get(name, name)} superó su plazo ({deadline}s). Usando valores por defecto.")
+                values = defaults.get(name, {})
+                report[name] = {"fallback": True, "elapsed_s": round(time.perf_counter() - start, 4), "error": "deadline"}
+                metrics.inc("ss91_factor_fallback_total", source=name, reason="deadline")
+            except Exception as e:
+                log.error(f"Error en factor de {_ERROR_LABELS.get(name, name)}: {e}")
+                values = defaults.get(name, {})
+                report[name] = {"fallback": True, "elapsed_s": round(time.perf_counter() - start, 4), "error": str(e)}
+                metrics.inc("ss91_factor_fallback_total", source=name, reason="error")
+            by_source[name] = values
+    finally:
+        # No esperamos a las fuentes que vencieron: sus hilos terminan solos
+        # gracias al timeout de cada petición.
+        executor.shutdown(wait=False, cancel_futures=True)
+    return by_source, report
+
+
+# --- Registro de fuentes ---
+# Entradas: otros nodos o claves del contexto de collect_marginal_factors
+# (api_keys, endpoints, factor_cache, reddit_session, fred_session,
+# trends_raw). Las funciones se buscan al llamar (los tests las sustituyen).
+REGISTRY = FactorRegistry([
+    FactorSpec("reddit_posts", lambda api_keys, reddit_session, endpoints:
+               _get_reddit_posts(api_keys, reddit_session, endpoints),
+               inputs=("api_keys", "reddit_session", "endpoints"), cost=2.0),
+    FactorSpec("sentiment", lambda reddit_posts: _get_sentiment_factors(posts=reddit_posts),
+               inputs=("reddit_posts",), outputs=("reddit_vader_avg",), defaults=DEFAULT_FACTORS["sentiment"],
+               cost=3.0, deadline=DEFAULT_DEADLINES["sentiment"]),
+    FactorSpec("interest", lambda trends_raw:
+               _get_interest_factors() if trends_raw is None else _get_interest_factors(raw=trends_raw),
+               inputs=("trends_raw",), outputs=("gtrends_eurusd", "gtrends_recession"),
+               defaults=DEFAULT_FACTORS["interest"], cost=2.0, ttl=DEFAULT_TTLS["interest"],
+               deadline=DEFAULT_DEADLINES["interest"]),
+    FactorSpec("macro", lambda api_keys, fred_session, endpoints, factor_cache:
+               _get_macro_factors(api_keys, fred_session, endpoints, factor_cache),
+               inputs=("api_keys", "fred_session", "endpoints", "factor_cache"), outputs=("fred_debt_norm",),
+               defaults=DEFAULT_FACTORS["macro"], cost=1.0, ttl=DEFAULT_TTLS["macro"],
+               deadline=DEFAULT_DEADLINES["macro"]),
+])
@@ -0,0 +1,133 @@
+"""
+Niveles de Fibonacci punto a punto (sin mirar al futuro).
+
+`compute_fibonacci_levels` (data_pipeline) sólo da los niveles de la última
+vela. `rolling_fibonacci` calcula, para cada vela, máximo/mínimo de las
+últimas `lookback` velas, todos los retrocesos, el nivel más cercano y el
+ratio de posición, en O(n) independientemente de `lookback`:
+
+- `rolling_max` / `rolling_min`: algoritmo de van Herk / Gil-Werman
+  (máximos acumulados por bloques de tamaño `lookback`), vectorizado.
+- `RollingExtrema`: la misma ventana con deques monótonas, vela a vela,
+  para uso incremental.
+"""
+from collections import deque
+import numpy as np
+import pandas as pd
+from ss91_v3.utils import log, load_fx_config
+
+# (etiqueta, fracción del rango desde el máximo), como compute_fibonacci_levels
+FIBO_LEVELS = (
+    ("0.0%", 0.0),
+    ("23.6%", 0.236),
+    ("38.2%", 0.382),
+    ("50.0%", 0.5),
+    ("61.8%", 0.618),
+    ("78.6%", 0.786),
+    ("100%", 1.0),
+)
+DEFAULT_LOOKBACK = 252
+
+
+def fibo_lookback_from_config(config=None, default=DEFAULT_LOOKBACK):
+    """`indicators.lookback_period_days` de fx_config.json (en velas diarias)."""
+    try:
+        config = config if config is not None else load_fx_config()
+        return int(config["indicators"]["lookback_period_days"])
+    except Exception as e:
+        log.warning(f"Sin lookback de Fibonacci en la configuración ({e}). Usando {default}.")
+        return default
+
+
+def _rolling_extreme(values, window, ufunc):
+    """Extremo de las últimas `window` posiciones (min_periods=1, ignora NaN)."""
+    x = np.asarray(values, dtype=float)
+    n = len(x)
+    if window < 1:
+        raise ValueError("window debe ser >= 1")
+    if n == 0 or window == 1:
+        return x.copy()
+    accumulate = ufunc.accumulate
+    if window >= n:
+        return accumulate(x)
+
+    # Bloques de tamaño `window`: g = extremo acumulado desde el inicio del
+    # bloque, h = desde el final. La ventana [j-w+1, j] cubre el final de un
+    # bloque y el inicio del siguiente: extremo(h[j-w+1], g[j]).
+    n_blocks = -(-n // window)
+    padded = np.full(n_blocks * window, np.nan)
+    padded[:n] = x
+    blocks = padded.reshape(n_blocks, window)
+    g = accumulate(blocks, axis=1).ravel()[:n]
+    h = accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()[:n]
+
+    out = np.empty(n)
+    out[:window - 1] = accumulate(x[:window - 1])
+    out[window - 1:] = ufunc(h[:n - window + 1], g[window - 1:])
+    return out
+
+
+def rolling_max(values, window):
+    return _rolling_extreme(values, window, np.fmax)
+
+
+def rolling_min(values, window):
+    return _rolling_extreme(values, window, np.fmin)
+
+
+class RollingExtrema:
+    """Máximo y mínimo de las últimas `window` velas con deques monótonas (O(1) amortizado)."""
+
+    def __init__(self, window):
+        self.window = window
+        self.count = 0
+        self._max = deque()  # (posición, valor), valores decrecientes
+        self._min = deque()  # (posición, valor), valores crecientes
+
+    def update(self, high, low):
+        i = self.count
+        self.count += 1
+        while self._max and self._max[-1][1] <= high:
+            self._max.pop()
+        self._max.append((i, high))
+        while self._min and self._min[-1][1] >= low:
+            self._min.pop()
+        self._min.append((i, low))
+        start = i - self.window + 1
+        if self._max[0][0] < start:
+            self._max.popleft()
+        if self._min[0][0] < start:
+            self._min.popleft()
+        return self._max[0][1], self._min[0][1]
+
+
+def rolling_fibonacci(df, lookback=DEFAULT_LOOKBACK):
+    """
+    Niveles de Fibonacci para cada vela de `df` (columnas high/low/close)
+    con las últimas `lookback` velas. Devuelve un DataFrame con el mismo
+    índice y columnas high, low, una por nivel ("23.6%"...), nearest_level,
+    nearest_value y position_ratio. Un rango nulo da ratio 0.5, como en
+    compute_fibonacci_levels.
+    """
+    close = df["close"].to_numpy(dtype=float)
+    high = rolling_max(df["high"].to_numpy(dtype=float), lookback)
+    low = rolling_min(df["low"].to_numpy(dtype=float), lookback)
+    span = high - low
+
+    ratios = np.array([r for _, r in FIBO_LEVELS])
+    levels = high[:, None] - span[:, None] * ratios[None, :]
+    # El 100% es exactamente el mínimo (no high - span, por redondeo)
+    levels[:, -1] = low
+    nearest = np.argmin(np.abs(levels - close[:, None]), axis=1)
+    labels = np.array([name for name, _ in FIBO_LEVELS], dtype=object)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        position = np.where(span == 0, 0.5, (close - low) / span)
+
+    out = pd.DataFrame(levels, index=df.index, columns=labels)
+    out.insert(0, "low", low)
+    out.insert(0, "high", high)
+    out["nearest_level"] = labels[nearest]
+    out["nearest_value"] = levels[np.arange(len(levels)), nearest]
+    out["position_ratio"] = position
+    return out
@@ -0,0 +1,313 @@
+"""
+Indicadores técnicos incrementales.
+
+Reproduce las mismas columnas que `fetch_ohlcv` calcula con pandas_ta
+(RSI, EMA, ATR, Aroon, TRIX, DPO y MACD) pero como máquinas de estado que
+avanzan vela a vela. El estado (medias de Wilder, acumuladores EMA y
+ventanas de Aroon/DPO) es serializable a JSON, así que una ejecución nueva
+sólo procesa las velas que llegaron desde la anterior: O(velas nuevas) en
+lugar de O(histórico).
+
+Las fórmulas siguen a pandas_ta (sin talib): EMA con semilla SMA, RMA de
+Wilder con adjust=False, ATR con semilla SMA del True Range y DPO centrado.
+"""
+import json
+import math
+import os
+from collections import deque
+import numpy as np
+
+NAN = float("nan")
+
+
+class EMA:
+    """EMA con semilla SMA de las primeras `length` posiciones (como pandas_ta)."""
+
+    def __init__(self, length, skip_leading_nan=False):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        # MACD calcula la señal a partir del primer valor válido del MACD
+        self.skip_leading_nan = skip_leading_nan
+        self.pos = 0
+        self.total = 0.0
+        self.count = 0
+        self.value = NAN
+
+    def update(self, x):
+        if self.skip_leading_nan and self.pos == 0 and math.isnan(x):
+            return NAN
+        self.pos += 1
+        if self.pos <= self.length:
+            if not math.isnan(x):
+                self.total += x
+                self.count += 1
+            if self.pos < self.length:
+                return NAN
+            self.value = self.total / self.count if self.count else NAN
+            return self.value
+        if not math.isnan(x):
+            self.value = x if math.isnan(self.value) else self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+
+class RMA:
+    """Media de Wilder (ewm alpha=1/length, adjust=False) desde el primer valor válido."""
+
+    def __init__(self, length):
+        self.alpha = 1.0 / length
+        self.value = NAN
+
+    def update(self, x):
+        if not math.isnan(x):
+            self.value = x if math.isnan(self.value) else self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+
+class RSI:
+    def __init__(self, length=14):
+        self.prev_close = NAN
+        self.gain = RMA(length)
+        self.loss = RMA(length)
+
+    def update(self, close):
+        diff = close - self.prev_close
+        self.prev_close = close
+        gain = self.gain.update(max(diff, 0.0) if not math.isnan(diff) else NAN)
+        loss = self.loss.update(min(diff, 0.0) if not math.isnan(diff) else NAN)
+        denom = gain + abs(loss)
+        if math.isnan(denom) or denom == 0:
+            return NAN
+        return 100.0 * gain / denom
+
+
+class ATR:
+    """ATR de Wilder con semilla SMA de los primeros `length` True Range (ATRr)."""
+
+    def __init__(self, length=14):
+        self.length = length
+        self.prev_close = NAN
+        self.pos = 0
+        self.total = 0.0
+        self.value = NAN
+
+    def update(self, high, low, close):
+        ranges = [abs(high - low), abs(high - self.prev_close), abs(self.prev_close - low)]
+        ranges = [r for r in ranges if not math.isnan(r)]
+        tr = max(ranges) if ranges else NAN
+        self.prev_close = close
+        self.pos += 1
+        if self.pos <= self.length:
+            if not math.isnan(tr):
+                self.total += tr
+            if self.pos < self.length:
+                return NAN
+            self.value = self.total / self.length
+            return self.value
+        if not math.isnan(tr):
+            self.value = (tr + (self.length - 1) * self.value) / self.length
+        return self.value
+
+
+class Aroon:
+    """Aroon sobre una ventana de `length + 1` velas. Devuelve (down, up, osc)."""
+
+    def __init__(self, length=14):
+        self.length = length
+        self.highs = deque(maxlen=length + 1)
+        self.lows = deque(maxlen=length + 1)
+
+    def update(self, high, low):
+        self.highs.append(high)
+        self.lows.append(low)
+        if len(self.highs) <= self.length:
+            return NAN, NAN, NAN
+        highs = np.array(self.highs)
+        lows = np.array(self.lows)
+        if np.isnan(highs).any() or np.isnan(lows).any():
+            return NAN, NAN, NAN
+        # Velas desde el máximo/mínimo más reciente
+        since_high = int(np.argmax(highs[::-1]))
+        since_low = int(np.argmin(lows[::-1]))
+        up = 100.0 * (1 - since_high / self.length)
+        down = 100.0 * (1 - since_low / self.length)
+        return down, up, up - down
+
+
+class TRIX:
+    """Triple EMA encadenada, su variación porcentual y la media de señal."""
+
+    def __init__(self, length=14, signal=9):
+        self.ema1 = EMA(length)
+        self.ema2 = EMA(length)
+        self.ema3 = EMA(length)
+        self.prev = NAN
+        self.window = deque(maxlen=signal)
+
+    def update(self, close):
+        e3 = self.ema3.update(self.ema2.update(self.ema1.update(close)))
+        trix = 100.0 * (e3 / self.prev - 1) if not (math.isnan(e3) or math.isnan(self.prev)) else NAN
+        self.prev = e3
+        self.window.append(trix)
+        if len(self.window) < self.window.maxlen or any(math.isnan(v) for v in self.window):
+            return trix, NAN
+        return trix, sum(self.window) / len(self.window)
+
+
+class DPO:
+    """
+    DPO centrado de pandas_ta: dpo[i] = close[i] - sma[i + t].
+
+    Mira `t` velas al futuro, así que cada vela nueva completa el valor de
+    la vela de hace `t` posiciones; update() devuelve ese valor atrasado.
+    """
+
+    def __init__(self, length=14):
+        self.length = length
+        self.t = int(0.5 * length) + 1
+        self.closes = deque(maxlen=max(length, self.t + 1))
+
+    def update(self, close):
+        self.closes.append(close)
+        if len(self.closes) < self.length or len(self.closes) < self.t + 1:
+            return NAN
+        window = list(self.closes)[-self.length:]
+        sma = sum(window) / self.length
+        return self.closes[-1 - self.t] - sma
+
+
+class MACD:
+    """MACD (12, 26, 9). Devuelve (macd, histograma, señal)."""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal, skip_leading_nan=True)
+
+    def update(self, close):
+        macd = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal.update(macd)
+        return macd, macd - signal, signal
+
+
+# Mismo orden y nombres que las columnas que añade pandas_ta en fetch_ohlcv
+INDICATOR_COLUMNS = [
+    "RSI_14", "EMA_20", "ATRr_14",
+    "AROOND_14", "AROONU_14", "AROONOSC_14",
+    "TRIX_14_9", "TRIXs_14_9",
+    "DPO_14",
+    "MACD_12_26_9", "MACDh_12_26_9", "MACDs_12_26_9",
+]
+DPO_COLUMN = INDICATOR_COLUMNS.index("DPO_14")
+
+_CLASSES = {cls.__name__: cls for cls in (EMA, RMA, RSI, ATR, Aroon, TRIX, DPO, MACD)}
+
+
+class IndicatorState:
+    """Estado conjunto de todos los indicadores de fetch_ohlcv."""
+
+    def __init__(self):
+        self.rows = 0  # velas procesadas (posición absoluta de la siguiente)
+        self.rsi = RSI(14)
+        self.ema = EMA(20)
+        self.atr = ATR(14)
+        self.aroon = Aroon(14)
+        self.trix = TRIX(14, 9)
+        self.dpo = DPO(14)
+        self.macd = MACD(12, 26, 9)
+
+    def update(self, high, low, close):
+        """
+        Avanza una vela. Devuelve (fila, revisión) donde `fila` son los
+        valores de INDICATOR_COLUMNS para esta vela (DPO aún NaN) y `revisión`
+        es (posición, valor) del DPO que se completa `t` velas atrás, o None.
+        """
+        row = [
+            self.rsi.update(close),
+            self.ema.update(close),
+            self.atr.update(high, low, close),
+            *self.aroon.update(high, low),
+            *self.trix.update(close),
+            NAN,
+            *self.macd.update(close),
+        ]
+        dpo = self.dpo.update(close)
+        target = self.rows - self.dpo.t
+        self.rows += 1
+        revision = (target, dpo) if target >= 0 and not math.isnan(dpo) else None
+        return row, revision
+
+    def advance(self, high, low, close):
+        """
+        Procesa un bloque de velas nuevas. Devuelve un array (n, columnas)
+        y la lista de revisiones DPO en posiciones absolutas (pueden caer
+        en velas de ejecuciones anteriores).
+        """
+        high = np.asarray(high, dtype=float)
+        low = np.asarray(low, dtype=float)
+        close = np.asarray(close, dtype=float)
+        out = np.full((close.size, len(INDICATOR_COLUMNS)), np.nan)
+        revisions = []
+        start = self.rows
+        for i in range(close.size):
+            row, revision = self.update(high[i], low[i], close[i])
+            out[i] = row
+            if revision is not None:
+                if revision[0] >= start:
+                    out[revision[0] - start, DPO_COLUMN] = revision[1]
+                else:
+                    revisions.append(revision)
+        return out, revisions
+
+    # --- Persistencia ---
+    def to_dict(self):
+        return {"rows": self.rows, "indicators": {
+            name: _dump(getattr(self, name))
+            for name in ("rsi", "ema", "atr", "aroon", "trix", "dpo", "macd")
+        }}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls.__new__(cls)
+        state.rows = data["rows"]
+        for name, obj in data["indicators"].items():
+            setattr(state, name, _load(obj))
+        return state
+
+
+def _dump(obj):
+    fields = {}
+    for key, value in vars(obj).items():
+        if isinstance(value, deque):
+            value = {"deque": list(value), "maxlen": value.maxlen}
+        elif hasattr(value, "__dict__"):
+            value = _dump(value)
+        fields[key] = value
+    return {"type": type(obj).__name__, "fields": fields}
+
+
+def _load(data):
+    obj = _CLASSES[data["type"]].__new__(_CLASSES[data["type"]])
+    for key, value in data["fields"].items():
+        if isinstance(value, dict) and "deque" in value:
+            value = deque(value["deque"], maxlen=value["maxlen"])
+        elif isinstance(value, dict) and "type" in value:
+            value = _load(value)
+        setattr(obj, key, value)
+    return obj
+
+
+def save_indicator_state(path, state):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state.to_dict(), f)
+    os.replace(tmp, path)
+
+
+def load_indicator_state(path):
+    """Devuelve el IndicatorState guardado o None si no existe o está corrupto."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return IndicatorState.from_dict(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return None
@@ -0,0 +1,228 @@
+"""
+Instrumentación ligera: spans de tiempo, contadores e histogramas.
+
+    from ss91_v3 import metrics
+
+    with metrics.span("yfinance_download"):
+        ...
+
+    @metrics.timed("factor_macro")
+    def _get_macro_factors(...): ...
+
+    metrics.inc("ss91_factor_fallback_total", source="macro")
+
+Cada span alimenta el histograma `ss91_span_seconds{span=...}` y el resumen
+de la ejecución (`run_timings()`), que collector y decitor guardan en la
+sección "timings" del snapshot y de la decisión. `write_prometheus()` vuelca
+todo en formato texto de Prometheus (textfile collector de node_exporter).
+
+Con SS91_METRICS=0 (o `disable()`), `span` devuelve un context manager
+vacío compartido y `timed` llama directamente a la función.
+"""
+import functools
+import os
+import threading
+import time
+from ss91_v3.utils import log
+
+METRICS_PATH = os.getenv("SS91_METRICS_FILE", os.path.join("results", "metrics", "ss91.prom"))
+SPAN_METRIC = "ss91_span_seconds"
+SPAN_ERRORS = "ss91_span_errors_total"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_HELP = {
+    SPAN_METRIC: "Duración de cada etapa instrumentada (segundos).",
+    SPAN_ERRORS: "Spans que terminaron con excepción.",
+    "ss91_factor_fallback_total": "Fuentes de factores que usaron valores por defecto.",
+}
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class Registry:
+    def __init__(self, enabled=True, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}    # (nombre, labels) -> valor
+            self.histograms = {}  # (nombre, labels) -> _Histogram
+            self.timings = {}     # span -> segundos acumulados en esta ejecución
+
+    def inc(self, name, value=1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = _Histogram(self.buckets)
+            hist.observe(value)
+
+    def record_span(self, name, elapsed, error=False):
+        self.observe(SPAN_METRIC, elapsed, span=name)
+        if error:
+            self.inc(SPAN_ERRORS, span=name)
+        with self._lock:
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+
+    # --- Exportación ---
+    def run_timings(self):
+        """{span: segundos} de la ejecución en curso (para snapshot/decisión)."""
+        with self._lock:
+            return {name: round(value, 4) for name, value in self.timings.items()}
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_labels(labels)} {value:g}")
+        for (name, labels), hist in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(hist.buckets, hist.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', f'{bound:g}'),))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {hist.count}")
+            lines.append(f"{name}_sum{_labels(labels)} {hist.sum:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=METRICS_PATH):
+        """Escritura atómica (el textfile collector nunca ve un archivo a medias)."""
+        if not self.enabled:
+            return None
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp, path)
+            return path
+        except OSError as e:
+            log.warning(f"No se pudieron exportar las métricas a {path}: {e}")
+            return None
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+REGISTRY = Registry(enabled=os.getenv("SS91_METRICS", "1") != "0")
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        REGISTRY.record_span(self.name, time.perf_counter() - self.start, error=exc_type is not None)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name):
+    """Context manager que mide el bloque como el span `name`."""
+    return _Span(name) if REGISTRY.enabled else _NOOP
+
+
+def timed(name=None):
+    """Decorador: mide cada llamada como el span `name` (por defecto el nombre de la función)."""
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return fn(*args, **kwargs)
+            with _Span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def inc(name, value=1.0, **labels):
+    if REGISTRY.enabled:
+        REGISTRY.inc(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    if REGISTRY.enabled:
+        REGISTRY.observe(name, value, **labels)
+
+
+def run_timings():
+    return REGISTRY.run_timings()
+
+
+def write_prometheus(path=METRICS_PATH):
+    return REGISTRY.write_prometheus(path)
+
+
+def enable():
+    REGISTRY.enabled = True
+
+
+def disable():
+    REGISTRY.enabled = False
+
+
+def reset():
+    REGISTRY.reset()
@@ -0,0 +1,89 @@
+"""
+Recolección multi-activo.
+
+Descarga en bloque el par base y los `related_assets` de fx_config.json,
+calcula los indicadores de cada símbolo en un pool de procesos y construye
+una sección de snapshot con los técnicos por activo y features cruzadas
+(correlaciones y betas contra el par base, acuerdo con la relación esperada).
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from ss91_v3.correlation import aligned_returns
+from ss91_v3.data_pipeline import download_ohlcv_batch, compute_indicators, summarize_technicals
+from ss91_v3.utils import log, load_fx_config
+
+# Signo esperado de la correlación según la relación declarada en fx_config.json
+RELATION_SIGN = {"directa": 1, "inversa": -1}
+CORR_WINDOWS = (20, 60)
+
+
+def compute_all(frames, compute=compute_indicators, workers=None):
+    """Aplica `compute` a cada DataFrame en paralelo (un proceso por núcleo)."""
+    symbols = list(frames)
+    workers = min(workers or os.cpu_count() or 1, len(symbols)) or 1
+    if workers == 1:
+        return {s: compute(frames[s]) for s in symbols}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(symbols, pool.map(compute, [frames[s] for s in symbols])))
+
+
+def cross_asset_features(frames, base, relations=None, windows=CORR_WINDOWS):
+    """
+    Features de cada activo relacionado frente al par base, sobre los
+    retornos alineados por fecha (los mercados con otro calendario se
+    rellenan con el último cierre).
+    """
+    relations = relations or {}
+    returns = aligned_returns(frames)
+    features = {}
+    for sym in returns.columns:
+        if sym == base:
+            continue
+        pair = returns[[base, sym]]
+        entry = {"relation": relations.get(sym)}
+        for w in windows:
+            window = pair.iloc[-w:]
+            corr = window[base].corr(window[sym]) if len(window) > 2 else np.nan
+            var = window[base].var()
+            entry[f"corr_{w}"] = None if pd.isna(corr) else round(float(corr), 6)
+            entry[f"beta_{w}"] = None if not var else round(float(window[base].cov(window[sym]) / var), 6)
+        entry["return_20"] = round(float((1 + pair[sym].iloc[-20:]).prod() - 1), 6)
+        expected = RELATION_SIGN.get(relations.get(sym))
+        corr = entry[f"corr_{max(windows)}"]
+        # 1.0 = se comporta como dice la configuración, 0.0 = al revés
+        entry["relation_agreement"] = None if expected is None or corr is None else float(np.sign(corr) == expected)
+        features[sym] = entry
+    return features
+
+
+def multi_asset_section(frames, config):
+    """Sección `assets` + `cross_asset` del snapshot combinado."""
+    base = config["base_pair"]
+    relations = {a["symbol"]: a.get("relation") for a in config.get("related_assets", [])}
+    assets = {}
+    for sym, df in frames.items():
+        latest, fibo = summarize_technicals(df)
+        assets[sym] = {"ohlc_latest": latest, "fibonacci": fibo}
+    return {
+        "assets": assets,
+        "cross_asset": cross_asset_features(frames, base, relations) if base in frames else {},
+    }
+
+
+def collect_multi_asset(config=None, period="1y", interval="1d", workers=None,
+                        downloader=download_ohlcv_batch, compute=compute_indicators):
+    """
+    Descarga todos los símbolos configurados en un lote, calcula sus
+    indicadores en paralelo y devuelve `(frames, sección)`.
+    """
+    config = config or load_fx_config()
+    symbols = [config["base_pair"]] + [a["symbol"] for a in config.get("related_assets", [])]
+    log.info(f"Descargando {len(symbols)} símbolos en bloque: {', '.join(symbols)}")
+    raw = downloader(symbols, interval=interval, period=period)
+    if config["base_pair"] not in raw:
+        raise ValueError(f"No se pudieron obtener datos del par base {config['base_pair']}.")
+    frames = compute_all(raw, compute=compute, workers=workers)
+    log.info(f"Indicadores calculados para {len(frames)} símbolos.")
+    return frames, multi_asset_section(frames, config)
@@ -0,0 +1,165 @@
+"""
+Planificador de etapas en proceso (DAG).
+
+Cada `Stage` declara de qué etapas depende; `Pipeline.run` lanza en un pool
+de hilos todas las etapas cuyas dependencias ya terminaron, así que las
+independientes corren en paralelo. Los resultados pasan en memoria: una
+etapa recibe los de sus dependencias como argumentos con su nombre.
+
+Cada etapa puede reintentarse (`retries`, con backoff exponencial) y tener
+un `load` que recupera su salida del disco, para ejecutar una etapa suelta
+(cron) sin volver a ejecutar las anteriores.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from ss91_v3.utils import log
+from ss91_v3 import metrics
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: object
+    deps: tuple = ()
+    retries: int = 0
+    backoff: float = 1.0
+    load: object = None  # callable sin argumentos: salida guardada de la etapa
+
+
+@dataclass
+class StageReport:
+    status: str = "pending"  # pending | ok | failed | skipped | loaded
+    elapsed_s: float = 0.0
+    attempts: int = 0
+    error: str = None
+    started_at: float = None
+
+
+class PipelineError(RuntimeError):
+    pass
+
+
+class Pipeline:
+    def __init__(self, stages, workers=4, sleep=time.sleep):
+        self.stages = {s.name: s for s in stages}
+        self.workers = workers
+        self.sleep = sleep
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise PipelineError(f"La etapa '{stage.name}' depende de '{dep}', que no existe.")
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        order, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise PipelineError(f"Ciclo de dependencias en la etapa '{name}'.")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def upstream(self, targets):
+        """Etapas necesarias para `targets` (incluidas), en orden topológico."""
+        needed = set()
+
+        def visit(name):
+            if name not in needed:
+                needed.add(name)
+                for dep in self.stages[name].deps:
+                    visit(dep)
+
+        for name in targets:
+            if name not in self.stages:
+                raise PipelineError(f"Etapa desconocida: '{name}'.")
+            visit(name)
+        return [n for n in self.order if n in needed]
+
+    def _call(self, stage, results, report):
+        kwargs = {dep: results[dep] for dep in stage.deps}
+        report.started_at = time.perf_counter()
+        for attempt in range(stage.retries + 1):
+            report.attempts = attempt + 1
+            try:
+                with metrics.span(f"stage_{stage.name}"):
+                    return stage.fn(**kwargs)
+            except Exception as e:
+                report.error = f"{type(e).__name__}: {e}"
+                if attempt == stage.retries:
+                    raise
+                wait_s = stage.backoff * 2 ** attempt
+                log.warning(f"[PIPELINE] '{stage.name}' falló ({e}). Reintento {attempt + 1}/{stage.retries} en {wait_s:.1f}s...")
+                self.sleep(wait_s)
+
+    def run(self, targets=None, with_deps=True, results=None):
+        """
+        Ejecuta `targets` (por defecto todas las etapas). Con with_deps=True
+        también sus dependencias; con False, las dependencias se toman de
+        `results` o de su `load`. Devuelve `(resultados, informe)`; las
+        etapas cuyas dependencias fallaron quedan como "skipped".
+        """
+        targets = list(targets or self.order)
+        names = self.upstream(targets) if with_deps else [n for n in self.order if n in targets]
+        results = dict(results or {})
+        report = {name: StageReport() for name in names}
+
+        # Dependencias que no se ejecutan en esta corrida
+        for name in names:
+            for dep in self.stages[name].deps:
+                if dep in names or dep in results:
+                    continue
+                loader = self.stages[dep].load
+                if loader is None:
+                    raise PipelineError(f"'{name}' necesita '{dep}', que no se ejecuta y no tiene `load`.")
+                results[dep] = loader()
+                report[dep] = StageReport(status="loaded")
+
+        pending = list(names)
+        running = {}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ss91_stage") as pool:
+            while pending or running:
+                for name in list(pending):
+                    deps = self.stages[name].deps
+                    states = [report[d].status if d in report else "ok" for d in deps]
+                    if any(s in ("failed", "skipped") for s in states):
+                        report[name].status = "skipped"
+                        pending.remove(name)
+                        log.warning(f"[PIPELINE] '{name}' omitida: falló una dependencia.")
+                    elif all(s in ("ok", "loaded") for s in states):
+                        pending.remove(name)
+                        running[pool.submit(self._call, self.stages[name], results, report[name])] = name
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    stage_report = report[name]
+                    stage_report.elapsed_s = round(time.perf_counter() - stage_report.started_at, 4)
+                    try:
+                        results[name] = future.result()
+                        stage_report.status = "ok"
+                        stage_report.error = None
+                        log.info(f"[PIPELINE] '{name}' ok en {stage_report.elapsed_s}s ({stage_report.attempts} intento/s).")
+                    except Exception as e:
+                        stage_report.status = "failed"
+                        log.error(f"[PIPELINE] '{name}' falló tras {stage_report.attempts} intento/s: {e}")
+        log.info(f"[PIPELINE] Ciclo completo en {time.perf_counter() - start:.2f}s.")
+        return results, report
+
+
+def report_to_dict(report):
+    """Informe serializable ({etapa: {status, elapsed_s, attempts, error}})."""
+    return {name: {"status": r.status, "elapsed_s": r.elapsed_s, "attempts": r.attempts, "error": r.error}
+            for name, r in report.items()}
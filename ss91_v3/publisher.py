@@ -0,0 +1,170 @@
+"""
+Publicación por lotes en el repositorio de datos de GitHub.
+
+En vez de un PUT a la API de contenidos por archivo, `GitHubPublisher`
+acumula los archivos de una ejecución (snapshots, decisiones...) y los sube
+en un único commit con la API de git (trees / commits / refs):
+
+    GET   git/ref/heads/{rama}      -> commit actual
+    GET   git/commits/{sha}         -> árbol base
+    POST  git/trees                 -> árbol nuevo con los archivos cambiados
+    POST  git/commits               -> commit con ese árbol
+    PATCH git/refs/heads/{rama}     -> mover la rama
+
+Los archivos cuyo hash de contenido coincide con lo último publicado se
+omiten. Todas las peticiones van por una sesión con pool de conexiones y se
+reintentan con backoff exponencial ante errores de red, 429 y 5xx.
+"""
+import hashlib
+import json
+import os
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from ss91_v3.utils import log
+from ss91_v3 import metrics
+
+GITHUB_API = "https://api.github.com"
+PUBLISHED_STATE_PATH = os.path.join("results", "state", "published.json")
+RETRY_STATUS = {429, 500, 502, 503, 504}
+REQUEST_TIMEOUT = (3.05, 15)
+
+
+def blob_sha(content):
+    """SHA del blob tal como lo calcula git (el mismo que devuelve GitHub)."""
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class GitHubPublishError(RuntimeError):
+    pass
+
+
+class GitHubPublisher:
+    def __init__(self, user=None, repo=None, token=None, branch=None, api_url=None,
+                 session=None, state_path=PUBLISHED_STATE_PATH, retries=3, backoff=0.5,
+                 sleep=time.sleep):
+        self.user = user or os.getenv("GITHUB_USER")
+        self.repo = repo or os.getenv("DATA_REPO", "ss91v3")
+        self.token = token or os.getenv("GITHUB_TOKEN")
+        self.branch = branch or os.getenv("DATA_BRANCH", "main")
+        self.api_url = (api_url or os.getenv("GITHUB_API_URL", GITHUB_API)).rstrip("/")
+        self.state_path = state_path
+        self.retries = retries
+        self.backoff = backoff
+        self.sleep = sleep
+        self.session = session or self._make_session()
+        self.pending = {}
+        self.published = self._load_state()
+
+    @staticmethod
+    def _make_session():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    # --- Estado de lo publicado (ruta -> blob sha) ---
+    def _load_state(self):
+        if not self.state_path:
+            return {}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.published, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.state_path)
+
+    # --- Archivos de la ejecución ---
+    def add(self, path, content):
+        """Añade (o reemplaza) un archivo al lote. `path` es la ruta en el repo."""
+        self.pending[path.lstrip("/")] = content
+
+    def add_dir(self, local_dir, prefix):
+        """Añade todos los archivos de `local_dir` bajo `prefix/` en el repo."""
+        if not os.path.isdir(local_dir):
+            return
+        for name in sorted(os.listdir(local_dir)):
+            local_path = os.path.join(local_dir, name)
+            if os.path.isfile(local_path):
+                with open(local_path, "r", encoding="utf-8") as f:
+                    self.add(f"{prefix.rstrip('/')}/{name}", f.read())
+
+    def changed(self):
+        """Archivos del lote cuyo contenido difiere de lo último publicado."""
+        return {path: content for path, content in self.pending.items()
+                if self.published.get(path) != blob_sha(content)}
+
+    # --- HTTP ---
+    def _request(self, method, endpoint, **kwargs):
+        url = f"{self.api_url}/repos/{self.user}/{self.repo}/{endpoint}"
+        headers = {"Authorization": f"token {self.token}", "Accept": "application/vnd.github.v3+json"}
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.request(method, url, headers=headers, timeout=REQUEST_TIMEOUT, **kwargs)
+                if response.status_code not in RETRY_STATUS:
+                    response.raise_for_status()
+                    return response.json()
+                error = f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+            metrics.inc("ss91_github_retries_total")
+            if attempt < self.retries:
+                wait = self.backoff * 2 ** attempt
+                log.warning(f"[GITHUB] {method} {endpoint} falló ({error}). Reintento en {wait:.1f}s...")
+                self.sleep(wait)
+        raise GitHubPublishError(f"{method} {endpoint} falló tras {self.retries + 1} intentos: {error}")
+
+    # --- Publicación ---
+    @metrics.timed("github_publish")
+    def publish(self, message=None):
+        """
+        Sube los archivos cambiados del lote en un solo commit. Devuelve el
+        SHA del commit, o None si no había nada que publicar.
+        """
+        if not all([self.user, self.repo, self.token]):
+            raise ValueError("GitHub credentials missing in .env")
+
+        files = self.changed()
+        skipped = len(self.pending) - len(files)
+        metrics.inc("ss91_github_files_total", len(files), status="uploaded")
+        metrics.inc("ss91_github_files_total", skipped, status="unchanged")
+        if not files:
+            log.info(f"[GITHUB] Sin cambios ({skipped} archivos sin modificar).")
+            self.pending = {}
+            return None
+
+        head = self._request("GET", f"git/ref/heads/{self.branch}")["object"]["sha"]
+        base_tree = self._request("GET", f"git/commits/{head}")["tree"]["sha"]
+        tree = self._request("POST", "git/trees", json={
+            "base_tree": base_tree,
+            "tree": [{"path": path, "mode": "100644", "type": "blob", "content": content}
+                     for path, content in sorted(files.items())],
+        })["sha"]
+
+        commit = None
+        if tree != base_tree:
+            if message is None:
+                message = f"Update {next(iter(files))}" if len(files) == 1 else f"Update {len(files)} files"
+            commit = self._request("POST", "git/commits", json={
+                "message": message, "tree": tree, "parents": [head],
+            })["sha"]
+            self._request("PATCH", f"git/refs/heads/{self.branch}", json={"sha": commit})
+            log.info(f"[GITHUB] Commit {commit[:7]}: {len(files)} archivos subidos, {skipped} sin cambios.")
+        else:
+            # El repo ya tenía ese contenido (p.ej. estado local perdido)
+            log.info(f"[GITHUB] El repositorio ya estaba al día ({len(files)} archivos).")
+
+        self.published.update({path: blob_sha(content) for path, content in files.items()})
+        self._save_state()
+        self.pending = {}
+        return commit
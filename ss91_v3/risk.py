@@ -1,3 +1,7 @@
+import numpy as np
+import pandas as pd
+from ss91_v3.fibonacci import rolling_max, rolling_min
+
 def calc_stop_loss(entry_price: float, atr: float, direction: str):
     if atr is None:
         return None
@@ -16,3 +20,176 @@ def calc_take_profit(entry_price: float, wave1_size: float, direction: str):
     elif direction == 'SELL':
         return float(entry_price - mult * wave1_size)
     return None
+
+
+# =============================================================================
+# Versiones vectorizadas y simulador de operaciones
+# =============================================================================
+# Direcciones numéricas como en strategy.py: +1 BUY, -1 SELL, 0 sin operación.
+ATR_STOP_MULT = 2.0
+FIBO_TP_MULT = 1.618
+DEFAULT_WAVE_LOOKBACK = 20
+_DIRECTIONS = {"BUY": 1, "SELL": -1, "HOLD": 0}
+
+
+def as_directions(signals):
+    """Señales como array int8 (+1/-1/0). Acepta números o "BUY"/"SELL"/"HOLD"."""
+    signals = np.asarray(signals)
+    if signals.dtype.kind in "OUS":
+        return np.array([_DIRECTIONS.get(str(s), 0) for s in signals], dtype=np.int8)
+    return np.sign(signals).astype(np.int8)
+
+
+def calc_stop_loss_array(entry_price, atr, direction, mult=ATR_STOP_MULT):
+    """calc_stop_loss para arrays: NaN donde no hay dirección o ATR."""
+    entry_price = np.asarray(entry_price, dtype=float)
+    atr = np.asarray(atr, dtype=float)
+    direction = as_directions(direction)
+    return np.where(direction != 0, entry_price - direction * mult * atr, np.nan)
+
+
+def calc_take_profit_array(entry_price, wave1_size, direction, mult=FIBO_TP_MULT):
+    """calc_take_profit para arrays: NaN donde no hay dirección; onda NaN cuenta como 0."""
+    entry_price = np.asarray(entry_price, dtype=float)
+    wave1_size = np.nan_to_num(np.asarray(wave1_size, dtype=float), nan=0.0)
+    direction = as_directions(direction)
+    return np.where(direction != 0, entry_price + direction * mult * wave1_size, np.nan)
+
+
+def swing_size(high, low, lookback=DEFAULT_WAVE_LOOKBACK):
+    """Tamaño de la última onda: rango máximo-mínimo de las últimas `lookback` velas."""
+    return rolling_max(high, lookback) - rolling_min(low, lookback)
+
+
+def _first_exit(high, low, start, end, side, stop, target):
+    """
+    Primera vela en [start, end) que toca el stop o el objetivo. Busca por
+    bloques crecientes con máscaras NumPy (nunca vela a vela). Si ambos se
+    tocan en la misma vela se asume el stop (criterio conservador).
+    """
+    i, step = start, 32
+    while i < end:
+        j = min(end, i + step)
+        if side > 0:
+            stop_hit = low[i:j] <= stop
+            target_hit = high[i:j] >= target
+        else:
+            stop_hit = high[i:j] >= stop
+            target_hit = low[i:j] <= target
+        hit = stop_hit | target_hit
+        if hit.any():
+            k = int(np.argmax(hit))
+            return i + k, ("stop" if stop_hit[k] else "target")
+        i, step = j, step * 2
+    return None, None
+
+
+def simulate_trades(df, signals, atr=None, wave1=None, stop_mult=ATR_STOP_MULT, tp_mult=FIBO_TP_MULT,
+                    max_bars=None, cost=0.0, wave_lookback=DEFAULT_WAVE_LOOKBACK, atr_col="ATRr_14"):
+    """
+    Simula operaciones a partir de señales BUY/SELL.
+
+    Una posición a la vez: se abre al cierre de una vela con señal estando
+    fuera de mercado, con stop = entrada -/+ stop_mult*ATR y objetivo =
+    entrada +/- tp_mult*onda (por defecto el rango de las últimas
+    `wave_lookback` velas). Se cierra en la primera vela posterior cuyo
+    máximo/mínimo toca stop u objetivo, al cierre tras `max_bars` velas
+    ("timeout") o en la última vela ("end"). `cost` se cobra por lado.
+
+    Devuelve `(ledger, equity)`: un DataFrame con una fila por operación y
+    otro con position, pnl y equity por vela (mark-to-market al cierre).
+    """
+    high = df["high"].to_numpy(dtype=float)
+    low = df["low"].to_numpy(dtype=float)
+    close = df["close"].to_numpy(dtype=float)
+    n = close.size
+    index = pd.Index(df["date"] if "date" in df.columns else df.index, name="date")
+    directions = as_directions(signals)
+    atr = df[atr_col].to_numpy(dtype=float) if atr is None else np.broadcast_to(np.asarray(atr, dtype=float), n)
+    wave1 = swing_size(high, low, wave_lookback) if wave1 is None else np.broadcast_to(np.asarray(wave1, dtype=float), n)
+
+    stops = calc_stop_loss_array(close, atr, directions, stop_mult)
+    targets = calc_take_profit_array(close, wave1, directions, tp_mult)
+    # Candidatas: señal con stop válido
+    candidates = np.flatnonzero((directions != 0) & np.isfinite(stops))
+
+    trades = []
+    t_min = 0
+    while True:
+        k = np.searchsorted(candidates, t_min)
+        if k >= candidates.size:
+            break
+        t = int(candidates[k])
+        if t >= n - 1:
+            break
+        side = int(directions[t])
+        end = n if max_bars is None else min(n, t + 1 + max_bars)
+        x, reason = _first_exit(high, low, t + 1, end, side, stops[t], targets[t])
+        if x is None:
+            x, reason = end - 1, ("timeout" if end < n else "end")
+            exit_price = close[x]
+        else:
+            exit_price = stops[t] if reason == "stop" else targets[t]
+        trades.append((t, x, side, close[t], stops[t], targets[t], exit_price, reason))
+        t_min = x  # se puede volver a entrar al cierre de la vela de salida
+
+    columns = ["entry_i", "exit_i", "side", "entry", "stop", "target", "exit", "reason"]
+    ledger = pd.DataFrame(trades, columns=columns)
+
+    # --- Curva de equity vectorizada ---
+    # Cada operación arriesga todo el capital que había al abrirla: dentro de
+    # la operación equity = capital_entrada * (1 + side*(precio/entrada - 1)),
+    # así el capital final es el producto de los retornos de las operaciones.
+    position = np.zeros(n, dtype=np.int8)
+    equity_curve = np.ones(n)
+    if len(ledger):
+        entry_i = ledger["entry_i"].to_numpy()
+        exit_i = ledger["exit_i"].to_numpy()
+        sides = ledger["side"].to_numpy()
+        ledger["entry_time"] = index[entry_i]
+        ledger["exit_time"] = index[exit_i]
+        ledger["bars"] = exit_i - entry_i
+        ledger["return"] = sides * (ledger["exit"] / ledger["entry"] - 1.0) - 2 * cost
+
+        # Operación vigente en cada vela de (entrada, salida]; -1 fuera de mercado
+        delta = np.zeros(n + 1, dtype=np.int64)
+        np.add.at(delta, entry_i + 1, np.arange(len(ledger)) + 1)
+        np.add.at(delta, exit_i + 1, -(np.arange(len(ledger)) + 1))
+        trade = np.cumsum(delta[:n]) - 1
+        inside = trade >= 0
+        position[inside] = sides[trade[inside]]
+
+        # Capital acumulado por operaciones cerradas (cambia sólo en las salidas)
+        closed = np.ones(n)
+        closed[exit_i] = 1.0 + ledger["return"].to_numpy()
+        closed = np.cumprod(closed)
+        before = np.concatenate([[1.0], closed[:-1]])
+        mtm = 1.0 + position * (close / ledger["entry"].to_numpy()[np.maximum(trade, 0)] - 1.0) - cost
+        equity_curve = np.where(inside, before * mtm, closed)
+        equity_curve[exit_i] = closed[exit_i]
+
+    pnl = np.zeros(n)
+    pnl[1:] = equity_curve[1:] / equity_curve[:-1] - 1.0
+    equity = pd.DataFrame({
+        "position": position,
+        "pnl": pnl,
+        "equity": equity_curve,
+    }, index=index)
+    return ledger, equity
+
+
+def summarize_trades(ledger):
+    """Estadísticas del libro de operaciones de simulate_trades."""
+    if ledger.empty:
+        return {"n_trades": 0, "win_rate": 0.0, "avg_return": 0.0, "avg_bars": 0.0,
+                "stops": 0, "targets": 0}
+    returns = ledger["return"].to_numpy()
+    reasons = ledger["reason"].value_counts()
+    return {
+        "n_trades": int(len(ledger)),
+        "win_rate": float((returns > 0).mean()),
+        "avg_return": float(returns.mean()),
+        "avg_bars": float(ledger["bars"].mean()),
+        "stops": int(reasons.get("stop", 0)),
+        "targets": int(reasons.get("target", 0)),
+    }
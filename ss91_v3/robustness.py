@@ -0,0 +1,259 @@
+"""
+Robustez Monte Carlo de un backtest mediante remuestreo por bloques.
+
+Un único backtest histórico dice poco de si la ventaja es real. Aquí se
+generan miles de historias alternativas a partir de los retornos y las
+posiciones del backtest y se recalculan PnL, drawdown, Sharpe y tasa de
+acierto de cada una:
+
+- "paths": remuestrea por bloques los pares (retorno, posición) juntos.
+  Da la dispersión de las métricas de la estrategia tal cual opera.
+- "null": mantiene las posiciones en su sitio y remuestrea sólo los
+  retornos. Rompe la relación señal -> retorno conservando la
+  autocorrelación del mercado; el p-valor es la fracción de historias
+  nulas que igualan o mejoran la métrica observada.
+
+Métodos de remuestreo ("method"):
+
+- "stationary": bootstrap estacionario (bloques de longitud geométrica
+  con media `block_size`, circular).
+- "moving": bloques de longitud fija con inicio aleatorio.
+- "shuffle": el histórico se parte en bloques contiguos (regímenes) que
+  se barajan sin reemplazo.
+
+Los índices de remuestreo se generan por lotes como arrays NumPy
+(lote x velas); cada lote tiene su propia semilla derivada de `seed`, así
+que el resultado no depende del número de workers. Cada worker sólo tiene
+en memoria un lote a la vez (`batch_size`, por defecto ~2M celdas).
+
+    python -m ss91_v3.robustness --period 10y --samples 10000 --workers 4
+
+La CLI hace el backtest con sentimiento y Trends point-in-time del
+histórico de factores (backtest_stub.run_backtest); sin factores
+registrados no se ejecuta, porque con los neutros no hay posiciones.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from ss91_v3.backtest import summarize_arrays
+from ss91_v3.utils import log
+
+ROBUSTNESS_DIR = os.path.join("results", "robustness")
+METHODS = ("stationary", "moving", "shuffle")
+MODES = ("paths", "null")
+METRICS = ("total_return", "sharpe", "max_drawdown", "hit_rate")
+MAX_BATCH_CELLS = 2_000_000  # ~16 MB por array float64 del lote
+
+_ARRAYS = None  # (returns, held, turnover) del proceso worker
+
+
+def default_block_size(n):
+    """Regla habitual n^(1/3) para la longitud media de bloque."""
+    return max(1, int(round(n ** (1.0 / 3.0))))
+
+
+def resample_indices(n, n_samples, block_size, rng, method="stationary"):
+    """Array int (n_samples, n) de índices remuestreados por bloques."""
+    if method not in METHODS:
+        raise ValueError(f"Método desconocido: {method} (opciones: {', '.join(METHODS)})")
+    block_size = max(1, min(int(block_size), n))
+    steps = np.arange(n)
+    if method == "stationary":
+        # Empieza bloque nuevo con probabilidad 1/block_size; si no, sigue al índice anterior
+        new_block = rng.random((n_samples, n)) < 1.0 / block_size
+        new_block[:, 0] = True
+        starts = rng.integers(0, n, size=(n_samples, n))
+        block_start = np.maximum.accumulate(np.where(new_block, steps, 0), axis=1)
+        first = np.take_along_axis(starts, block_start, axis=1)
+        return (first + steps - block_start) % n
+    n_blocks = -(-n // block_size)
+    offsets = np.arange(block_size)
+    if method == "moving":
+        starts = rng.integers(0, n - block_size + 1, size=(n_samples, n_blocks))
+        return (starts[:, :, None] + offsets).reshape(n_samples, -1)[:, :n]
+    # shuffle: cada bloque aparece exactamente una vez, en otro orden
+    order = rng.permuted(np.broadcast_to(np.arange(n_blocks), (n_samples, n_blocks)), axis=1)
+    idx = (order[:, :, None] * block_size + offsets).reshape(n_samples, -1)
+    return idx[idx < n].reshape(n_samples, n)
+
+
+def batch_metrics(pnl, held, periods_per_year=252):
+    """
+    Las métricas de summarize_arrays para cada fila de `pnl` (lote x velas).
+    `held` es la posición que cobra cada retorno (la de la vela anterior).
+    Devuelve un array (lote, len(METRICS)).
+    """
+    equity = np.cumprod(1.0 + pnl, axis=1)
+    peak = np.maximum.accumulate(equity, axis=1)
+    drawdown = (equity / peak - 1.0).min(axis=1)
+    std = pnl.std(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, pnl.mean(axis=1) / std * np.sqrt(periods_per_year), 0.0)
+        active = held != 0
+        n_active = active.sum(axis=1)
+        hit_rate = np.where(n_active > 0, (active & (pnl > 0)).sum(axis=1) / n_active, 0.0)
+    return np.column_stack([equity[:, -1] - 1.0, sharpe, drawdown, hit_rate])
+
+
+def _prepare(returns, positions, cost):
+    returns = np.ascontiguousarray(returns, dtype=np.float64)
+    positions = np.asarray(positions, dtype=float)
+    if returns.shape != positions.shape or returns.ndim != 1 or returns.size < 2:
+        raise ValueError("returns y positions deben ser vectores de la misma longitud (>= 2).")
+    held = np.zeros_like(returns)
+    held[1:] = positions[:-1]
+    turnover_cost = cost * np.abs(np.diff(positions, prepend=0.0))
+    return returns, held, turnover_cost
+
+
+def _run_batch(arrays, seed, count, block_size, method, mode, periods_per_year):
+    returns, held, turnover_cost = arrays
+    rng = np.random.default_rng(seed)
+    idx = resample_indices(returns.size, count, block_size, rng, method)
+    if mode == "null":
+        sample_held = np.broadcast_to(held, idx.shape)
+        pnl = held * returns[idx] - turnover_cost
+    else:
+        sample_held = held[idx]
+        pnl = sample_held * returns[idx] - turnover_cost[idx]
+    return batch_metrics(pnl, sample_held, periods_per_year)
+
+
+def _attach(returns, held, turnover_cost):
+    global _ARRAYS
+    _ARRAYS = (returns, held, turnover_cost)
+
+
+def _run_worker_batch(*args):
+    return _run_batch(_ARRAYS, *args)
+
+
+def bootstrap(returns, positions, n_samples=10_000, block_size=None, method="stationary", mode="paths",
+              cost=0.0, seed=0, workers=1, batch_size=None, periods_per_year=252):
+    """
+    Distribución de METRICS sobre `n_samples` remuestreos de un backtest
+    (`returns` y `positions` como en run_vectorized_backtest). Devuelve un
+    array (n_samples, len(METRICS)); misma `seed` -> mismo resultado con
+    cualquier número de workers.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Modo desconocido: {mode} (opciones: {', '.join(MODES)})")
+    arrays = _prepare(returns, positions, cost)
+    n = arrays[0].size
+    block_size = block_size or default_block_size(n)
+    batch_size = batch_size or max(1, MAX_BATCH_CELLS // n)
+    counts = [min(batch_size, n_samples - i) for i in range(0, n_samples, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+    tasks = [(s, c, block_size, method, mode, periods_per_year) for s, c in zip(seeds, counts)]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(tasks) == 1:
+        results = [_run_batch(arrays, *task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_attach,
+                                 initargs=arrays) as pool:
+            results = list(pool.map(_run_worker_batch, *zip(*tasks)))
+    return np.concatenate(results) if results else np.empty((0, len(METRICS)))
+
+
+def observed_metrics(returns, positions, cost=0.0, periods_per_year=252):
+    """Métricas del backtest original (las de summarize_arrays)."""
+    returns, held, turnover_cost = _prepare(returns, positions, cost)
+    pnl = held * returns - turnover_cost
+    summary = summarize_arrays(pnl, np.asarray(positions), np.zeros(0), periods_per_year)
+    return {m: summary[m] for m in METRICS}
+
+
+def describe(samples, quantiles=(0.05, 0.5, 0.95)):
+    """{métrica: {mean, std, p05, p50, p95}} de un array de bootstrap."""
+    out = {}
+    for j, metric in enumerate(METRICS):
+        values = samples[:, j]
+        stats = {"mean": float(values.mean()), "std": float(values.std())}
+        stats.update({f"p{round(q * 100):02d}": float(v) for q, v in zip(quantiles, np.quantile(values, quantiles))})
+        out[metric] = stats
+    return out
+
+
+def p_values(samples, observed):
+    """P-valor de cada métrica: (1 + #nulos >= observado) / (1 + n). Todas son "más alto = mejor"."""
+    n = len(samples)
+    return {m: float((1 + np.count_nonzero(samples[:, j] >= observed[m])) / (1 + n))
+            for j, m in enumerate(METRICS)}
+
+
+def robustness_report(result, n_samples=10_000, block_size=None, method="stationary", cost=0.0,
+                      seed=0, workers=1, periods_per_year=252, **kwargs):
+    """
+    Informe de robustez de un resultado de run_vectorized_backtest: métricas
+    observadas, su distribución remuestreada ("paths") y la distribución
+    nula con p-valores ("null").
+    """
+    returns = result["returns"].to_numpy(dtype=float)
+    positions = result["position"].to_numpy()
+    block_size = block_size or default_block_size(returns.size)
+    common = dict(n_samples=n_samples, block_size=block_size, method=method, cost=cost, seed=seed,
+                  workers=workers, periods_per_year=periods_per_year, **kwargs)
+    start = time.perf_counter()
+    observed = observed_metrics(returns, positions, cost, periods_per_year)
+    paths = bootstrap(returns, positions, mode="paths", **common)
+    null = bootstrap(returns, positions, mode="null", **common)
+    elapsed = time.perf_counter() - start
+    log.info(f"[robustness] {n_samples} remuestreos x {returns.size} velas en {elapsed:.1f}s")
+    return {
+        "n_bars": int(returns.size),
+        "n_samples": n_samples,
+        "block_size": block_size,
+        "method": method,
+        "seed": seed,
+        "elapsed_s": round(elapsed, 3),
+        "observed": observed,
+        "paths": describe(paths),
+        "null": {**describe(null), "p_value": p_values(null, observed)},
+    }
+
+
+def main(argv=None):
+    from ss91_v3.factor_history import FACTOR_HISTORY_DIR, FactorHistory
+
+    parser = argparse.ArgumentParser(description="Robustez Monte Carlo del backtest (bootstrap por bloques)")
+    parser.add_argument("--symbol", default="EURUSD=X")
+    parser.add_argument("--period", default="10y")
+    parser.add_argument("--samples", type=int, default=10_000)
+    parser.add_argument("--block-size", type=int, default=None)
+    parser.add_argument("--method", choices=METHODS, default="stationary")
+    parser.add_argument("--cost", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--factor-history", default=FACTOR_HISTORY_DIR,
+                        help="Histórico point-in-time de sentimiento y Trends (SS91_FACTOR_MODE=record)")
+    args = parser.parse_args(argv)
+
+    from ss91_v3.backtest_stub import run_backtest
+
+    # Con los factores neutros no hay posiciones: se exigen los registrados
+    try:
+        result = run_backtest(args.symbol, period=args.period, factor_history=FactorHistory(args.factor_history),
+                              require_factors=True, cost=args.cost)
+    except ValueError as e:
+        log.error(f"Informe de robustez cancelado: {e}")
+        raise SystemExit(1)
+    report = robustness_report(result, args.samples, args.block_size, args.method, args.cost,
+                               args.seed, args.workers)
+
+    os.makedirs(ROBUSTNESS_DIR, exist_ok=True)
+    path = os.path.join(ROBUSTNESS_DIR, f"robustness_{args.symbol.replace('=', '_')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    log.info(f"Informe de robustez guardado en {path}")
+    for metric in METRICS:
+        paths, null = report["paths"][metric], report["null"]
+        print(f"{metric:<14}obs {report['observed'][metric]:9.4f}   "
+              f"p05..p95 {paths['p05']:9.4f} .. {paths['p95']:9.4f}   p-valor {null['p_value'][metric]:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Puntuación VADER con caché persistente y por lotes.
+
+- `SentimentCache`: caché LRU acotada de puntuaciones por ID de post (o hash
+  del texto), persistida en disco entre ejecuciones. Así cada ejecución del
+  collector sólo puntúa los posts que no había visto.
+- `score_texts`: puntúa muchos textos reutilizando un único analizador por
+  proceso y, para backfills grandes, repartiendo trozos en un pool de procesos.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from ss91_v3.utils import log
+
+SENTIMENT_CACHE_PATH = os.path.join("results", "state", "vader_cache.json")
+DEFAULT_CACHE_SIZE = 50_000
+DEFAULT_CHUNK_SIZE = 5_000
+
+_ANALYZER = None
+
+
+def get_analyzer():
+    """Analizador VADER del proceso (construirlo carga el léxico: se hace una vez)."""
+    global _ANALYZER
+    if _ANALYZER is None:
+        # Import diferido: sólo los procesos que puntúan cargan VADER
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        _ANALYZER = SentimentIntensityAnalyzer()
+    return _ANALYZER
+
+
+def text_key(text):
+    """Clave estable para textos sin ID."""
+    return "sha1:" + hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class SentimentCache:
+    """Caché LRU de puntuaciones `compound`, acotada a `max_size` entradas."""
+
+    def __init__(self, path=SENTIMENT_CACHE_PATH, max_size=DEFAULT_CACHE_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path:
+            self.load()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key):
+        score = self._data.get(key)
+        if score is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return score
+
+    def put(self, key, score):
+        self._data[key] = score
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        # Se guardan de menos a más reciente: el orden LRU se conserva
+        for key, score in entries[-self.max_size:]:
+            self._data[key] = score
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(list(self._data.items()), f)
+        os.replace(tmp, self.path)
+
+
+def _score_chunk(texts):
+    analyzer = get_analyzer()
+    return [analyzer.polarity_scores(text)["compound"] for text in texts]
+
+
+def score_texts(texts, workers=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Puntúa una lista de textos y devuelve sus `compound` en el mismo orden.
+    Con workers > 1 y suficientes textos, los trozos se reparten en procesos.
+    """
+    texts = list(texts)
+    if workers <= 1 or len(texts) <= chunk_size:
+        return _score_chunk(texts)
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    log.info(f"Puntuando {len(texts)} textos en {len(chunks)} lotes con {workers} procesos...")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [score for chunk in pool.map(_score_chunk, chunks) for score in chunk]
+
+
+def score_posts(posts, cache=None, workers=1):
+    """
+    Puntúa `posts` (pares (clave, texto)) usando la caché: sólo se pasan
+    por VADER las claves que no estaban. Devuelve la lista de puntuaciones.
+    """
+    if cache is None:
+        return score_texts([text for _, text in posts], workers=workers)
+    scores = [cache.get(key) for key, _ in posts]
+    missing = [i for i, score in enumerate(scores) if score is None]
+    if missing:
+        fresh = score_texts([posts[i][1] for i in missing], workers=workers)
+        for i, score in zip(missing, fresh):
+            scores[i] = score
+            cache.put(posts[i][0], score)
+    log.info(f"Sentimiento: {len(posts) - len(missing)} posts en caché, {len(missing)} nuevos.")
+    return scores
@@ -3,25 +3,75 @@
 Adapter to interact with your Sherloock class.
 Assumes Sherloock is installed/available as a module. If Sherloock lacks predict(),
 this adapter will call the hybrid classifier and wrap outputs.
+
+The feature schema (ordered feature names) is fixed when the adapter is built,
+so single rows and whole matrices map to the same column order without
+re-sorting keys on every call. `predict_batch` takes a 2-D array or a DataFrame:
+- if Sherloock exposes `predict_batch`, the matrix goes in one vectorized call
+  (in chunks of `chunk_size` rows for very large inputs);
+- otherwise rows are dispatched one by one, and identical rows are only sent once.
 """
 import logging
 import numpy as np
+import pandas as pd
 from ss91_v3.utils import setup_logger
-from sherloock import Sherloock  # your module
+from ss91_v3.engine import get_engine
 
 log = setup_logger("sher_adapter")
 LABEL_MAP = {0: "HOLD", 1: "BUY", 2: "SELL"}
+DEFAULT_CHUNK_SIZE = 4096
 
 class SherAdapter:
-    def __init__(self, model_path=None):
-        self.model = Sherloock()
+    def __init__(self, model_path=None, schema=None, model=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        # Shared, lazily built engine (same instance as core.py)
+        self.model = model if model is not None else get_engine()
         # optionally load artifacts if you serialized them
         self.model_path = model_path
+        self.chunk_size = chunk_size
+        self.schema = None
+        if schema is not None:
+            self._set_schema(schema)
+
+    def _set_schema(self, schema):
+        self.schema = tuple(schema)
+        self._index = {k: i for i, k in enumerate(self.schema)}
+
+    def _ensure_schema(self, keys):
+        # Without an explicit schema, the first call fixes it (sorted keys, as before)
+        if self.schema is None:
+            self._set_schema(sorted(keys))
 
     def _vec(self, features):
-        keys = sorted(features.keys())
-        vec = np.array([0.0 if features[k] is None else float(features[k]) for k in keys], dtype=float).reshape(1, -1)
-        return vec, keys
+        self._ensure_schema(features.keys())
+        vec = np.zeros((1, len(self.schema)), dtype=float)
+        for k, v in features.items():
+            i = self._index.get(k)
+            if i is not None and v is not None:
+                vec[0, i] = float(v)
+        return vec, self.schema
+
+    def to_matrix(self, X):
+        """2-D float matrix in schema order. DataFrames are matched by column name."""
+        if isinstance(X, pd.DataFrame):
+            self._ensure_schema(X.columns)
+            X = X.reindex(columns=list(self.schema))
+        elif self.schema is None:
+            raise ValueError("A feature schema is required to predict on plain arrays")
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != len(self.schema):
+            raise ValueError(f"Expected {len(self.schema)} features {self.schema}, got {X.shape[1]}")
+        # Missing values count as 0.0, same as None in predict()
+        return np.nan_to_num(X, nan=0.0)
+
+    @staticmethod
+    def _wrap(out):
+        return {
+            "signal": out.get("signal", "HOLD"),
+            "confidence": float(out.get("confidence", 0.0)),
+            "meta": out.get("meta", {})
+        }
 
     def predict(self, features):
         # Preferred: Sherloock.predict(features) if implemented
@@ -29,11 +79,7 @@ class SherAdapter:
             if hasattr(self.model, "predict"):
                 out = self.model.predict(features)
                 # ensure structure
-                return {
-                    "signal": out.get("signal", "HOLD"),
-                    "confidence": float(out.get("confidence", 0.0)),
-                    "meta": out.get("meta", {})
-                }
+                return self._wrap(out)
             else:
                 # fallback to hybrid text classifier
                 res = self.model._handle_hybrid_classify(str(features))
@@ -41,3 +87,39 @@ class SherAdapter:
         except Exception as e:
             log.exception("SherAdapter.predict failed")
             return {"signal":"HOLD","confidence":0.0,"meta":{"error":str(e)}}
+
+    def _normalize_batch(self, out, n):
+        """Accepts a list of dicts, a dict of arrays or an array of label ids."""
+        if isinstance(out, dict):
+            signals = out.get("signal", ["HOLD"] * n)
+            confidence = out.get("confidence", np.zeros(n))
+            return [self._wrap({"signal": s, "confidence": c}) for s, c in zip(signals, confidence)]
+        out = list(out)
+        if out and not isinstance(out[0], dict):
+            return [{"signal": LABEL_MAP.get(int(label), "HOLD"), "confidence": 0.0, "meta": {}} for label in out]
+        return [self._wrap(o) for o in out]
+
+    def predict_batch(self, X):
+        """
+        Predictions for every row of `X` (2-D array or DataFrame), as a list of
+        dicts with the same structure as `predict`.
+        """
+        M = self.to_matrix(X)
+        n = len(M)
+        if n == 0:
+            return []
+        if hasattr(self.model, "predict_batch"):
+            try:
+                results = []
+                for start in range(0, n, self.chunk_size):
+                    chunk = M[start:start + self.chunk_size]
+                    results.extend(self._normalize_batch(self.model.predict_batch(chunk), len(chunk)))
+                return results
+            except Exception as e:
+                log.exception("SherAdapter.predict_batch failed")
+                return [{"signal":"HOLD","confidence":0.0,"meta":{"error":str(e)}} for _ in range(n)]
+
+        # Row-wise fallback: identical rows (common in backtests) are dispatched once
+        rows, inverse = np.unique(M, axis=0, return_inverse=True)
+        unique = [self.predict(dict(zip(self.schema, row.tolist()))) for row in rows]
+        return [unique[i] for i in inverse.ravel()]
@@ -0,0 +1,153 @@
+"""
+Archivo histórico de snapshots.
+
+Sustituye a "un JSON por día" como formato de consulta: cada snapshot se
+añade a
+- una tabla columnar (storage.ColumnarTable) con todos sus campos numéricos
+  aplanados ("ohlc_latest.RSI_14", "marginal_factors.reddit_vader_avg"...)
+  e indexada por `snapshot_time_utc`, para consultas por rango y columna
+  sin parsear registros, y
+- un registro JSON completo en `records.jsonl`, con su posición guardada
+  en la tabla, para recuperar o exportar snapshots individuales.
+"""
+import json
+import math
+import numbers
+import os
+import pandas as pd
+from ss91_v3.storage import ColumnarTable
+from ss91_v3.utils import log
+
+SNAPSHOT_STORE_DIR = os.path.join("results", "snapshot_store")
+
+_OFFSET = "_record_offset"
+_LENGTH = "_record_length"
+
+
+def to_json(payload, indent=2):
+    """Serialización única del snapshot (archivo, subida y archivo histórico)."""
+    return json.dumps(payload, indent=indent, ensure_ascii=False, default=str)
+
+
+def flatten_numeric(payload, prefix=""):
+    """Campos numéricos del snapshot como {"seccion.campo": float}."""
+    flat = {}
+    for key, value in payload.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_numeric(value, f"{name}."))
+        elif isinstance(value, numbers.Number):
+            flat[name] = float(value)
+    return flat
+
+
+class SnapshotStore:
+    def __init__(self, root=SNAPSHOT_STORE_DIR):
+        self.root = root
+        self.table = ColumnarTable(os.path.join(root, "columns"))
+        self._records_path = os.path.join(root, "records.jsonl")
+
+    def __len__(self):
+        return len(self.table)
+
+    def append(self, payload, timestamp=None):
+        """Añade un snapshot. `timestamp` por defecto es su snapshot_time_utc."""
+        ts = pd.Timestamp(timestamp if timestamp is not None else payload["snapshot_time_utc"])
+        if ts.tzinfo is None:
+            ts = ts.tz_localize("UTC")
+        line = (to_json(payload, indent=None) + "\n").encode("utf-8")
+        os.makedirs(self.root, exist_ok=True)
+        with open(self._records_path, "ab") as f:
+            offset = f.tell()
+            f.write(line)
+        data = {k: [v] for k, v in flatten_numeric(payload).items()}
+        data[_OFFSET] = [offset]
+        data[_LENGTH] = [len(line)]
+        try:
+            self.table.append(pd.DatetimeIndex([ts]), data)
+        except Exception:
+            # Sin fila que apunte a la línea: se descarta para no dejar huérfanas
+            os.truncate(self._records_path, offset)
+            raise
+
+    # --- Consultas ---
+    def resolve_columns(self, names):
+        """Acepta nombres completos o sufijos únicos ("RSI_14" -> "ohlc_latest.RSI_14")."""
+        available = [c for c in self.table.columns if not c.startswith("_record")]
+        resolved = []
+        for name in names:
+            if name in available:
+                resolved.append(name)
+                continue
+            matches = [c for c in available if c.endswith(f".{name}")]
+            if len(matches) != 1:
+                raise KeyError(f"Columna '{name}' {'ambigua' if matches else 'no encontrada'} en el archivo de snapshots.")
+            resolved.append(matches[0])
+        return resolved
+
+    def query(self, columns, start=None, end=None):
+        """
+        DataFrame indexado por tiempo con `columns` entre `start` y `end`,
+        p.ej. query(["RSI_14", "reddit_vader_avg"], start="2023-01-01").
+        Sólo se leen las columnas y filas pedidas.
+        """
+        resolved = self.resolve_columns(columns)
+        df = self.table.read(resolved, start=start, end=end)
+        df.columns = list(columns)
+        df.index.name = "snapshot_time_utc"
+        return df
+
+    def _read_record(self, row):
+        offset = int(self.table.column(_OFFSET)[row])
+        length = int(self.table.column(_LENGTH)[row])
+        with open(self._records_path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def records(self, start=None, end=None):
+        """Snapshots completos (dicts) en el rango dado."""
+        i0, i1 = self.table.row_range(start, end)
+        return [self._read_record(i) for i in range(i0, i1)]
+
+    def latest(self, on=None):
+        """Último snapshot (o el último del día `on`), o None."""
+        if not len(self):
+            return None
+        if on is None:
+            return self._read_record(len(self) - 1)
+        day = pd.Timestamp(on)
+        i0, i1 = self.table.row_range(day.tz_localize("UTC"), (day + pd.Timedelta(days=1)).tz_localize("UTC") - pd.Timedelta(1))
+        return self._read_record(i1 - 1) if i1 > i0 else None
+
+    # --- Compatibilidad JSON ---
+    def export_json(self, directory, start=None, end=None):
+        """Escribe un `{fecha}.json` por día (el último snapshot de cada día)."""
+        os.makedirs(directory, exist_ok=True)
+        by_day = {}
+        for record in self.records(start, end):
+            by_day[str(pd.Timestamp(record["snapshot_time_utc"]).date())] = record
+        for day, record in by_day.items():
+            with open(os.path.join(directory, f"{day}.json"), "w", encoding="utf-8") as f:
+                f.write(to_json(record))
+        return sorted(by_day)
+
+    def import_json(self, directory):
+        """Migra un directorio de snapshots JSON (uno por día) al archivo."""
+        payloads = []
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                    payloads.append(json.load(f))
+            except json.JSONDecodeError:
+                log.warning(f"Snapshot corrupto ignorado: {name}")
+        last = self.table.index()[-1] if len(self) else -math.inf
+        imported = 0
+        for payload in sorted(payloads, key=lambda p: pd.Timestamp(p["snapshot_time_utc"])):
+            ts = pd.Timestamp(payload["snapshot_time_utc"])
+            ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts
+            if ts.tz_convert("UTC").tz_localize(None).as_unit("ns").value > last:
+                self.append(payload, ts)
+                imported += 1
+        return imported
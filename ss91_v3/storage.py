@@ -0,0 +1,284 @@
+"""
+Almacenamiento columnar local.
+
+`ColumnarTable` guarda una tabla append-only indexada por tiempo como un
+archivo binario por columna (float64) más un índice int64 (ns, UTC). Se lee
+con np.memmap, así que un rango temporal se resuelve con searchsorted sobre
+el índice y sólo se tocan las páginas de ese rango, sin parsear el archivo.
+
+`OHLCVStore` usa esa tabla como caché de velas por símbolo e intervalo:
+sirve lo que ya tiene y sólo pide al proveedor la cola que falta.
+"""
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+from ss91_v3.utils import log
+
+OHLCV_DIR = os.path.join("results", "ohlcv")
+
+
+def period_cutoff(period, last_ts):
+    """Inicio de la ventana `period` de yfinance ('5d', '6mo', '1y'...) o None."""
+    if not period:
+        return None
+    units = {"d": "days", "wk": "weeks", "mo": "months", "y": "years"}
+    for suffix, unit in units.items():
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            return last_ts - pd.DateOffset(**{unit: int(period[:-len(suffix)])})
+    return None  # 'max', 'ytd'... todo el histórico disponible
+
+
+def _safe_name(name):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", str(name))
+
+
+class ColumnarTable:
+    """Tabla columnar append-only respaldada por archivos memory-mapped."""
+
+    INDEX_FILE = "_index.i8"
+
+    def __init__(self, path):
+        self.path = path
+        self._meta_path = os.path.join(path, "meta.json")
+        try:
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self.meta = json.load(f)
+        except FileNotFoundError:
+            self.meta = {"columns": [], "files": {}, "rows": 0, "tz": None}
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    @property
+    def columns(self):
+        return list(self.meta["columns"])
+
+    # --- Escritura ---
+    def _write_meta(self):
+        os.makedirs(self.path, exist_ok=True)
+        tmp = f"{self._meta_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self._meta_path)
+
+    def _file(self, column):
+        return os.path.join(self.path, self.meta["files"][column])
+
+    def _write_tail(self, path, values):
+        """
+        Escribe `values` a partir de la fila `rows` de `path`. Los bytes de
+        un append que se interrumpió antes de guardar meta.json se
+        descartan, así las filas nuevas nunca quedan desplazadas.
+        """
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            f.seek(len(self) * 8)
+            f.truncate()
+            values.tofile(f)
+
+    def _add_column(self, column):
+        fname = f"{_safe_name(column)}.f8"
+        while fname in self.meta["files"].values():
+            fname = f"_{fname}"
+        self.meta["columns"].append(column)
+        self.meta["files"][column] = fname
+        # Las filas anteriores a la columna nueva quedan como NaN
+        np.full(len(self), np.nan).tofile(self._file(column))
+
+    def append(self, index, data):
+        """
+        Añade filas. `index` es un DatetimeIndex/array de timestamps
+        estrictamente creciente y posterior al último guardado; `data` es un
+        dict columna -> array. Columnas nuevas se crean rellenas con NaN y
+        las ausentes en `data` reciben NaN.
+        """
+        index = pd.DatetimeIndex(index)
+        if len(index) == 0:
+            return
+        if self.meta["tz"] is None and len(self) == 0:
+            self.meta["tz"] = str(index.tz) if index.tz is not None else None
+        ts = (index.tz_convert("UTC").tz_localize(None) if index.tz is not None else index).as_unit("ns").asi8
+        if np.any(np.diff(ts) <= 0) or (len(self) and ts[0] <= self.index()[-1]):
+            raise ValueError("El índice debe ser creciente y posterior a la última fila.")
+
+        os.makedirs(self.path, exist_ok=True)
+        for column in data:
+            if column not in self.meta["files"]:
+                self._add_column(column)
+        for column in self.meta["columns"]:
+            values = np.asarray(data[column], dtype=np.float64) if column in data else np.full(len(ts), np.nan)
+            self._write_tail(self._file(column), values)
+        self._write_tail(os.path.join(self.path, self.INDEX_FILE), ts.astype(np.int64))
+        # meta.json se escribe al final: un lector nunca ve filas a medias
+        self.meta["rows"] += len(ts)
+        self._write_meta()
+
+    def truncate(self, rows):
+        """Conserva sólo las primeras `rows` filas."""
+        rows = max(0, min(rows, len(self)))
+        if rows == len(self):
+            return
+        self.meta["rows"] = rows
+        self._write_meta()
+        os.truncate(os.path.join(self.path, self.INDEX_FILE), rows * 8)
+        for column in self.meta["columns"]:
+            os.truncate(self._file(column), rows * 8)
+
+    def clear(self):
+        self.truncate(0)
+
+    def write_rows(self, column, i0, values):
+        """Sobrescribe en el sitio las filas [i0, i0 + len(values)) de `column`."""
+        values = np.asarray(values, dtype=np.float64)
+        if i0 < 0 or i0 + len(values) > len(self):
+            raise IndexError("Rango fuera de la tabla.")
+        if len(values) == 0:
+            return
+        out = np.memmap(self._file(column), dtype=np.float64, mode="r+", offset=i0 * 8, shape=(len(values),))
+        out[:] = values
+        out.flush()
+        del out
+
+    # --- Lectura ---
+    def _map(self, path, dtype, i0, i1):
+        i1 = len(self) if i1 is None else min(i1, len(self))
+        if i1 <= i0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", offset=i0 * 8, shape=(i1 - i0,))
+
+    def index(self, i0=0, i1=None):
+        """
+        Índice temporal (int64 ns UTC) como memmap de sólo lectura. Con
+        i0/i1 sólo se mapean esas filas (lectura por bloques).
+        """
+        return self._map(os.path.join(self.path, self.INDEX_FILE), np.int64, i0, i1)
+
+    def column(self, name, i0=0, i1=None):
+        """Columna `name` (filas [i0, i1)) como memmap de sólo lectura."""
+        return self._map(self._file(name), np.float64, i0, i1)
+
+    def _to_ns(self, ts):
+        ts = pd.Timestamp(ts)
+        if ts.tzinfo is None and self.meta["tz"] is not None:
+            ts = ts.tz_localize(self.meta["tz"])
+        if ts.tzinfo is not None:
+            ts = ts.tz_convert("UTC").tz_localize(None)
+        return ts.as_unit("ns").value
+
+    def row_range(self, start=None, end=None):
+        """Posiciones [i0, i1) de las filas con start <= t <= end."""
+        idx = self.index()
+        i0 = 0 if start is None else int(np.searchsorted(idx, self._to_ns(start), side="left"))
+        i1 = len(idx) if end is None else int(np.searchsorted(idx, self._to_ns(end), side="right"))
+        return i0, max(i0, i1)
+
+    def timestamps(self, i0=0, i1=None):
+        ts = pd.DatetimeIndex(np.asarray(self.index(i0, i1)).astype("datetime64[ns]"))
+        if self.meta["tz"] is not None:
+            ts = ts.tz_localize("UTC").tz_convert(self.meta["tz"])
+        return ts
+
+    def read(self, columns=None, start=None, end=None):
+        """DataFrame (índice temporal) con las columnas pedidas en el rango dado."""
+        i0, i1 = self.row_range(start, end)
+        columns = self.columns if columns is None else columns
+        data = {c: np.array(self.column(c)[i0:i1]) for c in columns}
+        return pd.DataFrame(data, index=self.timestamps(i0, i1))
+
+
+class OHLCVStore:
+    """
+    Caché local de velas OHLCV por (símbolo, intervalo).
+
+    `downloader(symbol, interval=..., period=...|start=...)` debe devolver un
+    DataFrame como data_pipeline.download_ohlcv: columna temporal primero y
+    columnas en minúsculas. Se puede inyectar uno falso para tests offline.
+    """
+
+    def __init__(self, root=OHLCV_DIR, downloader=None):
+        self.root = root
+        self._downloader = downloader
+
+    def _download(self, symbol, interval, **kwargs):
+        if self._downloader is None:
+            from ss91_v3.data_pipeline import download_ohlcv
+            self._downloader = download_ohlcv
+        return self._downloader(symbol, interval=interval, **kwargs)
+
+    def table(self, symbol, interval="1d"):
+        return ColumnarTable(os.path.join(self.root, _safe_name(symbol), _safe_name(interval)))
+
+    def _write(self, table, bars):
+        if bars is None or bars.empty:
+            return
+        time_col = bars.columns[0]
+        table.meta["time_column"] = time_col
+        numeric = bars.drop(columns=[time_col]).select_dtypes(include="number")
+        table.append(bars[time_col], {c: numeric[c].to_numpy() for c in numeric.columns})
+
+    def update(self, symbol, interval="1d", period="1y", start=None):
+        """
+        Trae del proveedor sólo lo que falta. La última vela guardada se
+        considera provisional y se reemplaza con la versión descargada.
+        Devuelve el número de velas descargadas.
+        """
+        table = self.table(symbol, interval)
+        if len(table):
+            last = table.timestamps(len(table) - 1)[0]
+            wanted = pd.Timestamp(start) if start is not None else period_cutoff(period, last)
+            if wanted is not None and wanted.tzinfo is None and last.tzinfo is not None:
+                wanted = wanted.tz_localize(last.tzinfo)
+            covered = table.meta.get("covered_from")
+            if (period == "max" and start is None) and covered is not None:
+                stale = True  # la caché se creó con una ventana acotada
+            elif wanted is not None:
+                stale = covered is not None and table._to_ns(wanted) < covered
+            else:
+                stale = False
+            if stale:
+                # La caché no cubre el inicio pedido: se descarga de nuevo entera
+                log.info(f"[OHLCV] Caché de {symbol} ({interval}) incompleta. Descarga completa.")
+            else:
+                bars = self._download(symbol, interval, start=last)
+                if bars is not None and not bars.empty:
+                    bars = bars[bars[bars.columns[0]] >= last]
+                if bars is None or bars.empty:
+                    return 0
+                table.truncate(len(table) - 1)
+                self._write(table, bars)
+                log.info(f"[OHLCV] {symbol} ({interval}): {len(bars)} velas nuevas desde {last}.")
+                return len(bars)
+
+        kwargs = {"start": start} if start is not None else {"period": period}
+        bars = self._download(symbol, interval, **kwargs)
+        if bars is None or bars.empty:
+            return 0
+        table.clear()
+        # Inicio que cubre la caché (None = todo el histórico del proveedor)
+        last = pd.Timestamp(bars[bars.columns[0]].iloc[-1])
+        covered = pd.Timestamp(start) if start is not None else period_cutoff(period, last)
+        table.meta["covered_from"] = None
+        self._write(table, bars)
+        if covered is not None:
+            table.meta["covered_from"] = table._to_ns(covered)
+            table._write_meta()
+        log.info(f"[OHLCV] {symbol} ({interval}): caché creada con {len(bars)} velas.")
+        return len(bars)
+
+    def get(self, symbol, interval="1d", period="1y", start=None, end=None, refresh=True):
+        """
+        Velas de la caché en el formato de download_ohlcv (columna temporal
+        primero). Con refresh=True antes se descarga la cola que falta.
+        """
+        if refresh:
+            self.update(symbol, interval, period=period, start=start)
+        table = self.table(symbol, interval)
+        if not len(table):
+            return pd.DataFrame()
+        if start is None:
+            start = period_cutoff(period, table.timestamps(len(table) - 1)[0])
+        df = table.read(start=start, end=end)
+        time_col = table.meta.get("time_column", "date")
+        df.index.name = time_col
+        return df.reset_index()
@@ -0,0 +1,211 @@
+"""
+Reglas de la estrategia "El Santo Grial" (Pánico / Euforia / Rango).
+
+Las reglas son datos (DEFAULT_RULES, o la sección `strategy_rules` de
+fx_config.json): cada una es una conjunción de condiciones
+[campo, operador, umbral] y se evalúan en orden; la primera que se cumple
+gana y, si ninguna se cumple, el mercado está en Rango. `CompiledRules`
+las convierte en predicados NumPy que se evalúan de una vez sobre
+escalares o sobre tablas de muchos símbolos y velas.
+
+`core.generate_decision` / `core.generate_decisions` las aplican a los
+snapshots y el motor de backtest las aplica como máscaras sobre todo el
+histórico. Todos usan esta única definición para que nunca diverjan.
+"""
+import numpy as np
+from ss91_v3.utils import log, load_fx_config, CONFIG_PATH
+
+# Umbrales por defecto (los mismos que siempre ha usado core.py)
+DEFAULT_THRESHOLDS = {
+    "rsi_low": 30.0,          # Sobreventa extrema
+    "rsi_high": 70.0,         # Sobrecompra extrema
+    "fibo_low": 0.2,          # Cerca del mínimo del rango
+    "fibo_high": 0.8,         # Cerca del máximo del rango
+    "sentiment_panic": 0.35,  # 0.0=Pánico
+    "sentiment_euphoria": 0.8,  # 1.0=Euforia
+    "gtrends_crisis": 0.5,    # Pico de búsquedas de "recession"
+}
+
+# Campo de regla -> (sección del snapshot, clave, valor si falta)
+SNAPSHOT_FIELDS = {
+    "rsi": ("ohlc_latest", "RSI_14", 50.0),
+    "fibo_ratio": ("fibonacci", "position_ratio", 0.5),
+    "sentiment": ("marginal_factors", "reddit_vader_avg", 0.5),
+    "gtrends_crisis": ("marginal_factors", "gtrends_recession", 0.0),
+}
+
+# Umbral: nombre de DEFAULT_THRESHOLDS o número. `command` y `context` son
+# plantillas con los campos de regla y recent_prices / low_1y / close.
+DEFAULT_RULES = [
+    {   # --- Estrategia 1: Pánico y Sobreventa Extrema ---
+        "name": "panic",
+        "signal": "BUY",
+        "conditions": [["rsi", "<", "rsi_low"], ["fibo_ratio", "<", "fibo_low"],
+                       ["sentiment", "<", "sentiment_panic"], ["gtrends_crisis", ">", "gtrends_crisis"]],
+        # Optimizador PuLP: mejor entrada por encima del soporte del último año
+        "command": "forecast {recent_prices} with_limit {low_1y}",
+        "context": "Pánico Detectado (RSI:{rsi:.0f}, Fibo:{fibo_ratio:.2f}, Sent:{sentiment:.2f}). "
+                   "Optimizando entrada (PuLP).",
+    },
+    {   # --- Estrategia 2: Euforia y Sobrecompra Extrema ---
+        "name": "euphoria",
+        "signal": "SELL",
+        "conditions": [["rsi", ">", "rsi_high"], ["fibo_ratio", ">", "fibo_high"],
+                       ["sentiment", ">", "sentiment_euphoria"]],
+        # Motor lógico Z3: verifica una "Crisis de Credibilidad"
+        "command": "solve parallel euforia_check where x > 100",
+        "context": "Euforia Detectada (RSI:{rsi:.0f}, Fibo:{fibo_ratio:.2f}, Sent:{sentiment:.2f}). "
+                   "Verificando restricción (Z3).",
+    },
+]
+# --- Estrategia 3: Mercado en Rango (ninguna regla) ---
+RANGE_CONTEXT = "Mercado en Rango (RSI:{rsi:.0f}, Fibo:{fibo_ratio:.2f}). Sin señal."
+
+_OPERATORS = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal}
+
+# Señales numéricas (las usa el backtest)
+SIGNAL_HOLD = 0
+SIGNAL_BUY = 1
+SIGNAL_SELL = -1
+SIGNAL_VALUES = {"BUY": SIGNAL_BUY, "SELL": SIGNAL_SELL, "HOLD": SIGNAL_HOLD}
+
+
+def resolve_thresholds(thresholds=None):
+    """Combina los umbrales recibidos con los valores por defecto."""
+    th = dict(DEFAULT_THRESHOLDS)
+    if thresholds:
+        unknown = set(thresholds) - set(th)
+        if unknown:
+            raise KeyError(f"Umbrales desconocidos: {sorted(unknown)}")
+        th.update({k: float(v) for k, v in thresholds.items()})
+    return th
+
+
+def thresholds_from_config(config):
+    """
+    Umbrales a partir de fx_config.json: `indicators.momentum_threshold_low/high`
+    son los de RSI y una sección opcional `strategy_thresholds` (p.ej. la
+    salida de un barrido de ss91_v3.sweep) fija cualquiera de los demás.
+    """
+    indicators = config.get("indicators", {})
+    th = {}
+    if "momentum_threshold_low" in indicators:
+        th["rsi_low"] = indicators["momentum_threshold_low"]
+    if "momentum_threshold_high" in indicators:
+        th["rsi_high"] = indicators["momentum_threshold_high"]
+    th.update(config.get("strategy_thresholds", {}))
+    return resolve_thresholds(th)
+
+
+def load_thresholds(path=CONFIG_PATH):
+    """Umbrales de fx_config.json; si no se puede leer, los de siempre."""
+    try:
+        return thresholds_from_config(load_fx_config(path))
+    except Exception as e:
+        log.warning(f"No se pudieron leer los umbrales de {path} ({e}). Usando los valores por defecto.")
+        return resolve_thresholds()
+
+
+def validate_rules(rules):
+    """Comprueba campos, operadores y señales de `rules`; devuelve la lista."""
+    rules = list(rules)
+    for rule in rules:
+        name = rule.get("name")
+        if not name or rule.get("signal") not in ("BUY", "SELL", "HOLD"):
+            raise ValueError(f"Regla inválida (name/signal): {rule}")
+        if not rule.get("conditions"):
+            raise ValueError(f"La regla '{name}' no tiene condiciones.")
+        for field, op, _ in rule["conditions"]:
+            if field not in SNAPSHOT_FIELDS:
+                raise KeyError(f"Regla '{name}': campo desconocido '{field}'.")
+            if op not in _OPERATORS:
+                raise ValueError(f"Regla '{name}': operador desconocido '{op}'.")
+    if len({r["name"] for r in rules}) != len(rules):
+        raise ValueError("Nombres de regla repetidos.")
+    return rules
+
+
+def rules_from_config(config):
+    """Reglas de la sección `strategy_rules` de fx_config.json (por defecto DEFAULT_RULES)."""
+    return validate_rules(config.get("strategy_rules") or DEFAULT_RULES)
+
+
+def load_rules(path=CONFIG_PATH):
+    """Reglas de fx_config.json; si no se pueden leer, las de siempre."""
+    try:
+        return rules_from_config(load_fx_config(path))
+    except Exception as e:
+        log.warning(f"No se pudieron leer las reglas de {path} ({e}). Usando las reglas por defecto.")
+        return list(DEFAULT_RULES)
+
+
+def consumed_factors(rules=DEFAULT_RULES):
+    """Claves de `marginal_factors` que leen las condiciones de `rules`."""
+    fields = {field for rule in rules for field, _, _ in rule["conditions"]}
+    return tuple(key for field, (section, key, _) in SNAPSHOT_FIELDS.items()
+                 if section == "marginal_factors" and field in fields)
+
+
+class CompiledRules:
+    """
+    Reglas con los umbrales ya resueltos. `fire(columnas)` devuelve, para
+    cada fila, el índice de la primera regla que se cumple (-1 = Rango);
+    las columnas son escalares o arrays por campo (con broadcasting). Los
+    NaN nunca disparan una regla.
+    """
+
+    def __init__(self, rules=None, thresholds=None):
+        th = resolve_thresholds(thresholds)
+        self.rules = validate_rules(DEFAULT_RULES if rules is None else rules)
+        self.predicates = []
+        for rule in self.rules:
+            predicate = []
+            for field, op, threshold in rule["conditions"]:
+                value = th[threshold] if isinstance(threshold, str) else float(threshold)
+                predicate.append((field, _OPERATORS[op], value))
+            self.predicates.append(predicate)
+        self.fields = sorted({field for predicate in self.predicates for field, _, _ in predicate})
+
+    def masks(self, columns):
+        """Una máscara por regla; cada una excluye las filas de las reglas anteriores."""
+        columns = {f: np.asarray(columns[f], dtype=float) for f in self.fields}
+        taken = np.zeros((), dtype=bool)
+        masks = []
+        for predicate in self.predicates:
+            mask = ~taken
+            for field, op, value in predicate:
+                mask = mask & op(columns[field], value)
+            masks.append(mask)
+            taken = taken | mask
+        return masks
+
+    def fire(self, columns):
+        masks = self.masks(columns)
+        fired = np.full(np.broadcast_shapes(*(np.shape(m) for m in masks)), -1)
+        for i, mask in enumerate(masks):
+            fired[np.broadcast_to(mask, fired.shape)] = i
+        return fired
+
+
+def evaluate_rules(rsi, fibo_ratio, sentiment, gtrends_crisis, thresholds=None):
+    """
+    Evalúa las reglas de Pánico y Euforia (DEFAULT_RULES).
+
+    Acepta escalares o arrays (se hace broadcasting entre ellos) y devuelve
+    dos máscaras booleanas `(panic, euphoria)`. Igual que el if/elif de
+    core.py, Euforia sólo se activa donde no hay Pánico; el resto es Rango.
+    Los NaN nunca disparan una regla.
+    """
+    columns = {"rsi": rsi, "fibo_ratio": fibo_ratio, "sentiment": sentiment, "gtrends_crisis": gtrends_crisis}
+    panic, euphoria = CompiledRules(DEFAULT_RULES, thresholds).masks(columns)
+    return panic, euphoria
+
+
+# Campos de `marginal_factors` que leen las reglas por defecto. El registro
+# de factores sólo ejecuta las fuentes que los producen.
+CONSUMED_FACTORS = consumed_factors(DEFAULT_RULES)
+
+
+def rule_signals(panic, euphoria):
+    """Convierte las máscaras de reglas en señales +1 (BUY), -1 (SELL) o 0 (HOLD)."""
+    return np.where(panic, SIGNAL_BUY, np.where(euphoria, SIGNAL_SELL, SIGNAL_HOLD)).astype(np.int8)
@@ -0,0 +1,374 @@
+"""
+Modo streaming intradía: velas -> indicadores online -> decisión por vela.
+
+    fuente (generador de Bar) ──> StreamState.update ──> reglas ──> decisión
+                                        ▲
+                     MarginalRefresher ─┘ (factores con su propia cadencia)
+
+Fuentes intercambiables (todas son iterables de `Bar`):
+
+- `replay_frame` / `replay_file`: reproduce un DataFrame o un CSV de velas.
+- `poll_bars`: consulta periódicamente un proveedor (por defecto yfinance)
+  y emite sólo las velas cerradas nuevas.
+- `QueueSource`: feed local en proceso (otro hilo hace `put(bar)`).
+
+Los indicadores (RSI, EMA, ATR, MACD...) avanzan con `IndicatorState` y los
+niveles de Fibonacci con `RollingExtrema`, en O(1) por vela. Las reglas de
+strategy.py se evalúan en cada vela; sólo cuando disparan se construye el
+snapshot y se llama a `core.generate_decision` (Sherloock) en un hilo
+aparte con un plazo máximo, para que una respuesta lenta no retrase el
+resto del flujo.
+
+    python -m ss91_v3.streaming --replay velas_1m.csv
+"""
+import argparse
+import json
+import math
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from ss91_v3 import metrics
+from ss91_v3.factors import DEFAULT_FACTORS
+from ss91_v3.fibonacci import FIBO_LEVELS, RollingExtrema, fibo_lookback_from_config
+from ss91_v3.indicators import INDICATOR_COLUMNS, IndicatorState
+from ss91_v3.strategy import SIGNAL_HOLD, SIGNAL_VALUES, CompiledRules, load_rules, load_thresholds
+from ss91_v3.utils import log
+
+DEFAULT_FACTOR_INTERVAL_S = 15 * 60
+DEFAULT_DECISION_TIMEOUT_S = 2.0
+RECENT_PRICES = 5  # los mismos que summarize_technicals pasa al comando "forecast"
+
+
+@dataclass
+class Bar:
+    date: object
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float = 0.0
+
+
+# --- Fuentes ---
+def replay_frame(df, speed=None, sleep=time.sleep):
+    """
+    Velas de un DataFrame con columnas date/open/high/low/close[/volume].
+    Con `speed` (p.ej. 60 = un minuto por segundo) respeta el espaciado
+    entre velas; sin él las emite tan rápido como se consumen.
+    """
+    volume = df["volume"] if "volume" in df else pd.Series(0.0, index=df.index)
+    rows = zip(df["date"], df["open"], df["high"], df["low"], df["close"], volume)
+    prev = None
+    for date, o, h, l, c, v in rows:
+        if speed and prev is not None:
+            sleep(max(0.0, (pd.Timestamp(date) - prev).total_seconds() / speed))
+        prev = pd.Timestamp(date) if speed else None
+        yield Bar(date, float(o), float(h), float(l), float(c), float(v))
+
+
+def replay_file(path, speed=None, sleep=time.sleep):
+    """Reproduce un CSV de velas (como los que guarda download_ohlcv)."""
+    df = pd.read_csv(path, parse_dates=["date"])
+    df.columns = [c.lower() for c in df.columns]
+    return replay_frame(df, speed, sleep)
+
+
+def poll_bars(symbol, interval="1m", every_s=60.0, fetch=None, period="1d",
+              include_partial=False, sleep=time.sleep, stop=None):
+    """
+    Consulta `fetch(symbol, interval=..., period=...)` cada `every_s`
+    segundos y emite las velas posteriores a la última emitida. La última
+    vela de cada respuesta sigue abierta, así que sólo se emite con
+    `include_partial=True`. `stop` (threading.Event) corta el bucle.
+    """
+    if fetch is None:
+        # Import diferido: data_pipeline carga pandas_ta
+        from ss91_v3.data_pipeline import download_ohlcv as fetch
+    last = None
+    while stop is None or not stop.is_set():
+        try:
+            df = fetch(symbol, interval=interval, period=period)
+            if df is not None and not df.empty:
+                # Columna temporal primero ('date' o 'Datetime' en intradía)
+                df = df.rename(columns={df.columns[0]: "date"})
+                if not include_partial:
+                    df = df.iloc[:-1]
+                if last is not None:
+                    df = df[df["date"] > last]
+        except Exception as e:
+            log.error(f"Error consultando velas de {symbol}: {e}")
+            df = None
+        if df is not None and not df.empty:
+            last = df["date"].iloc[-1]
+            yield from replay_frame(df)
+        if stop is not None:
+            stop.wait(every_s)
+        else:
+            sleep(every_s)
+
+
+class QueueSource:
+    """Feed local: los productores llaman a put(bar) y close() al terminar."""
+
+    _CLOSED = object()
+
+    def __init__(self, maxsize=0):
+        self._queue = queue.Queue(maxsize)
+
+    def put(self, bar, timeout=None):
+        self._queue.put(bar, timeout=timeout)
+
+    def close(self):
+        self._queue.put(self._CLOSED)
+
+    def __iter__(self):
+        while True:
+            bar = self._queue.get()
+            if bar is self._CLOSED:
+                return
+            yield bar
+
+
+# --- Estado online ---
+class StreamState:
+    """Indicadores, extremos de Fibonacci y últimos cierres, vela a vela."""
+
+    def __init__(self, fibo_lookback=None, indicators=None):
+        self.indicators = indicators or IndicatorState()
+        self.fibo_lookback = fibo_lookback or fibo_lookback_from_config()
+        self.extrema = RollingExtrema(self.fibo_lookback)
+        self.recent = deque(maxlen=RECENT_PRICES)
+        self.values = dict.fromkeys(INDICATOR_COLUMNS, math.nan)
+        self.high = self.low = math.nan
+        self.bar = None
+
+    def update(self, bar):
+        row, _ = self.indicators.update(bar.high, bar.low, bar.close)
+        # DPO mira velas al futuro; en streaming queda sin valor (como en la última vela de fetch_ohlcv)
+        self.values = dict(zip(INDICATOR_COLUMNS, row))
+        self.high, self.low = self.extrema.update(bar.high, bar.low)
+        self.recent.append(bar.close)
+        self.bar = bar
+        return self
+
+    @property
+    def rsi(self):
+        return self.values["RSI_14"]
+
+    @property
+    def position_ratio(self):
+        span = self.high - self.low
+        return 0.5 if span == 0 else (self.bar.close - self.low) / span
+
+    def fibonacci(self):
+        """Sección "fibonacci" con el formato de compute_fibonacci_levels."""
+        high, low, close = self.high, self.low, self.bar.close
+        levels = {name: high - (high - low) * ratio for name, ratio in FIBO_LEVELS}
+        levels["100%"] = low
+        nearest = min(levels.items(), key=lambda x: abs(x[1] - close))
+        return {
+            "fibo_levels": levels,
+            "nearest_level": nearest[0],
+            "nearest_value": nearest[1],
+            "position_ratio": self.position_ratio,
+            "current_price": close,
+            "high_1y": high,
+            "low_1y": low,
+        }
+
+    def snapshot(self, marginal_factors, symbol="EURUSD=X"):
+        """Snapshot con el formato de build_payload para core.generate_decision."""
+        bar = self.bar
+        ohlc = {"date": bar.date, "open": bar.open, "high": bar.high, "low": bar.low,
+                "close": bar.close, "volume": bar.volume, **self.values,
+                "recent_prices": list(self.recent)}
+        return {
+            "snapshot_time_utc": str(bar.date),
+            "symbol": symbol,
+            "ohlc_latest": ohlc,
+            "fibonacci": self.fibonacci(),
+            "marginal_factors": dict(marginal_factors),
+            "factor_sources": {},
+        }
+
+
+class MarginalRefresher:
+    """
+    Factores marginales con cadencia propia. `current()` nunca bloquea:
+    devuelve los últimos valores y, si tienen más de `interval_s`, lanza un
+    refresco en segundo plano (uno a la vez).
+    """
+
+    def __init__(self, fetch=None, interval_s=DEFAULT_FACTOR_INTERVAL_S, initial=None, clock=time.monotonic):
+        self.fetch = fetch or _collect_factors
+        self.interval_s = interval_s
+        self.clock = clock
+        self.values = dict(initial) if initial is not None else default_factors()
+        self.refreshed_at = None
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._running = None
+
+    def current(self):
+        with self._lock:
+            stale = self.refreshed_at is None or self.clock() - self.refreshed_at >= self.interval_s
+            if stale and self._running is None:
+                self._running = threading.Thread(target=self._refresh, name="ss91_stream_factors", daemon=True)
+                self._running.start()
+            return self.values
+
+    def _refresh(self):
+        try:
+            with metrics.span("stream_factor_refresh"):
+                values = self.fetch()
+        except Exception as e:
+            log.error(f"Error refrescando factores marginales: {e}")
+            values = None
+        with self._lock:
+            if values:
+                self.values = {**self.values, **values}
+                self.refreshes += 1
+            self.refreshed_at = self.clock()
+            self._running = None
+
+    def wait(self, timeout=None):
+        thread = self._running
+        if thread is not None:
+            thread.join(timeout)
+
+
+def default_factors():
+    return {k: v for values in DEFAULT_FACTORS.values() for k, v in values.items()}
+
+
+def _collect_factors():
+    from ss91_v3.data_pipeline import api_keys_from_env
+    from ss91_v3.factor_registry import requested_fields
+    from ss91_v3.factors import collect_marginal_factors
+    return collect_marginal_factors(api_keys_from_env(), fields=requested_fields())[0]
+
+
+def static_factors(values=None):
+    """Refresher sin refresco (replays y benchmarks)."""
+    refresher = MarginalRefresher(fetch=lambda: None, interval_s=math.inf, initial=values)
+    refresher.refreshed_at = 0.0
+    return refresher
+
+
+# --- Pipeline ---
+def stream_decisions(bars, factors=None, thresholds=None, fibo_lookback=None, symbol="EURUSD=X",
+                     decide=None, decision_timeout_s=DEFAULT_DECISION_TIMEOUT_S, state=None):
+    """
+    Generador de decisiones, una por vela de `bars`:
+
+        {"date", "close", "signal", "decision", "latency_s"}
+
+    Cuando una regla dispara, el evento incluye también "record" (el
+    decision_record de core.generate_decision, que recibe las reglas ya
+    compiladas como `rules=`). Si Sherloock no responde en
+    `decision_timeout_s` (o sigue ocupado con la vela anterior) la vela se
+    decide HOLD con "error" y el flujo continúa.
+    """
+    if decide is None:
+        from ss91_v3.core import generate_decision as decide
+    factors = factors or MarginalRefresher()
+    thresholds = thresholds if thresholds is not None else load_thresholds()
+    rules = CompiledRules(load_rules(), thresholds)
+    signals = [SIGNAL_VALUES[rule["signal"]] for rule in rules.rules]
+    state = state or StreamState(fibo_lookback)
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ss91_stream_decide")
+    pending = None
+    clock = time.perf_counter
+    try:
+        for bar in bars:
+            start = clock()
+            state.update(bar)
+            marginals = factors.current()
+            fired = int(rules.fire({"rsi": state.rsi, "fibo_ratio": state.position_ratio,
+                                    "sentiment": marginals.get("reddit_vader_avg", 0.5),
+                                    "gtrends_crisis": marginals.get("gtrends_recession", 0.0)}))
+            event = {"date": bar.date, "close": bar.close, "signal": SIGNAL_HOLD, "decision": "HOLD"}
+            if fired >= 0:
+                event["signal"] = signals[fired]
+                if pending is not None and not pending.done():
+                    event["error"] = "decisión anterior en curso"
+                else:
+                    # Reglas ya compiladas: decide no relee fx_config.json por vela
+                    pending = executor.submit(decide, state.snapshot(marginals, symbol), thresholds, rules=rules)
+                    try:
+                        record = pending.result(timeout=decision_timeout_s)[0]
+                        event["record"] = record
+                        event["decision"] = record["decision"]
+                    except FutureTimeout:
+                        event["error"] = f"sin respuesta en {decision_timeout_s}s"
+                    except Exception as e:
+                        event["error"] = f"{type(e).__name__}: {e}"
+                if "error" in event:
+                    metrics.inc("ss91_stream_decision_skipped_total")
+            event["latency_s"] = latency = clock() - start
+            metrics.observe("ss91_stream_bar_seconds", latency)
+            yield event
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def measure(events):
+    """Consume `events` y devuelve velas, throughput y latencias (p50/p99/max)."""
+    start = time.perf_counter()
+    latencies, signals, decisions = [], 0, {}
+    for event in events:
+        latencies.append(event["latency_s"])
+        signals += event["signal"] != SIGNAL_HOLD
+        decisions[event["decision"]] = decisions.get(event["decision"], 0) + 1
+    elapsed = time.perf_counter() - start
+    lat = np.asarray(latencies) if latencies else np.zeros(1)
+    return {
+        "bars": len(latencies),
+        "elapsed_s": round(elapsed, 4),
+        "bars_per_s": round(len(latencies) / elapsed, 1) if elapsed > 0 else None,
+        "latency_p50_ms": round(float(np.percentile(lat, 50)) * 1e3, 4),
+        "latency_p99_ms": round(float(np.percentile(lat, 99)) * 1e3, 4),
+        "latency_max_ms": round(float(lat.max()) * 1e3, 4),
+        "signals": signals,
+        "decisions": decisions,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Modo streaming intradía de SS91-V3")
+    parser.add_argument("--symbol", default="EURUSD=X")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--replay", help="CSV de velas a reproducir")
+    source.add_argument("--poll", action="store_true", help="Consultar yfinance periódicamente")
+    parser.add_argument("--interval", default="1m")
+    parser.add_argument("--every", type=float, default=60.0, help="Segundos entre consultas (--poll)")
+    parser.add_argument("--speed", type=float, help="Velocidad de reproducción (--replay)")
+    parser.add_argument("--fibo-lookback", type=int)
+    parser.add_argument("--factor-interval", type=float, default=DEFAULT_FACTOR_INTERVAL_S)
+    parser.add_argument("--static-factors", action="store_true", help="No refrescar factores marginales")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        bars = replay_file(args.replay, speed=args.speed)
+    else:
+        bars = poll_bars(args.symbol, interval=args.interval, every_s=args.every)
+    factors = static_factors() if args.static_factors else MarginalRefresher(interval_s=args.factor_interval)
+    events = stream_decisions(bars, factors, fibo_lookback=args.fibo_lookback, symbol=args.symbol)
+
+    def report(events):
+        for event in events:
+            if event["signal"] != SIGNAL_HOLD:
+                print(json.dumps({k: v for k, v in event.items() if k != "record"}, default=str), flush=True)
+            yield event
+
+    print(json.dumps(measure(report(events)), indent=2))
+    metrics.write_prometheus()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Barrido de umbrales y optimización walk-forward de la estrategia.
+
+Los arrays de indicadores (RSI, ratio Fibonacci, sentimiento, Trends y
+retornos) se calculan una vez y se copian a un bloque de memoria compartida
+(multiprocessing.shared_memory). Los procesos del pool se enganchan a ese
+bloque al arrancar, así que cada tarea sólo viaja con su lote de
+combinaciones y el rango de velas, no con los arrays.
+
+    python -m ss91_v3.sweep --period 5y --folds 5 --workers 8
+
+Cada fold elige la mejor combinación en su tramo de entrenamiento y la
+evalúa fuera de muestra en el tramo siguiente. Sentimiento y Trends salen
+del histórico point-in-time (factor_history); sin él no se ejecuta.
+"""
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from ss91_v3.factor_history import FACTOR_HISTORY_DIR
+from ss91_v3.backtest import (DEFAULT_FIBO_LOOKBACK, fibo_position_ratio, pnl_from_positions,
+                              positions_from_signals, simple_returns, summarize_arrays)
+from ss91_v3.strategy import DEFAULT_THRESHOLDS, evaluate_rules, rule_signals
+from ss91_v3.utils import log
+
+SWEEP_DIR = os.path.join("results", "sweeps")
+DEFAULT_CHUNK_SIZE = 256
+
+# Rejilla por defecto alrededor de los umbrales de siempre (3^7 = 2187 combinaciones)
+DEFAULT_GRID = {
+    "rsi_low": [25.0, 30.0, 35.0],
+    "rsi_high": [65.0, 70.0, 75.0],
+    "fibo_low": [0.1, 0.2, 0.3],
+    "fibo_high": [0.7, 0.8, 0.9],
+    "sentiment_panic": [0.3, 0.35, 0.4],
+    "sentiment_euphoria": [0.7, 0.8, 0.9],
+    "gtrends_crisis": [0.3, 0.5, 0.7],
+}
+
+_SHARED = None  # arrays del proceso worker (vistas sobre la memoria compartida)
+_SHM = None
+
+
+def param_grid(grid):
+    """Lista de dicts de umbrales (producto cartesiano de `grid`)."""
+    keys = list(grid)
+    unknown = set(keys) - set(DEFAULT_THRESHOLDS)
+    if unknown:
+        raise KeyError(f"Umbrales desconocidos: {sorted(unknown)}")
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def prepare_arrays(df, sentiment=0.5, gtrends_crisis=0.0, fibo_lookback=DEFAULT_FIBO_LOOKBACK, rsi_col="RSI_14"):
+    """Matriz (5 x n): rsi, fibo_ratio, sentiment, gtrends_crisis y returns."""
+    close = df["close"].to_numpy(dtype=float)
+    n = close.size
+    return np.vstack([
+        df[rsi_col].to_numpy(dtype=float),
+        fibo_position_ratio(df["high"], df["low"], close, fibo_lookback),
+        np.broadcast_to(np.asarray(sentiment, dtype=float), n),
+        np.broadcast_to(np.asarray(gtrends_crisis, dtype=float), n),
+        simple_returns(close),
+    ])
+
+
+def evaluate_combo(arrays, thresholds, start=0, end=None, sticky=True, cost=0.0, periods_per_year=252):
+    """Métricas de `summarize` para unos umbrales en las velas [start, end)."""
+    rsi, fibo_ratio, sentiment, gtrends_crisis, returns = (row[start:end] for row in arrays)
+    panic, euphoria = evaluate_rules(rsi, fibo_ratio, sentiment, gtrends_crisis, thresholds)
+    signals = rule_signals(panic, euphoria)
+    positions = positions_from_signals(signals, sticky=sticky)
+    pnl = pnl_from_positions(returns, positions, cost)
+    return summarize_arrays(pnl, positions, signals, periods_per_year)
+
+
+# --- Pool de procesos con memoria compartida ---
+def _attach(name, shape):
+    global _SHARED, _SHM
+    _SHM = shared_memory.SharedMemory(name=name)
+    _SHARED = np.ndarray(shape, dtype=np.float64, buffer=_SHM.buf)
+
+
+def _evaluate_chunk(combos, start, end, sticky, cost):
+    return [evaluate_combo(_SHARED, combo, start, end, sticky, cost) for combo in combos]
+
+
+class SweepRunner:
+    """
+    Evalúa lotes de combinaciones sobre los mismos arrays. Con workers > 1
+    los arrays viven en memoria compartida durante toda la vida del runner
+    (usar como context manager para liberarla).
+    """
+
+    def __init__(self, arrays, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, sticky=True, cost=0.0):
+        self.arrays = np.ascontiguousarray(arrays, dtype=np.float64)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.sticky = sticky
+        self.cost = cost
+        self._shm = None
+        self._pool = None
+        if self.workers > 1:
+            self._shm = shared_memory.SharedMemory(create=True, size=self.arrays.nbytes)
+            shared = np.ndarray(self.arrays.shape, dtype=np.float64, buffer=self._shm.buf)
+            shared[:] = self.arrays
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_attach,
+                                             initargs=(self._shm.name, self.arrays.shape))
+
+    def evaluate(self, combos, start=0, end=None):
+        """Lista de métricas, una por combinación, en las velas [start, end)."""
+        if self._pool is None:
+            return [evaluate_combo(self.arrays, c, start, end, self.sticky, self.cost) for c in combos]
+        chunks = [combos[i:i + self.chunk_size] for i in range(0, len(combos), self.chunk_size)]
+        futures = [self._pool.submit(_evaluate_chunk, chunk, start, end, self.sticky, self.cost) for chunk in chunks]
+        return [metrics for future in futures for metrics in future.result()]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def run_sweep(arrays, grid=None, workers=None, start=0, end=None, **kwargs):
+    """DataFrame con una fila por combinación: umbrales + métricas."""
+    combos = param_grid(grid or DEFAULT_GRID)
+    with SweepRunner(arrays, workers=workers, **kwargs) as runner:
+        metrics = runner.evaluate(combos, start, end)
+    return pd.concat([pd.DataFrame(combos), pd.DataFrame(metrics)], axis=1)
+
+
+def walk_forward_splits(n, folds=5, train_size=None, test_size=None, anchored=False):
+    """
+    Tramos (train_start, train_end, test_start, test_end) consecutivos. Por
+    defecto el histórico se parte en folds+1 bloques: se entrena en uno (o en
+    todos los anteriores con anchored=True) y se prueba en el siguiente.
+    """
+    test_size = test_size or n // (folds + 1)
+    train_size = train_size or test_size
+    if test_size < 1 or train_size + test_size > n:
+        raise ValueError(f"Histórico demasiado corto ({n} velas) para {folds} folds.")
+    splits = []
+    test_start = n - folds * test_size
+    for k in range(folds):
+        test_end = test_start + test_size
+        train_end = test_start
+        train_start = 0 if anchored else max(0, train_end - train_size)
+        splits.append((train_start, train_end, test_start, test_end))
+        test_start = test_end
+    return splits
+
+
+def walk_forward(arrays, grid=None, folds=5, objective="sharpe", workers=None,
+                 train_size=None, test_size=None, anchored=False, min_signals=1, **kwargs):
+    """
+    Optimización walk-forward. Para cada fold barre `grid` en el tramo de
+    entrenamiento, elige la combinación con mejor `objective` (con al menos
+    `min_signals` señales) y la evalúa en el tramo de prueba.
+    Devuelve un DataFrame con una fila por fold (métricas train_* y test_*).
+    """
+    combos = param_grid(grid or DEFAULT_GRID)
+    n = arrays.shape[1]
+    rows = []
+    with SweepRunner(arrays, workers=workers, **kwargs) as runner:
+        for fold, (tr0, tr1, te0, te1) in enumerate(walk_forward_splits(n, folds, train_size, test_size, anchored)):
+            train = pd.DataFrame(runner.evaluate(combos, tr0, tr1))
+            eligible = train[train["n_signals"] >= min_signals]
+            if eligible.empty:
+                log.warning(f"Fold {fold}: ninguna combinación genera señales. Usando los umbrales por defecto.")
+                best, best_train = dict(DEFAULT_THRESHOLDS), evaluate_combo(runner.arrays, None, tr0, tr1)
+            else:
+                i = eligible[objective].idxmax()
+                best, best_train = combos[i], train.loc[i].to_dict()
+            test = runner.evaluate([best], te0, te1)[0]
+            rows.append({
+                "fold": fold, "train_start": tr0, "train_end": tr1, "test_start": te0, "test_end": te1,
+                **{f"param_{k}": v for k, v in best.items()},
+                **{f"train_{k}": v for k, v in best_train.items()},
+                **{f"test_{k}": v for k, v in test.items()},
+            })
+            log.info(f"Fold {fold}: {objective} train={best_train[objective]:.3f} test={test[objective]:.3f}")
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward de los umbrales de la estrategia")
+    parser.add_argument("--symbol", default="EURUSD=X")
+    parser.add_argument("--period", default="5y")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--objective", default="sharpe")
+    parser.add_argument("--grid", help="JSON con la rejilla {umbral: [valores]}")
+    parser.add_argument("--factor-history", default=FACTOR_HISTORY_DIR,
+                        help="Histórico point-in-time de sentimiento y Trends (SS91_FACTOR_MODE=record)")
+    args = parser.parse_args(argv)
+
+    from ss91_v3.backtest_stub import join_strategy_factors
+    from ss91_v3.data_pipeline import fetch_ohlcv
+    from ss91_v3.factor_history import FactorHistory
+    from ss91_v3.fibonacci import fibo_lookback_from_config
+
+    grid = json.loads(args.grid) if args.grid else DEFAULT_GRID
+    df = fetch_ohlcv(args.symbol, period=args.period)
+    # Con los valores neutros de sentimiento y Trends ninguna regla dispara:
+    # el barrido sólo tiene sentido sobre los factores registrados
+    try:
+        df = join_strategy_factors(df, FactorHistory(args.factor_history), require=True)
+    except ValueError as e:
+        log.error(f"Barrido cancelado: {e}")
+        raise SystemExit(1)
+    arrays = prepare_arrays(df, sentiment=df["reddit_vader_avg"].to_numpy(),
+                            gtrends_crisis=df["gtrends_recession"].to_numpy(),
+                            fibo_lookback=fibo_lookback_from_config())
+    report = walk_forward(arrays, grid, folds=args.folds, objective=args.objective, workers=args.workers)
+
+    os.makedirs(SWEEP_DIR, exist_ok=True)
+    path = os.path.join(SWEEP_DIR, f"walk_forward_{args.symbol.replace('=', '_')}.json")
+    report.to_json(path, orient="records", indent=2)
+    log.info(f"Walk-forward guardado en {path}")
+    print(report.filter(regex="^(fold|test_)").to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+
+def random_walk_ohlc(n, seed=0, sigma=0.005, freq="D", start="2015-01-01", spread=0.002, wicks=None,
+                     open_=False, volume=None, rsi=False, date=True, **extra):
+    """
+    Velas sintéticas para los tests: cierre en paseo aleatorio log-normal
+    (volatilidad `sigma` por vela) y high/low a `spread` relativo del cierre.
+
+    wicks=None usa el mismo `spread` en todas las velas; "uniform" lo
+    sortea por vela, independiente para high y low; "normal" usa
+    |N(0, spread)|, simétrico. `open_` y `volume` añaden esas columnas,
+    `rsi` un RSI_14 uniforme 0..100 y `extra` columnas constantes.
+    """
+    rng = np.random.default_rng(seed)
+    close = 1.1 * np.exp(np.cumsum(rng.normal(0, sigma, n)))
+    if wicks == "uniform":
+        up, down = rng.uniform(0, spread, n), rng.uniform(0, spread, n)
+    elif wicks == "normal":
+        up = down = np.abs(rng.normal(0, spread, n))
+    else:
+        up = down = spread
+    data = {}
+    if date:
+        data["date"] = pd.date_range(start, periods=n, freq=freq)
+    if open_:
+        data["open"] = close
+    data.update(high=close * (1 + up), low=close * (1 - down), close=close)
+    if volume is not None:
+        data["volume"] = np.full(n, float(volume))
+    if rsi:
+        data["RSI_14"] = rng.uniform(0, 100, n)
+    for name, value in extra.items():
+        data[name] = np.full(n, value)
+    return pd.DataFrame(data)
@@ -0,0 +1,42 @@
+import time
+import numpy as np
+from conftest import random_walk_ohlc
+from ss91_v3.backtest import run_vectorized_backtest, positions_from_signals, summarize
+from ss91_v3.strategy import evaluate_rules
+
+
+def _frame(n, seed=0):
+    return random_walk_ohlc(n, seed, rsi=True)
+
+
+def test_rules_match_scalar_logic():
+    rng = np.random.default_rng(1)
+    rsi, fibo, sent, gt = rng.uniform(0, 100, 500), rng.uniform(0, 1, 500), rng.uniform(0, 1, 500), rng.uniform(0, 1, 500)
+    panic, euphoria = evaluate_rules(rsi, fibo, sent, gt)
+    for i in range(500):
+        exp_panic = rsi[i] < 30 and fibo[i] < 0.2 and sent[i] < 0.35 and gt[i] > 0.5
+        exp_euph = not exp_panic and rsi[i] > 70 and fibo[i] > 0.8 and sent[i] > 0.8
+        assert panic[i] == exp_panic
+        assert euphoria[i] == exp_euph
+
+
+def test_positions_sticky_forward_fill():
+    sig = np.array([0, 1, 0, 0, -1, 0, 1], dtype=np.int8)
+    assert positions_from_signals(sig).tolist() == [0, 1, 1, 1, -1, -1, 1]
+    assert positions_from_signals(sig, sticky=False).tolist() == sig.tolist()
+
+
+def test_pnl_uses_previous_position():
+    df = _frame(300)
+    res = run_vectorized_backtest(df, sentiment=0.9, gtrends_crisis=0.9)
+    held = np.concatenate([[0], res["position"].to_numpy()[:-1]])
+    np.testing.assert_allclose(res["pnl"].to_numpy(), held * res["returns"].to_numpy())
+    assert set(np.unique(res["signal"])) <= {-1, 0, 1}
+    assert summarize(res)["n_signals"] > 0
+
+
+def test_ten_years_hourly_in_milliseconds():
+    df = _frame(24 * 252 * 10)
+    start = time.perf_counter()
+    run_vectorized_backtest(df, sentiment=0.2, gtrends_crisis=0.9)
+    assert time.perf_counter() - start < 1.0
@@ -0,0 +1,43 @@
+from benchmarks.fakes import FakeYFinance, synthetic_ohlcv
+from benchmarks.run import compare, run_benchmarks
+from benchmarks.startup import TARGETS, check, measure, parse_importtime
+
+
+def test_synthetic_ohlcv_is_consistent():
+    df = synthetic_ohlcv(1000, "min")
+    assert list(df.columns) == ["date", "open", "high", "low", "close", "volume"]
+    assert (df["high"] >= df[["open", "close"]].max(axis=1)).all()
+    assert (df["low"] <= df[["open", "close"]].min(axis=1)).all()
+    fake = FakeYFinance(100)
+    assert len(fake("EURUSD=X", start=str(fake.history["date"].iloc[90].date()))) == 10
+
+
+def test_offline_run_and_regression_compare():
+    results = run_benchmarks(["backtest"], ["1y_daily", "10y_daily"], repeat=1)
+    assert all(r["status"] == "ok" for r in results)
+    baseline = {"results": [dict(r, min_s=r["min_s"] / 2) for r in results]}
+    rows = compare(results, baseline, threshold=1.2)
+    assert len(rows) == 2 and all(regression for *_, regression in rows)
+    assert not any(regression for *_, regression in compare(results, {"results": results}))
+
+
+def test_startup_parse_and_check():
+    stderr = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       120 |        300 |   ss91_v3.utils\n"
+              "import time:        80 |       2500 | ss91_v3.core\n")
+    assert parse_importtime(stderr, "ss91_v3.core") == 2500
+    baseline = {"targets": {"ss91_v3.core": {"import_us": 2000, "maxrss_kb": 1000}}}
+    ok = {"ss91_v3.core": {"import_us": 2100, "maxrss_kb": 1050, "loaded": []}}
+    assert check(ok, baseline, 1.3, 1.1) == []
+    slow = {"ss91_v3.core": {"import_us": 3000, "maxrss_kb": 1200, "loaded": ["pandas"]}}
+    assert len(check(slow, baseline, 1.3, 1.1, time_slack_us=0)) == 3
+    # El margen absoluto absorbe el ruido de imports cortos
+    assert len(check(slow, baseline, 1.3, 1.1)) == 2
+    # Las dependencias cargadas siguen fallando aunque tiempo y memoria no se comprueben
+    assert check(slow, baseline, gate_time=False, gate_memory=False) == ["ss91_v3.core: carga al importarse pandas"]
+
+
+def test_entry_points_do_not_import_heavy_dependencies():
+    for target in ("decitor", "ss91_v3.core", "orchestrator"):
+        result = measure(target, TARGETS[target], repeat=1)
+        assert result["loaded"] == [], (target, result["loaded"])
@@ -0,0 +1,66 @@
+import tracemalloc
+import numpy as np
+import pandas as pd
+import pytest
+from ss91_v3.chunked import compute_indicators_chunked, indicator_table, read_with_indicators
+from ss91_v3.indicators import INDICATOR_COLUMNS, IndicatorState
+from ss91_v3.storage import ColumnarTable, OHLCVStore
+
+
+def _source(path, n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 1.1 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    index = pd.date_range("2020-01-01", periods=n, freq="min", tz="UTC")
+    table = ColumnarTable(str(path))
+    table.append(index, {"open": close, "high": close * 1.001, "low": close * 0.999, "close": close})
+    return table
+
+
+def _expected(source, fill=True):
+    # Una sola pasada: advance completa el DPO de todas las velas internas
+    values, _ = IndicatorState().advance(source.column("high"), source.column("low"), source.column("close"))
+    df = pd.DataFrame(values, columns=INDICATOR_COLUMNS)
+    return df.ffill().bfill() if fill else df
+
+
+@pytest.mark.parametrize("chunk_size", [3, 64, 1000, 5000])
+@pytest.mark.parametrize("fill", [True, False])
+def test_chunked_matches_single_pass(tmp_path, chunk_size, fill):
+    source = _source(tmp_path / "bars", 1200)
+    output = ColumnarTable(str(tmp_path / "ind"))
+    assert compute_indicators_chunked(source, output, chunk_size, fill=fill) == 1200
+    result = output.read()
+    assert list(result.columns) == INDICATOR_COLUMNS
+    assert result.index.equals(source.timestamps())
+    np.testing.assert_allclose(result.to_numpy(), _expected(source, fill).to_numpy(), equal_nan=True)
+
+
+def test_rerun_replaces_output_and_join(tmp_path):
+    store = OHLCVStore(root=str(tmp_path))
+    source = _source(tmp_path / "EURUSD_X" / "1m", 300)
+    output = indicator_table(store, "EURUSD=X", "1m")
+    compute_indicators_chunked(source, output, 100)
+    compute_indicators_chunked(source, output, 70)
+    assert len(output) == 300
+    df = read_with_indicators(source, output, start=source.timestamps(250, 251)[0])
+    assert len(df) == 50 and {"close", "RSI_14", "MACD_12_26_9"} <= set(df.columns)
+
+
+def _peak(source, output, chunk_size):
+    tracemalloc.start()
+    compute_indicators_chunked(source, output, chunk_size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def test_peak_memory_bounded_by_chunk_not_history(tmp_path):
+    short = _source(tmp_path / "short", 1_000)
+    long = _source(tmp_path / "long", 8_000)
+    output = ColumnarTable(str(tmp_path / "ind"))
+    compute_indicators_chunked(short, output, 250)  # calentamiento (cachés de pandas)
+    peak_short = _peak(short, output, 250)
+    peak_long = _peak(long, output, 250)
+    # 8 veces más histórico, misma memoria pico
+    assert peak_long < 1.5 * peak_short
+    assert peak_long < 8_000 * 8 * len(INDICATOR_COLUMNS)
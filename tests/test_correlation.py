@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ss91_v3.correlation import (RollingCorrelation, correlation_factors, factor_key, rolling_correlation,
+                                 rolling_correlation_frame)
+
+
+def _returns(n, seed=0):
+    rng = np.random.default_rng(seed)
+    common = rng.normal(0, 0.004, n)
+    return pd.DataFrame({
+        "EURUSD=X": common + rng.normal(0, 0.001, n),
+        "GBPUSD=X": common + rng.normal(0, 0.002, n),
+        "USDCHF=X": -common + rng.normal(0, 0.002, n),
+        "^GSPC": rng.normal(0, 0.01, n),
+    })
+
+
+def _frames(returns):
+    dates = pd.date_range("2024-01-01", periods=len(returns) + 1, freq="D")
+    return {sym: pd.DataFrame({"date": dates, "close": 1.1 * np.concatenate([[1.0], np.cumprod(1 + returns[sym])])})
+            for sym in returns}
+
+
+@pytest.mark.parametrize("window", [2, 20, 60])
+def test_vectorized_matches_pandas(window):
+    returns = _returns(400)
+    result = rolling_correlation(returns.to_numpy(), window)
+    expected = returns.rolling(window).corr()
+    for t in (window - 2, window - 1, 200, 399):
+        if t < 0:
+            continue
+        np.testing.assert_allclose(result[t], expected.loc[t].to_numpy(), atol=1e-9, equal_nan=True)
+
+
+def test_incremental_matches_vectorized():
+    returns = _returns(500).to_numpy()
+    engine = RollingCorrelation(["a", "b", "c", "d"], window=30, resync_every=97)
+    full = rolling_correlation(returns, 30)
+    for t, row in enumerate(returns):
+        engine.update(row)
+        if t in (10, 29, 250, 499):
+            np.testing.assert_allclose(engine.matrix().to_numpy(), full[t], atol=1e-9, equal_nan=True)
+    assert len(engine) == 30
+
+
+def test_incremental_rejects_bad_rows():
+    engine = RollingCorrelation(["a", "b"], window=5)
+    with pytest.raises(ValueError):
+        engine.update([0.1, np.nan])
+    with pytest.raises(ValueError):
+        engine.update([0.1])
+
+
+def test_flat_series_has_no_correlation():
+    returns = np.column_stack([np.random.default_rng(1).normal(size=50), np.zeros(50)])
+    assert np.isnan(rolling_correlation(returns, 20)[-1, 0, 1])
+
+
+def test_correlation_factors_and_history():
+    returns = _returns(300)
+    frames = _frames(returns)
+    factors = correlation_factors(frames, "EURUSD=X", window=60)
+    assert set(factors) == {"corr_gbpusd", "corr_usdchf", "corr_gspc"}
+    assert factors["corr_gbpusd"] > 0.5 and factors["corr_usdchf"] < -0.5
+    assert factors["corr_gbpusd"] == pytest.approx(returns["EURUSD=X"].iloc[-60:].corr(returns["GBPUSD=X"].iloc[-60:]),
+                                                   abs=1e-6)
+
+    history = rolling_correlation_frame(frames, "EURUSD=X", window=60)
+    assert list(history.columns) == ["GBPUSD=X", "USDCHF=X", "^GSPC"]
+    assert history.iloc[:59].isna().all().all()
+    assert history["GBPUSD=X"].iloc[-1] == pytest.approx(factors["corr_gbpusd"], abs=1e-6)
+
+    short = correlation_factors(_frames(returns.iloc[:10]), "EURUSD=X", window=60)
+    assert short["corr_gbpusd"] is None
+
+
+def test_correlation_state_only_feeds_new_bars(tmp_path, monkeypatch):
+    returns = _returns(300)
+    state_dir = str(tmp_path / "state")
+    updates = []
+    update = RollingCorrelation.update
+    monkeypatch.setattr(RollingCorrelation, "update", lambda self, row: updates.append(1) or update(self, row))
+
+    correlation_factors(_frames(returns.iloc[:250]), "EURUSD=X", window=60, state_dir=state_dir)
+    assert len(updates) == 60
+    updates.clear()
+    factors = correlation_factors(_frames(returns), "EURUSD=X", window=60, state_dir=state_dir)
+    # La vela abierta de la primera ejecución vuelve a entrar; el resto ya estaba en el estado
+    assert len(updates) == 51
+    expected = correlation_factors(_frames(returns), "EURUSD=X", window=60)
+    assert factors == pytest.approx(expected, abs=1e-9)
+
+    # Otra lista de activos invalida el estado guardado
+    updates.clear()
+    fewer = {k: v for k, v in _frames(returns).items() if k != "^GSPC"}
+    assert set(correlation_factors(fewer, "EURUSD=X", window=60, state_dir=state_dir)) == {"corr_gbpusd", "corr_usdchf"}
+    assert len(updates) == 60
+
+
+def test_factor_key():
+    assert factor_key("GBPUSD=X") == "gbpusd"
+    assert factor_key("^DAX") == "dax"
+    assert factor_key("BTC-USD") == "btcusd"
@@ -0,0 +1,161 @@
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from ss91_v3 import core, engine, metrics
+from ss91_v3.snapshot_store import SnapshotStore
+from ss91_v3.strategy import (DEFAULT_RULES, CompiledRules, consumed_factors, evaluate_rules, rules_from_config,
+                              validate_rules)
+
+
+class FakeSherloock:
+    def __init__(self):
+        self.calls = []
+
+    def reason(self, command):
+        self.calls.append(command)
+        if command.startswith("forecast"):
+            return "[FORECAST PuLP] Valor optimizado: 1.00000"
+        return "[MÚSCULO LÓGICO] 3 soluciones"
+
+
+@pytest.fixture
+def fake_engine(monkeypatch):
+    fake = FakeSherloock()
+    monkeypatch.delenv("SHERLOOCK_WORKER", raising=False)
+    monkeypatch.setattr(engine, "_ENGINE", fake)
+    monkeypatch.setattr(engine, "_WORKER", None)
+    engine.clear_reason_cache()
+    yield fake
+    engine.clear_reason_cache()
+
+
+def _snapshot(symbol, rsi, fibo, sentiment, gtrends, close=1.1):
+    return {
+        "symbol": symbol, "snapshot_time_utc": "2024-01-01 10:00:00+00:00",
+        "ohlc_latest": {"RSI_14": rsi, "close": close, "recent_prices": [close - 0.01, close]},
+        "fibonacci": {"position_ratio": fibo, "low_1y": 1.0},
+        "marginal_factors": {"reddit_vader_avg": sentiment, "gtrends_recession": gtrends},
+    }
+
+
+def test_compiled_default_rules_match_evaluate_rules():
+    rng = np.random.default_rng(4)
+    columns = {f: rng.uniform(0, 1, 2000) for f in ("fibo_ratio", "sentiment", "gtrends_crisis")}
+    columns["rsi"] = rng.uniform(0, 100, 2000)
+    fired = CompiledRules().fire(columns)
+    panic, euphoria = evaluate_rules(columns["rsi"], columns["fibo_ratio"], columns["sentiment"],
+                                     columns["gtrends_crisis"])
+    np.testing.assert_array_equal(fired == 0, panic)
+    np.testing.assert_array_equal(fired == 1, euphoria)
+    assert (fired >= 0).any() and (fired == -1).any()
+    assert consumed_factors(DEFAULT_RULES) == ("reddit_vader_avg", "gtrends_recession")
+
+
+def test_rules_from_config_and_validation():
+    config = {"strategy_rules": [{"name": "oversold", "signal": "BUY", "command": "forecast {recent_prices} with_limit {low_1y}",
+                                  "conditions": [["rsi", "<=", 25], ["fibo_ratio", "<", "fibo_low"]]}]}
+    rules = rules_from_config(config)
+    compiled = CompiledRules(rules, {"fibo_low": 0.3})
+    assert compiled.fire({"rsi": [25.0, 26.0, np.nan], "fibo_ratio": [0.29, 0.1, 0.1]}).tolist() == [0, -1, -1]
+    assert consumed_factors(rules) == ()
+    assert rules_from_config({}) == DEFAULT_RULES
+    with pytest.raises(KeyError):
+        validate_rules([{"name": "x", "signal": "BUY", "conditions": [["volumen", ">", 1]]}])
+    with pytest.raises(ValueError):
+        validate_rules([{"name": "x", "signal": "BUY", "conditions": [["rsi", "!=", 1]]}])
+    with pytest.raises(KeyError):
+        CompiledRules([{"name": "x", "signal": "BUY", "conditions": [["rsi", "<", "rsi_bajo"]]}])
+
+
+def test_table_matches_single_decisions(fake_engine):
+    snapshots = [
+        _snapshot("EURUSD=X", 20, 0.1, 0.2, 0.9),    # Pánico
+        _snapshot("GBPUSD=X", 80, 0.9, 0.9, 0.0),    # Euforia
+        _snapshot("USDJPY=X", 50, 0.5, 0.5, 0.0),    # Rango
+        _snapshot("USDCHF=X", 20, 0.1, 0.2, 0.9, close=0.9),
+    ]
+    table = core.generate_decisions(core.snapshot_table(snapshots))
+    assert table["rule"].tolist() == ["panic", "euphoria", "range", "panic"]
+    for i, snapshot in enumerate(snapshots):
+        record, decision, opp_text, _ = core.generate_decision(snapshot)
+        assert record["symbol"] == table.at[i, "symbol"] == snapshot["symbol"]
+        assert table.at[i, "decision"] == decision
+        assert table.at[i, "sherloock_output"] == opp_text
+    assert table["decision"].tolist() == ["BUY", "SELL", "HOLD", "HOLD"]
+
+
+def test_compiled_rules_skip_config_reads(fake_engine, monkeypatch):
+    monkeypatch.setattr(core, "load_rules", lambda: pytest.fail("no debe releer fx_config.json"))
+    monkeypatch.setattr(core, "load_thresholds", lambda: pytest.fail("no debe releer fx_config.json"))
+    compiled = CompiledRules()
+    for _ in range(3):
+        record, decision, _, _ = core.generate_decision(_snapshot("EURUSD=X", 20, 0.1, 0.2, 0.9), rules=compiled)
+        assert decision == "BUY"
+
+
+def test_generate_decision_span_covers_sherloock_call(fake_engine, monkeypatch):
+    reason = fake_engine.reason
+    monkeypatch.setattr(fake_engine, "reason", lambda command: time.sleep(0.05) or reason(command))
+    metrics.enable()
+    metrics.reset()
+    try:
+        core.generate_decision(_snapshot("EURUSD=X", 20, 0.1, 0.2, 0.9), rules=CompiledRules())
+        timings = metrics.run_timings()
+        hist = metrics.REGISTRY.histograms[(metrics.SPAN_METRIC, (("span", "generate_decision"),))]
+    finally:
+        metrics.reset()
+    assert hist.count == 1
+    assert timings["generate_decision"] >= timings["sherloock_reason"] >= 0.05
+
+
+def test_only_fired_rows_reach_sherloock_deduplicated(fake_engine, monkeypatch):
+    n = 600
+    rng = np.random.default_rng(5)
+    table = pd.DataFrame({
+        "symbol": [f"S{i % 60}" for i in range(n)],
+        "ohlc_latest.RSI_14": rng.uniform(0, 100, n),     # columnas aplanadas (SnapshotStore.query)
+        "fibonacci.position_ratio": rng.uniform(0, 1, n),
+        "marginal_factors.reddit_vader_avg": rng.uniform(0, 1, n),
+        "marginal_factors.gtrends_recession": rng.uniform(0, 1, n),
+        "close": np.round(rng.uniform(1.0, 1.2, n), 2),
+    })
+    table["recent_prices"] = [[c - 0.01, c] for c in table["close"]]
+    batches = []
+    reason_many = engine.reason_many
+    monkeypatch.setattr(engine, "reason_many", lambda commands: batches.append(list(commands)) or reason_many(commands))
+    out = core.generate_decisions(table, thresholds={"rsi_low": 40, "fibo_low": 0.4, "sentiment_panic": 0.5,
+                                                     "gtrends_crisis": 0.3})
+    fired = out["rule"] != "range"
+    assert len(batches) == 1 and len(batches[0]) == fired.sum()
+    assert len(fake_engine.calls) == out.loc[fired, "command"].nunique() < fired.sum()
+    assert (out.loc[~fired, "command"] == "").all() and (out.loc[~fired, "decision"] == "HOLD").all()
+    assert set(out.loc[out["rule"] == "euphoria", "decision"]) <= {"SELL"}
+
+
+def test_batch_and_single_send_the_same_command(fake_engine, tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    snapshot = _snapshot("EURUSD=X", 20, 0.1, 0.2, 0.9)
+    store.append(snapshot)
+    core.generate_decision(snapshot)
+    engine.clear_reason_cache()
+    table = core.generate_decisions(core.snapshot_table(store.records()))
+    assert table["command"].tolist() == [fake_engine.calls[0]] == [fake_engine.calls[1]]
+    assert "1.09" in fake_engine.calls[0]  # recent_prices, no sólo el cierre
+
+    # Las columnas aplanadas no traen recent_prices: se rechaza en vez de enviar otro comando
+    flat = store.query(["RSI_14", "position_ratio", "reddit_vader_avg", "gtrends_recession", "close"])
+    flat.columns = ["ohlc_latest.RSI_14", "fibonacci.position_ratio", "marginal_factors.reddit_vader_avg",
+                    "marginal_factors.gtrends_recession", "ohlc_latest.close"]
+    with pytest.raises(ValueError):
+        core.generate_decisions(flat)
+    euphoria = flat.assign(**{"ohlc_latest.RSI_14": 80.0, "fibonacci.position_ratio": 0.9,
+                              "marginal_factors.reddit_vader_avg": 0.9})
+    assert core.generate_decisions(euphoria)["decision"].tolist() == ["SELL"]
+
+
+def test_empty_and_quiet_tables_skip_engine(monkeypatch):
+    monkeypatch.setattr(engine, "is_available", lambda: pytest.fail("no debe consultar Sherloock"))
+    assert core.generate_decisions(pd.DataFrame()).empty
+    quiet = core.generate_decisions(core.snapshot_table([_snapshot("EURUSD=X", 50, 0.5, 0.5, 0.0)]))
+    assert quiet["rule"].tolist() == ["range"] and quiet["decision"].tolist() == ["HOLD"]
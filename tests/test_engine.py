@@ -0,0 +1,96 @@
+import threading
+import pytest
+from ss91_v3 import engine
+
+
+class FakeSherloock:
+    def __init__(self):
+        self.calls = []
+
+    def reason(self, command):
+        self.calls.append(command)
+        if command == "boom":
+            raise ValueError("comando inválido")
+        return f"[FORECAST PuLP] optimizado: {len(self.calls)}"
+
+
+@pytest.fixture(autouse=True)
+def fresh_engine(monkeypatch):
+    monkeypatch.delenv("SHERLOOCK_WORKER", raising=False)
+    monkeypatch.setattr(engine, "_ENGINE", None)
+    monkeypatch.setattr(engine, "_WORKER", None)
+    engine.clear_reason_cache()
+    yield
+    engine.clear_reason_cache()
+
+
+def test_engine_is_built_lazily_once(monkeypatch):
+    built = []
+    monkeypatch.setattr(engine, "_build_engine", lambda: built.append(1) or FakeSherloock())
+    assert built == []
+    assert engine.get_engine() is engine.get_engine()
+    assert built == [1]
+
+
+def test_reason_is_memoized_by_command(monkeypatch):
+    fake = FakeSherloock()
+    monkeypatch.setattr(engine, "_ENGINE", fake)
+    first = engine.reason("forecast [1.1, 1.2] with_limit 1.0")
+    assert engine.reason("forecast [1.1, 1.2] with_limit 1.0") == first
+    engine.reason("forecast [1.1, 1.3] with_limit 1.0")
+    assert len(fake.calls) == 2
+    # Los errores no quedan en caché
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            engine.reason("boom")
+    assert fake.calls.count("boom") == 2
+
+
+def test_unavailable_engine_raises_import_error(monkeypatch):
+    def fail():
+        raise RuntimeError("sin modelos")
+
+    monkeypatch.setattr(engine, "_build_engine", fail)
+    assert not engine.is_available()
+    with pytest.raises(ImportError):
+        engine.reason("forecast [1.0] with_limit 1.0")
+
+
+def test_persistent_worker_serves_reason(monkeypatch):
+    fake = FakeSherloock()
+    ready = threading.Event()
+    bound = {}
+    server = threading.Thread(
+        target=engine.serve, args=(("127.0.0.1", 0),),
+        kwargs={"engine": fake, "ready": lambda addr: bound.update(addr=addr) or ready.set()},
+        daemon=True,
+    )
+    server.start()
+    assert ready.wait(5)
+    host, port = bound["addr"]
+    monkeypatch.setenv("SHERLOOCK_WORKER", f"{host}:{port}")
+    # El proceso cliente nunca construye su propio motor
+    monkeypatch.setattr(engine, "_build_engine", lambda: pytest.fail("no debe cargar Sherloock"))
+
+    assert engine.is_available()
+    assert engine.reason("solve parallel euforia_check where x > 100").startswith("[FORECAST PuLP]")
+    engine.clear_reason_cache()
+    engine.reason("solve parallel euforia_check where x > 100")
+    assert len(fake.calls) == 1  # memoizado también en el worker
+    with pytest.raises(RuntimeError, match="comando inválido"):
+        engine.reason("boom")
+
+    engine._WORKER.close()
+    engine.stop_worker(f"{host}:{port}")
+    server.join(5)
+    assert not server.is_alive()
+
+
+def test_core_decision_without_command_does_not_load_engine(monkeypatch):
+    from ss91_v3 import core
+
+    monkeypatch.setattr(engine, "_build_engine", lambda: pytest.fail("no debe cargar Sherloock"))
+    data = {"ohlc_latest": {"RSI_14": 50.0, "close": 1.1}, "fibonacci": {"position_ratio": 0.5},
+            "marginal_factors": {"reddit_vader_avg": 0.5}}
+    record, decision, _, _ = core.generate_decision(data)
+    assert decision == "HOLD" and record["data_used"]["rsi"] == 50.0
@@ -0,0 +1,69 @@
+import threading
+from ss91_v3.factor_cache import FactorCache, fetch_fred_series
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_fresh_then_stale_while_revalidate(tmp_path):
+    clock = FakeClock()
+    cache = FactorCache(str(tmp_path / "cache.json"), clock=clock)
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(clock.now)
+        if len(calls) > 1:
+            release.wait(5)
+        return {"gtrends_recession": len(calls) / 10}
+
+    assert cache.get("interest", fetch, ttl=60) == {"gtrends_recession": 0.1}
+    assert cache.status["interest"] == "miss"
+    clock.now += 30
+    assert cache.get("interest", fetch, ttl=60) == {"gtrends_recession": 0.1}
+    assert cache.status["interest"] == "fresh" and len(calls) == 1
+
+    # Caducado: se sirve el valor viejo sin esperar al refresco
+    clock.now += 60
+    assert cache.get("interest", fetch, ttl=60) == {"gtrends_recession": 0.1}
+    assert cache.status["interest"] == "stale"
+    release.set()
+    cache.wait(5)
+    assert cache.get("interest", fetch, ttl=60) == {"gtrends_recession": 0.2}
+
+    # Persistido en disco
+    assert FactorCache(str(tmp_path / "cache.json"), clock=clock).peek("interest")["value"] == {"gtrends_recession": 0.2}
+
+
+def test_failed_refresh_keeps_last_good_value():
+    clock = FakeClock()
+    cache = FactorCache(path=None, clock=clock, background=False)
+    cache.put("macro", {"fred_debt_norm": 0.4})
+    clock.now += 100
+
+    def boom():
+        raise RuntimeError("FRED caído")
+
+    assert cache.get("macro", boom, ttl=10) == {"fred_debt_norm": 0.4}
+    assert cache.peek("macro")["value"] == {"fred_debt_norm": 0.4}
+
+
+def test_fred_fetches_only_new_observations():
+    cache = FactorCache(path=None)
+    requested = []
+    history = [{"date": f"2024-{m:02d}-01", "value": str(m)} for m in range(1, 13)]
+
+    def fetch_page(start):
+        requested.append(start)
+        return [o for o in history if start is None or o["date"] >= start]
+
+    history_visible = history[:10]
+    fetch_fred_series(cache, "TERMCBCCALLNS", lambda s: [o for o in fetch_page(s) if o in history_visible])
+    obs = fetch_fred_series(cache, "TERMCBCCALLNS", fetch_page)
+    assert requested == [None, "2024-10-01"]
+    assert [o["value"] for o in obs] == [str(m) for m in range(1, 13)]
@@ -0,0 +1,151 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+import pytest
+from ss91_v3 import factors as factors_module
+from ss91_v3.factor_cache import FactorCache
+from ss91_v3.factor_history import FactorHistory, factor_mode, join_factors
+from ss91_v3.factors import DEFAULT_FACTORS, collect_marginal_factors
+from ss91_v3.sentiment import SentimentCache
+
+API_KEYS = {"REDDIT_CLIENT_ID": "id", "REDDIT_SECRET": "secret", "FRED_API_KEY": "secret-key"}
+
+
+@pytest.fixture
+def history(tmp_path):
+    return FactorHistory(str(tmp_path / "history"))
+
+
+def _fill(history, n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    times = pd.Timestamp("2020-01-01 10:00", tz="UTC") + pd.to_timedelta(np.sort(rng.choice(2000, n, replace=False)), "D")
+    values = rng.uniform(0, 1, n)
+    for t, v in zip(times, values):
+        history.record("sentiment", {"reddit_vader_avg": v}, as_of=t)
+    return pd.DataFrame({"as_of": times, "reddit_vader_avg": values})
+
+
+def test_asof_join_matches_merge_asof(history):
+    recorded = _fill(history)
+    dates = pd.date_range("2019-12-01", "2025-06-01", freq="D", tz="UTC")
+    result = history.asof(dates)
+    expected = pd.merge_asof(pd.DataFrame({"date": dates}), recorded, left_on="date", right_on="as_of")
+    np.testing.assert_allclose(result["reddit_vader_avg"].to_numpy(), expected["reddit_vader_avg"].to_numpy(),
+                               equal_nan=True)
+    # Antes del primer registro no hay valor (sin mirar al futuro)
+    assert result.loc[:recorded["as_of"].iloc[0] - pd.Timedelta(1, "ns")].isna().all().all()
+
+
+def test_naive_dates_max_age_and_values_at(history):
+    history.record("interest", {"gtrends_recession": 0.2}, as_of="2024-01-01 10:00")
+    history.record("interest", {"gtrends_recession": 0.7}, as_of="2024-01-10 10:00")
+    history.record("macro", {"fred_debt_norm": 0.5}, as_of="2024-01-05")
+    df = history.asof(pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-20"]), max_age="5D")
+    assert np.isnan(df["gtrends_recession"].iloc[0])  # el registro es de las 10:00
+    assert df["gtrends_recession"].iloc[1] == 0.2
+    assert np.isnan(df["gtrends_recession"].iloc[2])  # 10 días de antigüedad > 5D
+    assert history.values_at("2024-01-11") == {"gtrends_recession": 0.7, "fred_debt_norm": 0.5}
+    assert history.values_at("2024-01-11", source="macro") == {"fred_debt_norm": 0.5}
+    assert history.values_at("2023-01-01") == {}
+    with pytest.raises(ValueError):
+        history.record("interest", {"gtrends_recession": 0.1}, as_of="2023-12-31")
+
+
+def test_raw_responses_by_date(history):
+    history.record("macro", {"fred_debt_norm": 0.4}, raw=[{"json": {"v": 1}}], as_of="2024-01-01")
+    history.record("macro", {"fred_debt_norm": 0.5}, as_of="2024-02-01")
+    history.record("macro", {"fred_debt_norm": 0.6}, raw=[{"json": {"v": 3}}], as_of="2024-03-01")
+    assert history.raw_at("macro", "2024-01-15") == [{"json": {"v": 1}}]
+    assert history.raw_at("macro", "2024-02-15") is None
+    assert history.raw_at("macro", "2024-03-02") == [{"json": {"v": 3}}]
+    assert history.raw_at("macro", "2023-01-01") is None
+    assert history.raw_at("sentiment") is None
+
+
+def test_join_factors_fills_defaults(history):
+    history.record("sentiment", {"reddit_vader_avg": 0.9}, as_of="2024-01-03")
+    bars = pd.DataFrame({"date": pd.date_range("2024-01-01", periods=5, freq="D"), "close": np.ones(5)})
+    joined = join_factors(bars, history, columns=["reddit_vader_avg", "gtrends_recession"],
+                          defaults={"reddit_vader_avg": 0.5, "gtrends_recession": 0.0})
+    assert joined["reddit_vader_avg"].tolist() == [0.5, 0.5, 0.9, 0.9, 0.9]
+    assert joined["gtrends_recession"].tolist() == [0.0] * 5
+
+
+def test_join_strategy_factors_requires_records(history):
+    from ss91_v3.backtest_stub import join_strategy_factors
+    bars = pd.DataFrame({"date": pd.date_range("2024-01-01", periods=5, freq="D"), "close": np.ones(5)})
+    history.record("sentiment", {"reddit_vader_avg": 0.9}, as_of="2024-01-03")
+    with pytest.raises(ValueError, match="gtrends_recession"):
+        join_strategy_factors(bars, history, require=True)
+    assert join_strategy_factors(bars, history)["gtrends_recession"].tolist() == [0.0] * 5
+    history.record("interest", {"gtrends_recession": 0.7}, as_of="2024-01-02")
+    joined = join_strategy_factors(bars, history, require=True)
+    assert joined["gtrends_recession"].tolist() == [0.0, 0.7, 0.7, 0.7, 0.7]
+
+
+def _stub_server():
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._reply({"access_token": "token"})
+
+        def do_GET(self):
+            if self.path.startswith("/fred"):
+                self._reply({"observations": [{"date": "2024-01-01", "value": "5.5e11"}]})
+            else:
+                self._reply({"data": {"children": [{"data": {"name": "t3_a", "title": "Great rally"}}]}})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    return server, {"reddit_auth": f"{url}/api/v1/access_token", "reddit_api": url, "fred": f"{url}/fred"}
+
+
+def test_record_then_replay_offline(history, monkeypatch):
+    monkeypatch.setattr(factors_module, "_SENTIMENT_CACHE", SentimentCache(path=None))
+    monkeypatch.setattr(factors_module, "_get_interest_factors",
+                        lambda raw=None: raw.append({"row": 1}) or {"gtrends_eurusd": 0.3, "gtrends_recession": 0.6})
+    server, endpoints = _stub_server()
+    try:
+        live, report = collect_marginal_factors(API_KEYS, endpoints=endpoints, factor_cache=FactorCache(path=None),
+                                                mode="record", history=history)
+    finally:
+        server.shutdown()
+    assert not any(r["fallback"] for r in report.values())
+    assert history.sources == ["interest", "macro", "sentiment"]
+    raw = history.raw_at("macro")
+    assert raw[0]["json"]["observations"][0]["value"] == "5.5e11"
+    assert "api_key" not in raw[0]["params"] and "secret-key" not in json.dumps(raw)
+    assert history.raw_at("interest") == [{"row": 1}]
+
+    # Replay: sin servidor y sin claves
+    replayed, report = collect_marginal_factors({}, mode="replay", history=history)
+    assert replayed == live
+    assert not any(r["fallback"] for r in report.values())
+
+
+def test_replay_without_records_falls_back(history):
+    values, report = collect_marginal_factors({}, mode="replay", history=history, as_of="2000-01-01")
+    assert values == {k: v for d in DEFAULT_FACTORS.values() for k, v in d.items()}
+    assert all(r["fallback"] and "replay" in r["error"] for r in report.values())
+
+
+def test_factor_mode(monkeypatch):
+    monkeypatch.setenv("SS91_FACTOR_MODE", "replay")
+    assert factor_mode() == "replay"
+    assert factor_mode("live") == "live"
+    with pytest.raises(ValueError):
+        factor_mode("offline")
@@ -0,0 +1,112 @@
+import threading
+import time
+import pytest
+from ss91_v3.factor_cache import FactorCache
+from ss91_v3.factor_registry import Evaluation, FactorRegistry, FactorSpec, requested_fields
+from ss91_v3.factors import REGISTRY, collect_marginal_factors
+from ss91_v3.strategy import CONSUMED_FACTORS
+
+
+def _registry(calls):
+    """Dos fuentes que comparten un intermedio lento y una tercera independiente."""
+    def posts(api_keys):
+        calls.append("posts")
+        time.sleep(0.2)
+        return ["a", "b", "c"]
+
+    return FactorRegistry([
+        FactorSpec("posts", posts, inputs=("api_keys",)),
+        FactorSpec("mood", lambda posts: {"mood": len(posts) / 10}, inputs=("posts",), outputs=("mood",),
+                   defaults={"mood": 0.5}),
+        FactorSpec("activity", lambda posts: {"activity": len(posts)}, inputs=("posts",), outputs=("activity",),
+                   defaults={"activity": 0}, cost=0.5),
+        FactorSpec("macro", lambda: calls.append("macro") or {"debt": 1.0}, outputs=("debt",),
+                   defaults={"debt": 0.5}, ttl=3600),
+    ])
+
+
+def test_only_sources_for_consumed_fields_run():
+    assert REGISTRY.sources_for(CONSUMED_FACTORS) == ["sentiment", "interest"]
+    assert set(REGISTRY.sources_for()) == {"sentiment", "interest", "macro"}
+    calls = []
+    registry = _registry(calls)
+    values, report = collect_marginal_factors({}, registry=registry, fields=["mood"],
+                                              factor_cache=FactorCache(path=None))
+    assert values == {"mood": 0.3} and list(report) == ["mood"]
+    assert calls == ["posts"]
+    with pytest.raises(KeyError):
+        registry.sources_for(["no_existe"])
+
+
+def test_shared_intermediate_is_computed_once_in_parallel():
+    calls = []
+    start = time.perf_counter()
+    values, report = collect_marginal_factors({}, registry=_registry(calls), factor_cache=FactorCache(path=None))
+    assert values == {"mood": 0.3, "activity": 3, "debt": 1.0}
+    assert sorted(calls) == ["macro", "posts"]
+    assert not any(r["fallback"] for r in report.values())
+    assert time.perf_counter() - start < 0.4
+
+
+def test_failed_intermediate_falls_back_every_dependent():
+    registry = FactorRegistry([
+        FactorSpec("posts", lambda: (_ for _ in ()).throw(RuntimeError("sin red"))),
+        FactorSpec("mood", lambda posts: {"mood": 1.0}, inputs=("posts",), outputs=("mood",), defaults={"mood": 0.5}),
+        FactorSpec("activity", lambda posts: {"activity": 1}, inputs=("posts",), outputs=("activity",)),
+    ])
+    values, report = collect_marginal_factors({}, registry=registry, factor_cache=FactorCache(path=None))
+    assert values == {"mood": 0.5}
+    assert report["mood"]["error"] == report["activity"]["error"] == "sin red"
+
+
+def test_fresh_cache_skips_intermediates():
+    calls = []
+    registry = _registry(calls)
+    registry.register(FactorSpec("trends", lambda posts: {"trend": 1.0}, inputs=("posts",), outputs=("trend",),
+                                 ttl=3600))
+    cache = FactorCache(path=None)
+    cache.put("trends", {"trend": 0.7})
+    values, report = collect_marginal_factors({}, registry=registry, fields=["trend"], factor_cache=cache)
+    assert values == {"trend": 0.7} and report["trends"]["cache"] == "fresh"
+    assert calls == []
+
+
+def test_graph_validation():
+    registry = FactorRegistry([
+        FactorSpec("a", lambda b: b, inputs=("b",), outputs=("x",)),
+        FactorSpec("b", lambda a: a, inputs=("a",)),
+    ])
+    with pytest.raises(ValueError):
+        registry.upstream(["a"])
+    with pytest.raises(KeyError):
+        FactorRegistry([FactorSpec("a", lambda c: c, inputs=("c",), outputs=("x",))]).upstream(["a"])
+    with pytest.raises(ValueError):
+        registry.register(FactorSpec("a", dict))
+
+
+def test_evaluation_memoizes_across_threads():
+    counter = []
+    lock = threading.Lock()
+
+    def slow():
+        with lock:
+            counter.append(1)
+        time.sleep(0.05)
+        return 42
+
+    evaluation = Evaluation(FactorRegistry([FactorSpec("x", slow)]))
+    threads = [threading.Thread(target=evaluation.resolve, args=("x",)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert evaluation.resolve("x") == 42 and len(counter) == 1
+
+
+def test_requested_fields(monkeypatch):
+    monkeypatch.delenv("SS91_FACTORS", raising=False)
+    assert requested_fields() == list(CONSUMED_FACTORS)
+    assert requested_fields("all") is None
+    monkeypatch.setenv("SS91_FACTORS", "fred_debt_norm, reddit_vader_avg")
+    assert requested_fields() == ["fred_debt_norm", "reddit_vader_avg"]
+    assert requested_fields(["x"]) == ["x"]
@@ -0,0 +1,98 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from ss91_v3 import factors as factors_module
+from ss91_v3.factors import collect_marginal_factors, DEFAULT_FACTORS
+from ss91_v3.factor_cache import FactorCache
+from ss91_v3.sentiment import SentimentCache
+
+API_KEYS = {"REDDIT_CLIENT_ID": "id", "REDDIT_SECRET": "secret", "FRED_API_KEY": "key"}
+
+
+def _stub_server(delay=0.0):
+    """Servidor HTTP local que imita Reddit y FRED con un retardo fijo."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, payload):
+            time.sleep(delay)
+            body = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._reply({"access_token": "token"})
+
+        def do_GET(self):
+            if self.path.startswith("/fred"):
+                self._reply({"observations": [{"date": "2024-01-01", "value": "5.5e11"}, {"date": "2024-02-01", "value": "."}]})
+            else:
+                titles = ["Great rally, amazing gains", "Terrible crash, awful losses", "EUR flat"]
+                self._reply({"data": {"children": [{"data": {"title": t}} for t in titles]}})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    return server, {"reddit_auth": f"{url}/api/v1/access_token", "reddit_api": url, "fred": f"{url}/fred"}
+
+
+@pytest.fixture(autouse=True)
+def memory_sentiment_cache(monkeypatch):
+    monkeypatch.setattr(factors_module, "_SENTIMENT_CACHE", SentimentCache(path=None))
+    monkeypatch.setattr(factors_module, "get_factor_cache", lambda: FactorCache(path=None))
+
+
+@pytest.fixture
+def fast_server():
+    server, endpoints = _stub_server()
+    yield endpoints
+    server.shutdown()
+
+
+def test_collects_all_sources(fast_server):
+    factors, report = collect_marginal_factors(
+        API_KEYS, endpoints=fast_server,
+        sources={"interest": lambda: {"gtrends_eurusd": 0.3, "gtrends_recession": 0.1}},
+    )
+    assert factors["fred_debt_norm"] == 0.5  # 5.5e11 / 1.1e12
+    assert 0.0 <= factors["reddit_vader_avg"] <= 1.0
+    assert factors["gtrends_recession"] == 0.1
+    assert not any(r["fallback"] for r in report.values())
+
+
+def test_slow_source_falls_back_within_deadline(fast_server):
+    slow_server, slow_endpoints = _stub_server(delay=1.5)
+    try:
+        start = time.perf_counter()
+        factors, report = collect_marginal_factors(
+            API_KEYS,
+            deadlines={"sentiment": 0.5, "macro": 2.0, "interest": 2.0},
+            endpoints={**fast_server, "reddit_auth": slow_endpoints["reddit_auth"]},
+            sources={"interest": lambda: time.sleep(0.3) or {"gtrends_eurusd": 0.3, "gtrends_recession": 0.1}},
+        )
+        wall = time.perf_counter() - start
+    finally:
+        slow_server.shutdown()
+
+    assert report["sentiment"]["fallback"] and report["sentiment"]["error"] == "deadline"
+    assert factors["reddit_vader_avg"] == DEFAULT_FACTORS["sentiment"]["reddit_vader_avg"]
+    assert not report["macro"]["fallback"] and not report["interest"]["fallback"]
+    # Acotado por la fuente más lenta, no por la suma
+    assert wall < 1.0
+
+
+def test_failing_source_is_reported(fast_server):
+    def boom():
+        raise RuntimeError("sin conexión")
+
+    factors, report = collect_marginal_factors(API_KEYS, endpoints=fast_server, sources={"interest": boom})
+    assert report["interest"] == {"fallback": True, "elapsed_s": report["interest"]["elapsed_s"], "error": "sin conexión"}
+    assert factors["gtrends_recession"] == 0
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import random_walk_ohlc
+from ss91_v3.fibonacci import (FIBO_LEVELS, RollingExtrema, fibo_lookback_from_config,
+                               rolling_fibonacci, rolling_max, rolling_min)
+
+
+def _ohlc(n, seed=0):
+    return random_walk_ohlc(n, seed, sigma=0.004, date=False)
+
+
+@pytest.mark.parametrize("window", [1, 2, 5, 20, 252, 5000])
+def test_rolling_extremes_match_pandas(window):
+    x = np.random.default_rng(1).normal(size=1000)
+    x[10] = np.nan
+    expected_max = pd.Series(x).rolling(window, min_periods=1).max().to_numpy()
+    expected_min = pd.Series(x).rolling(window, min_periods=1).min().to_numpy()
+    np.testing.assert_allclose(rolling_max(x, window), expected_max)
+    np.testing.assert_allclose(rolling_min(x, window), expected_min)
+
+
+def test_streaming_extrema_match_vectorized():
+    df = _ohlc(500)
+    window = 30
+    streaming = RollingExtrema(window)
+    rows = np.array([streaming.update(h, l) for h, l in zip(df["high"], df["low"])])
+    np.testing.assert_array_equal(rows[:, 0], rolling_max(df["high"], window))
+    np.testing.assert_array_equal(rows[:, 1], rolling_min(df["low"], window))
+
+
+def test_rolling_levels_match_point_in_time_recomputation():
+    df = _ohlc(400)
+    lookback = 60
+    fib = rolling_fibonacci(df, lookback)
+    assert list(fib.columns) == ["high", "low"] + [name for name, _ in FIBO_LEVELS] + \
+        ["nearest_level", "nearest_value", "position_ratio"]
+    # Recalculo O(n²) de referencia en algunas velas
+    for t in (0, 59, 60, 250, 399):
+        window = df.iloc[max(0, t - lookback + 1):t + 1]
+        high, low, close = window["high"].max(), window["low"].min(), df["close"].iloc[t]
+        levels = {name: high - (high - low) * r for name, r in FIBO_LEVELS}
+        nearest = min(levels.items(), key=lambda x: abs(x[1] - close))
+        row = fib.iloc[t]
+        assert row["high"] == high and row["low"] == low
+        assert row["nearest_level"] == nearest[0]
+        assert row["nearest_value"] == pytest.approx(nearest[1])
+        assert row["position_ratio"] == pytest.approx((close - low) / (high - low))
+
+
+def test_flat_range_gives_half_ratio():
+    df = pd.DataFrame({"high": [1.0] * 5, "low": [1.0] * 5, "close": [1.0] * 5})
+    assert rolling_fibonacci(df, 3)["position_ratio"].tolist() == [0.5] * 5
+
+
+def test_lookback_from_config():
+    assert fibo_lookback_from_config({"indicators": {"lookback_period_days": 180}}) == 180
+    assert fibo_lookback_from_config({}, default=99) == 99
@@ -0,0 +1,88 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import random_walk_ohlc
+from ss91_v3.indicators import IndicatorState, INDICATOR_COLUMNS, DPO_COLUMN
+
+
+def _bars(n, seed=0):
+    return random_walk_ohlc(n, seed, sigma=0.004, start="2024-01-01", spread=0.003, wicks="uniform",
+                            open_=True, volume=0)
+
+
+def _full(df):
+    out, revisions = IndicatorState().advance(df["high"], df["low"], df["close"])
+    assert revisions == []
+    return out
+
+
+def test_incremental_matches_single_pass():
+    df = _bars(400)
+    expected = _full(df)
+    state, parts, revisions = IndicatorState(), [], []
+    for a, b in [(0, 30), (30, 31), (31, 200), (200, 400)]:
+        out, rev = state.advance(df["high"][a:b], df["low"][a:b], df["close"][a:b])
+        parts.append(out)
+        revisions += rev
+        # El estado sobrevive a una ida y vuelta por JSON
+        state = IndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+    got = np.vstack(parts)
+    for pos, value in revisions:
+        got[pos, DPO_COLUMN] = value
+    np.testing.assert_allclose(got, expected, rtol=1e-12, atol=1e-12)
+
+
+def test_matches_pandas_ta():
+    pytest.importorskip("pandas_ta")
+    df = _bars(300)
+    df.ta.rsi(length=14, append=True)
+    df.ta.ema(length=20, append=True)
+    df.ta.atr(length=14, append=True)
+    df.ta.aroon(length=14, append=True)
+    df.ta.trix(length=14, append=True)
+    df.ta.dpo(length=14, append=True)
+    df.ta.macd(append=True)
+    np.testing.assert_allclose(_full(df), df[INDICATOR_COLUMNS].to_numpy(), rtol=1e-9, atol=1e-9)
+
+
+def test_fetch_ohlcv_incremental_only_processes_new_bars(tmp_path, monkeypatch):
+    from ss91_v3 import data_pipeline
+
+    history = _bars(300)
+    visible = {"n": 250}
+    requested = []
+
+    def fake_download(symbol, interval="1d", **kwargs):
+        requested.append(kwargs)
+        df = history.iloc[:visible["n"]]
+        if "start" in kwargs:
+            df = df[df["date"] >= kwargs["start"]]
+        return df.reset_index(drop=True)
+
+    monkeypatch.setattr(data_pipeline, "download_ohlcv", fake_download)
+    data_pipeline.fetch_ohlcv("EURUSD=X", period="max", incremental=True, state_dir=str(tmp_path))
+    visible["n"] = 300
+    df = data_pipeline.fetch_ohlcv("EURUSD=X", period="max", incremental=True, state_dir=str(tmp_path))
+
+    assert "start" in requested[-1]
+    expected = pd.DataFrame(_full(history), columns=INDICATOR_COLUMNS).ffill().bfill()
+    np.testing.assert_allclose(df[INDICATOR_COLUMNS].to_numpy(), expected.to_numpy(), rtol=1e-12)
+
+
+def test_download_ohlcv_names_intraday_time_column_date(monkeypatch):
+    yf = pytest.importorskip("yfinance")
+    from ss91_v3 import data_pipeline
+
+    raw = _bars(5).set_index("date").rename_axis("Datetime")
+    raw.columns = pd.MultiIndex.from_tuples([(c.capitalize(), "EURUSD=X") for c in raw.columns])
+    monkeypatch.setattr(yf, "download", lambda *args, **kwargs: raw)
+    df = data_pipeline.download_ohlcv("EURUSD=X", interval="1m", period="1d")
+    assert list(df.columns[:2]) == ["date", "open"]
+
+
+def test_marginal_payload_is_stamped_with_requested_symbol(monkeypatch):
+    from ss91_v3 import data_pipeline, factors
+
+    monkeypatch.setattr(factors, "collect_marginal_factors", lambda *args, **kwargs: ({}, {}))
+    assert data_pipeline.get_all_marginal_factors(_bars(30), symbol="GBPUSD=X")["symbol"] == "GBPUSD=X"
@@ -0,0 +1,85 @@
+import pytest
+from ss91_v3 import metrics
+from ss91_v3.metrics import Registry
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    metrics.enable()
+    metrics.reset()
+    yield
+    metrics.enable()
+    metrics.reset()
+
+
+def test_span_records_timing_and_histogram():
+    with metrics.span("download"):
+        pass
+    with metrics.span("download"):
+        pass
+    timings = metrics.run_timings()
+    assert set(timings) == {"download"}
+    hist = metrics.REGISTRY.histograms[(metrics.SPAN_METRIC, (("span", "download"),))]
+    assert hist.count == 2
+
+
+def test_timed_decorator_counts_errors_and_reraises():
+    @metrics.timed()
+    def boom():
+        raise RuntimeError("x")
+
+    with pytest.raises(RuntimeError):
+        boom()
+    assert boom.__name__ == "boom"
+    assert metrics.REGISTRY.counters[(metrics.SPAN_ERRORS, (("span", "boom"),))] == 1
+    assert "boom" in metrics.run_timings()
+
+
+def test_disabled_is_noop():
+    metrics.disable()
+
+    @metrics.timed("f")
+    def f():
+        return 42
+
+    assert f() == 42
+    with metrics.span("g"):
+        pass
+    metrics.inc("ss91_factor_fallback_total", source="macro")
+    assert metrics.span("g") is metrics.span("h")
+    assert metrics.run_timings() == {}
+    assert metrics.REGISTRY.counters == {}
+
+
+def test_prometheus_text_format(tmp_path):
+    registry = Registry(buckets=(0.1, 1.0))
+    registry.record_span("fetch_ohlcv", 0.05)
+    registry.record_span("fetch_ohlcv", 0.5)
+    registry.inc("ss91_factor_fallback_total", source='ma"cro')
+    text = registry.to_prometheus()
+
+    assert "# TYPE ss91_factor_fallback_total counter" in text
+    assert 'ss91_factor_fallback_total{source="ma\\"cro"} 1' in text
+    assert "# TYPE ss91_span_seconds histogram" in text
+    assert 'ss91_span_seconds_bucket{span="fetch_ohlcv",le="0.1"} 1' in text
+    assert 'ss91_span_seconds_bucket{span="fetch_ohlcv",le="1"} 2' in text
+    assert 'ss91_span_seconds_bucket{span="fetch_ohlcv",le="+Inf"} 2' in text
+    assert 'ss91_span_seconds_count{span="fetch_ohlcv"} 2' in text
+
+    path = registry.write_prometheus(str(tmp_path / "m" / "ss91.prom"))
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == text
+
+
+def test_factor_fallback_counter():
+    from ss91_v3.factor_cache import FactorCache
+    from ss91_v3.factors import collect_marginal_factors
+
+    def failing():
+        raise RuntimeError("sin red")
+
+    sources = {"sentiment": lambda: {"reddit_vader_avg": 0.1}, "interest": lambda: {}, "macro": failing}
+    _, report = collect_marginal_factors({}, sources=sources, factor_cache=FactorCache(path=None))
+    assert report["macro"]["fallback"]
+    counters = metrics.REGISTRY.counters
+    assert counters[("ss91_factor_fallback_total", (("reason", "error"), ("source", "macro")))] == 1
@@ -0,0 +1,54 @@
+import time
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pandas_ta")
+from ss91_v3.multi_asset import collect_multi_asset, cross_asset_features
+
+CONFIG = {
+    "base_pair": "EURUSD=X",
+    "related_assets": [
+        {"symbol": "GBPUSD=X", "relation": "directa"},
+        {"symbol": "USDCHF=X", "relation": "inversa"},
+        {"symbol": "^GSPC", "relation": "moderada"},
+    ],
+}
+
+
+def fake_batch(symbols, interval="1d", **kwargs):
+    rng = np.random.default_rng(0)
+    n = 300
+    common = rng.normal(0, 0.004, n)
+    signs = {"EURUSD=X": 1, "GBPUSD=X": 1, "USDCHF=X": -1, "^GSPC": 0}
+    frames = {}
+    for sym in symbols:
+        close = 1.1 * np.exp(np.cumsum(signs[sym] * common + rng.normal(0, 0.001, n)))
+        frames[sym] = pd.DataFrame({
+            "date": pd.date_range("2024-01-01", periods=n, freq="D"),
+            "open": close, "high": close * 1.001, "low": close * 0.999, "close": close,
+            "volume": np.zeros(n),
+        })
+    return frames
+
+
+def slow_compute(df):
+    time.sleep(0.3)
+    return df.assign(RSI_14=50.0)
+
+
+def test_cross_asset_relations():
+    features = cross_asset_features(fake_batch(["EURUSD=X", "GBPUSD=X", "USDCHF=X"]), "EURUSD=X",
+                                    {"GBPUSD=X": "directa", "USDCHF=X": "inversa"})
+    assert features["GBPUSD=X"]["corr_60"] > 0.8 and features["GBPUSD=X"]["relation_agreement"] == 1.0
+    assert features["USDCHF=X"]["corr_60"] < -0.8 and features["USDCHF=X"]["relation_agreement"] == 1.0
+
+
+def test_collect_runs_symbols_in_parallel():
+    start = time.perf_counter()
+    frames, section = collect_multi_asset(CONFIG, downloader=fake_batch, compute=slow_compute, workers=4)
+    wall = time.perf_counter() - start
+    assert set(section["assets"]) == {"EURUSD=X", "GBPUSD=X", "USDCHF=X", "^GSPC"}
+    assert section["assets"]["GBPUSD=X"]["ohlc_latest"]["RSI_14"] == 50.0
+    assert "^GSPC" in section["cross_asset"] and section["cross_asset"]["^GSPC"]["relation_agreement"] is None
+    assert wall < 4 * 0.3
@@ -0,0 +1,77 @@
+import threading
+import time
+import pytest
+from ss91_v3.pipeline import Pipeline, PipelineError, Stage, report_to_dict
+
+
+def test_runs_in_dependency_order_and_passes_data():
+    pipeline = Pipeline([
+        Stage("decide", lambda snapshot: snapshot["x"] * 2, deps=("snapshot",)),
+        Stage("collect", lambda: 1),
+        Stage("factors", lambda: 10),
+        Stage("snapshot", lambda collect, factors: {"x": collect + factors}, deps=("collect", "factors")),
+    ])
+    results, report = pipeline.run()
+    assert results["decide"] == 22
+    assert pipeline.order.index("snapshot") > pipeline.order.index("collect")
+    assert all(r["status"] == "ok" and r["attempts"] == 1 for r in report_to_dict(report).values())
+
+
+def test_independent_stages_run_in_parallel():
+    barrier = threading.Barrier(2, timeout=2)
+
+    def slow():
+        barrier.wait()  # sólo pasa si las dos etapas corren a la vez
+        time.sleep(0.2)
+        return True
+
+    pipeline = Pipeline([Stage("collect", slow), Stage("factors", slow),
+                         Stage("snapshot", lambda collect, factors: collect and factors, deps=("collect", "factors"))])
+    start = time.perf_counter()
+    results, report = pipeline.run()
+    assert results["snapshot"] and time.perf_counter() - start < 0.39
+    assert report["collect"].elapsed_s >= 0.2
+
+
+def test_retries_then_skips_downstream():
+    calls = {"collect": 0}
+
+    def flaky():
+        calls["collect"] += 1
+        if calls["collect"] < 3:
+            raise ConnectionError("yfinance caído")
+        return 1
+
+    sleeps = []
+    pipeline = Pipeline([
+        Stage("collect", flaky, retries=2, backoff=0.5),
+        Stage("factors", lambda: (_ for _ in ()).throw(RuntimeError("sin claves"))),
+        Stage("snapshot", lambda collect, factors: 0, deps=("collect", "factors")),
+        Stage("decide", lambda snapshot: 0, deps=("snapshot",)),
+    ], sleep=sleeps.append)
+    results, report = pipeline.run()
+    assert results["collect"] == 1 and report["collect"].attempts == 3 and sleeps == [0.5, 1.0]
+    assert report["factors"].status == "failed" and "sin claves" in report["factors"].error
+    assert report["snapshot"].status == "skipped" and report["decide"].status == "skipped"
+
+
+def test_single_stage_loads_its_dependencies():
+    ran = []
+    pipeline = Pipeline([
+        Stage("collect", lambda: ran.append("collect")),
+        Stage("snapshot", lambda collect: ran.append("snapshot"), deps=("collect",), load=lambda: {"x": 5}),
+        Stage("decide", lambda snapshot: snapshot["x"] + 1, deps=("snapshot",)),
+    ])
+    results, report = pipeline.run(targets=["decide"], with_deps=False)
+    assert results["decide"] == 6 and ran == []
+    assert report["snapshot"].status == "loaded"
+
+    with pytest.raises(PipelineError):
+        pipeline.run(targets=["snapshot"], with_deps=False)
+
+
+def test_rejects_cycles_and_unknown_deps():
+    with pytest.raises(PipelineError):
+        Pipeline([Stage("a", lambda b: 0, deps=("b",)), Stage("b", lambda a: 0, deps=("a",))])
+    with pytest.raises(PipelineError):
+        Pipeline([Stage("a", lambda x: 0, deps=("x",))])
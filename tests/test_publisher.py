@@ -0,0 +1,150 @@
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from ss91_v3.publisher import GitHubPublisher, GitHubPublishError, blob_sha
+
+
+class FakeGitHub:
+    """API de git de GitHub mínima en memoria (refs, commits, trees)."""
+
+    def __init__(self, fail_first=0):
+        self.files = {}
+        self.trees = {"t0": {}}
+        self.commits = {"c0": "t0"}
+        self.head = "c0"
+        self.requests = []
+        self.fail_first = fail_first
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, payload, status=200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self):
+                return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+            def _handle(self, method):
+                body = self._body() if method != "GET" else None
+                fake.requests.append((method, self.path))
+                if fake.fail_first > 0:
+                    fake.fail_first -= 1
+                    return self._reply({"message": "unavailable"}, 503)
+                path = self.path.split("/repos/user/data/", 1)[1]
+                if method == "GET" and path == "git/ref/heads/main":
+                    return self._reply({"object": {"sha": fake.head}})
+                if method == "GET" and path.startswith("git/commits/"):
+                    return self._reply({"tree": {"sha": fake.commits[path.rsplit("/", 1)[1]]}})
+                if method == "POST" and path == "git/trees":
+                    files = dict(fake.trees[body["base_tree"]])
+                    files.update({e["path"]: e["content"] for e in body["tree"]})
+                    sha = hashlib.sha1(json.dumps(files, sort_keys=True).encode()).hexdigest()
+                    fake.trees[sha] = files
+                    return self._reply({"sha": sha}, 201)
+                if method == "POST" and path == "git/commits":
+                    sha = f"c{len(fake.commits)}"
+                    fake.commits[sha] = body["tree"]
+                    return self._reply({"sha": sha}, 201)
+                if method == "PATCH" and path == "git/refs/heads/main":
+                    fake.head = body["sha"]
+                    fake.files = fake.trees[fake.commits[fake.head]]
+                    return self._reply({"object": {"sha": fake.head}})
+                return self._reply({"message": "Not Found"}, 404)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PATCH(self):
+                self._handle("PATCH")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def publisher(self, state_path, **kwargs):
+        return GitHubPublisher(user="user", repo="data", token="t", branch="main", api_url=self.url,
+                               state_path=state_path, sleep=lambda s: None, **kwargs)
+
+
+@pytest.fixture
+def github():
+    fake = FakeGitHub()
+    yield fake
+    fake.server.shutdown()
+
+
+def test_blob_sha_matches_git():
+    # git hash-object de "hello\n"
+    assert blob_sha("hello\n") == "ce013625030ba8dba906f756967f9e9ca394464a"
+
+
+def test_batches_files_into_single_commit(github, tmp_path):
+    publisher = github.publisher(str(tmp_path / "published.json"))
+    for day in ("2024-01-01", "2024-01-02"):
+        publisher.add(f"snapshots/{day}.json", json.dumps({"day": day}))
+    publisher.add("decisions/2024-01-02.json", '{"decision": "HOLD"}')
+    commit = publisher.publish()
+
+    assert commit == github.head
+    assert len(github.files) == 3 and github.files["decisions/2024-01-02.json"] == '{"decision": "HOLD"}'
+    # ref + commit + tree + commit + ref: 5 peticiones para todo el lote
+    assert len(github.requests) == 5
+
+
+def test_unchanged_content_is_skipped(github, tmp_path):
+    state = str(tmp_path / "published.json")
+    first = github.publisher(state)
+    first.add("snapshots/a.json", "1")
+    first.add("snapshots/b.json", "2")
+    first.publish()
+    n_requests = len(github.requests)
+
+    # Nueva ejecución (estado leído del disco): sin cambios no hay peticiones
+    second = github.publisher(state)
+    second.add("snapshots/a.json", "1")
+    second.add("snapshots/b.json", "2")
+    assert second.publish() is None
+    assert len(github.requests) == n_requests
+
+    second.add("snapshots/a.json", "1")
+    second.add("snapshots/b.json", "3")
+    assert second.changed() == {"snapshots/b.json": "3"}
+    second.publish()
+    assert github.files == {"snapshots/a.json": "1", "snapshots/b.json": "3"}
+
+
+def test_lost_state_does_not_create_empty_commit(github, tmp_path):
+    first = github.publisher(None)
+    first.add("snapshots/a.json", "1")
+    head = first.publish()
+    again = github.publisher(None)
+    again.add("snapshots/a.json", "1")
+    assert again.publish() is None and github.head == head
+
+
+def test_retries_transient_errors(tmp_path):
+    github = FakeGitHub(fail_first=2)
+    try:
+        publisher = github.publisher(None)
+        publisher.add("snapshots/a.json", "1")
+        assert publisher.publish() is not None
+        assert github.files == {"snapshots/a.json": "1"}
+
+        github.fail_first = 10
+        publisher.add("snapshots/a.json", "2")
+        with pytest.raises(GitHubPublishError):
+            publisher.publish()
+    finally:
+        github.server.shutdown()
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from conftest import random_walk_ohlc
+from ss91_v3.risk import (calc_stop_loss, calc_stop_loss_array, calc_take_profit, calc_take_profit_array,
+                          simulate_trades, summarize_trades)
+
+
+def _frame(n, seed=0):
+    return random_walk_ohlc(n, seed, sigma=0.004, spread=0.003, wicks="normal", ATRr_14=0.005)
+
+
+def _reference(df, signals, stops, targets, max_bars=None):
+    """Simulación vela a vela (lenta) para comparar."""
+    high, low, close = df["high"].to_numpy(), df["low"].to_numpy(), df["close"].to_numpy()
+    trades, t, n = [], 0, len(df)
+    while t < n - 1:
+        side = signals[t]
+        if side == 0 or not np.isfinite(stops[t]):
+            t += 1
+            continue
+        end = n if max_bars is None else min(n, t + 1 + max_bars)
+        exit_i, reason, price = end - 1, "timeout" if end < n else "end", close[end - 1]
+        for j in range(t + 1, end):
+            stop_hit = low[j] <= stops[t] if side > 0 else high[j] >= stops[t]
+            target_hit = high[j] >= targets[t] if side > 0 else low[j] <= targets[t]
+            if stop_hit or target_hit:
+                exit_i, reason = j, "stop" if stop_hit else "target"
+                price = stops[t] if stop_hit else targets[t]
+                break
+        trades.append((t, exit_i, side, reason, price))
+        t = exit_i
+    return trades
+
+
+def test_array_versions_match_scalars():
+    entry = np.array([1.10, 1.20, 1.30])
+    atr = np.array([0.01, 0.02, np.nan])
+    direction = np.array(["BUY", "SELL", "BUY"])
+    stops = calc_stop_loss_array(entry, atr, direction)
+    assert stops[:2] == pytest.approx([calc_stop_loss(1.10, 0.01, "BUY"), calc_stop_loss(1.20, 0.02, "SELL")])
+    assert np.isnan(stops[2])
+    targets = calc_take_profit_array(entry, [0.05, 0.05, np.nan], [1, -1, 0])
+    assert targets[:2] == pytest.approx([calc_take_profit(1.10, 0.05, "BUY"), calc_take_profit(1.20, 0.05, "SELL")])
+    assert np.isnan(targets[2])
+
+
+@pytest.mark.parametrize("max_bars", [None, 5])
+def test_simulator_matches_bar_by_bar_reference(max_bars):
+    df = _frame(1500)
+    signals = np.random.default_rng(3).choice([-1, 0, 0, 0, 1], size=len(df))
+    ledger, equity = simulate_trades(df, signals, wave1=0.004, max_bars=max_bars)
+
+    close = df["close"].to_numpy()
+    stops = calc_stop_loss_array(close, df["ATRr_14"], signals)
+    targets = calc_take_profit_array(close, 0.004, signals)
+    expected = _reference(df, signals, stops, targets, max_bars)
+    got = list(zip(ledger["entry_i"], ledger["exit_i"], ledger["side"], ledger["reason"], ledger["exit"]))
+    assert len(got) == len(expected) > 50
+    for g, e in zip(got, expected):
+        assert g[:4] == e[:4] and g[4] == pytest.approx(e[4])
+
+
+def test_equity_compounds_trade_returns():
+    df = _frame(800, seed=5)
+    signals = np.random.default_rng(4).choice([-1, 0, 0, 1], size=len(df))
+    ledger, equity = simulate_trades(df, signals, cost=0.0)
+    assert equity["equity"].iloc[-1] == pytest.approx(np.prod(1 + ledger["return"]))
+    # Fuera de las operaciones no hay posición
+    inside = np.zeros(len(df), dtype=bool)
+    for t, x in zip(ledger["entry_i"], ledger["exit_i"]):
+        inside[t + 1:x + 1] = True
+    assert (equity["position"].to_numpy()[~inside] == 0).all()
+
+    stats = summarize_trades(ledger)
+    assert stats["n_trades"] == len(ledger) and stats["stops"] + stats["targets"] <= len(ledger)
+
+
+def test_no_signals_gives_flat_equity():
+    df = _frame(50)
+    ledger, equity = simulate_trades(df, np.zeros(50))
+    assert ledger.empty and (equity["equity"] == 1.0).all()
+    assert summarize_trades(ledger)["n_trades"] == 0
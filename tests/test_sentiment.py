@@ -0,0 +1,34 @@
+from ss91_v3 import sentiment
+from ss91_v3.sentiment import SentimentCache, score_posts, score_texts
+
+
+def test_cache_lru_eviction_and_persistence(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = SentimentCache(path, max_size=3)
+    for key in "abc":
+        cache.put(key, 0.1)
+    cache.get("a")          # "a" pasa a ser la más reciente
+    cache.put("d", 0.2)     # expulsa "b"
+    assert "b" not in cache and len(cache) == 3
+    cache.save()
+
+    reloaded = SentimentCache(path, max_size=3)
+    reloaded.put("e", 0.3)  # expulsa "c", la menos usada tras la recarga
+    assert "c" not in reloaded and "a" in reloaded and "d" in reloaded
+
+
+def test_only_new_posts_are_scored(monkeypatch):
+    scored = []
+    real = sentiment.score_texts
+    monkeypatch.setattr(sentiment, "score_texts", lambda texts, workers=1: scored.extend(texts) or real(texts))
+
+    cache = SentimentCache(path=None)
+    first = score_posts([("t3_a", "Great gains"), ("t3_b", "Awful crash")], cache)
+    second = score_posts([("t3_b", "Awful crash"), ("t3_c", "Flat day")], cache)
+    assert scored == ["Great gains", "Awful crash", "Flat day"]
+    assert second[0] == first[1]
+
+
+def test_parallel_batch_matches_serial():
+    texts = [f"post {i} is {'great' if i % 2 else 'terrible'}" for i in range(400)]
+    assert score_texts(texts, workers=2, chunk_size=50) == score_texts(texts)
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ss91_v3.sher_adapter import SherAdapter
+
+SCHEMA = ("RSI_14", "fibo_ratio", "reddit_vader_avg")
+
+
+class RowModel:
+    """Sherloock sin predict_batch: sólo predict(features)."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, features):
+        self.calls += 1
+        signal = "BUY" if features["RSI_14"] < 30 else "HOLD"
+        return {"signal": signal, "confidence": features["reddit_vader_avg"]}
+
+
+class BatchModel(RowModel):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def predict_batch(self, X):
+        self.batches.append(X.shape)
+        return np.where(X[:, 0] < 30, 1, 0)
+
+
+def test_fixed_schema_vector_ignores_key_order():
+    adapter = SherAdapter(schema=SCHEMA, model=RowModel())
+    vec, keys = adapter._vec({"reddit_vader_avg": 0.4, "RSI_14": 25.0, "extra": 9, "fibo_ratio": None})
+    assert keys == SCHEMA
+    assert vec.tolist() == [[25.0, 0.0, 0.4]]
+
+
+def test_dataframe_columns_are_matched_by_name():
+    adapter = SherAdapter(schema=SCHEMA, model=RowModel())
+    df = pd.DataFrame({"reddit_vader_avg": [0.1], "RSI_14": [20.0]})
+    assert adapter.to_matrix(df).tolist() == [[20.0, 0.0, 0.1]]
+    with pytest.raises(ValueError):
+        adapter.to_matrix(np.zeros((2, 5)))
+
+
+def test_vectorized_dispatch_in_chunks():
+    model = BatchModel()
+    adapter = SherAdapter(schema=SCHEMA, model=model, chunk_size=4)
+    X = np.column_stack([np.arange(10) * 5.0, np.zeros(10), np.full(10, 0.5)])
+    out = adapter.predict_batch(X)
+    assert [o["signal"] for o in out] == ["BUY"] * 6 + ["HOLD"] * 4
+    assert model.batches == [(4, 3), (4, 3), (2, 3)] and model.calls == 0
+
+
+def test_row_fallback_matches_predict_and_dedups():
+    model = RowModel()
+    adapter = SherAdapter(schema=SCHEMA, model=model)
+    X = np.array([[25.0, 0.1, 0.2], [50.0, 0.5, 0.9], [25.0, 0.1, 0.2], [25.0, 0.1, 0.2]])
+    out = adapter.predict_batch(X)
+    expected = [adapter.predict(dict(zip(SCHEMA, row))) for row in X]
+    assert out == expected
+    assert model.calls == 2 + len(X)  # 2 filas únicas en el lote + las de referencia
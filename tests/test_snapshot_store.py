@@ -0,0 +1,80 @@
+import json
+import os
+import pandas as pd
+import pytest
+from ss91_v3.snapshot_store import SnapshotStore, flatten_numeric
+
+
+def _payload(day, rsi, vader):
+    return {
+        "snapshot_time_utc": f"2024-01-{day:02d}T21:00:00+00:00",
+        "symbol": "EURUSD=X",
+        "ohlc_latest": {"close": 1.1, "RSI_14": rsi, "recent_prices": [1.1, 1.2]},
+        "fibonacci": {"0.618": 1.09},
+        "marginal_factors": {"reddit_vader_avg": vader, "fred_debt_norm": 0.5},
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SnapshotStore(str(tmp_path / "archive"))
+    for day in range(1, 11):
+        store.append(_payload(day, 30.0 + day, day / 10))
+    return store
+
+
+def test_flatten_numeric_skips_lists_and_strings():
+    flat = flatten_numeric(_payload(1, 40.0, 0.5))
+    assert flat["ohlc_latest.RSI_14"] == 40.0
+    assert flat["fibonacci.0.618"] == 1.09
+    assert "symbol" not in flat and "ohlc_latest.recent_prices" not in flat
+
+
+def test_range_query_by_column_suffix(store):
+    df = store.query(["RSI_14", "reddit_vader_avg"], start="2024-01-03", end="2024-01-05 23:59")
+    assert list(df.columns) == ["RSI_14", "reddit_vader_avg"]
+    assert df["RSI_14"].tolist() == [33.0, 34.0, 35.0]
+    assert df["reddit_vader_avg"].tolist() == pytest.approx([0.3, 0.4, 0.5])
+    with pytest.raises(KeyError):
+        store.query(["no_existe"])
+
+
+def test_latest_and_records_survive_reopen(store):
+    reopened = SnapshotStore(store.root)
+    assert len(reopened) == 10
+    assert reopened.latest()["ohlc_latest"]["RSI_14"] == 40.0
+    assert reopened.latest(on="2024-01-04")["marginal_factors"]["reddit_vader_avg"] == 0.4
+    assert reopened.latest(on="2023-12-31") is None
+    assert [r["ohlc_latest"]["RSI_14"] for r in reopened.records(start="2024-01-09")] == [39.0, 40.0]
+
+
+def test_rejected_append_leaves_no_orphan_record(store):
+    size = os.path.getsize(store._records_path)
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            store.append(_payload(5, 40.0, 0.4))  # anterior al último snapshot
+    assert os.path.getsize(store._records_path) == size
+    store.append(_payload(11, 60.0, 0.6))
+    assert store.latest()["ohlc_latest"]["RSI_14"] == 60.0
+    assert len(store.records()) == 11
+
+
+def test_new_numeric_fields_are_backfilled(store):
+    payload = _payload(11, 41.0, 0.9)
+    payload["marginal_factors"]["gtrends_recession"] = 0.2
+    store.append(payload)
+    df = store.query(["gtrends_recession"])
+    assert df["gtrends_recession"].isna().sum() == 10 and df["gtrends_recession"].iloc[-1] == 0.2
+
+
+def test_json_export_import_round_trip(store, tmp_path):
+    days = store.export_json(str(tmp_path / "json"))
+    assert days[0] == "2024-01-01" and len(days) == 10
+    with open(tmp_path / "json" / "2024-01-02.json", encoding="utf-8") as f:
+        assert json.load(f)["ohlc_latest"]["RSI_14"] == 32.0
+
+    migrated = SnapshotStore(str(tmp_path / "migrated"))
+    assert migrated.import_json(str(tmp_path / "json")) == 10
+    # Reimportar no duplica
+    assert migrated.import_json(str(tmp_path / "json")) == 0
+    pd.testing.assert_frame_equal(migrated.query(["RSI_14"]), store.query(["RSI_14"]))
@@ -0,0 +1,95 @@
+import time
+import numpy as np
+import pandas as pd
+from conftest import random_walk_ohlc
+from ss91_v3.storage import ColumnarTable, OHLCVStore
+
+
+class FakeProvider:
+    """Proveedor offline: sirve un histórico fijo y registra lo que se pide."""
+
+    def __init__(self, n, freq="D"):
+        self.history = random_walk_ohlc(n, sigma=0.004, freq=freq, spread=0.001, open_=True, volume=1)
+        self.visible = n
+        self.calls = []
+
+    def __call__(self, symbol, interval="1d", **kwargs):
+        df = self.history.iloc[:self.visible]
+        if "start" in kwargs:
+            df = df[df["date"] >= pd.Timestamp(kwargs["start"])]
+        self.calls.append((kwargs, len(df)))
+        return df.reset_index(drop=True)
+
+
+def test_table_append_and_range_read(tmp_path):
+    table = ColumnarTable(str(tmp_path / "t"))
+    idx = pd.date_range("2024-01-01", periods=10, freq="D")
+    table.append(idx[:6], {"a": np.arange(6.0)})
+    table.append(idx[6:], {"a": np.arange(6.0, 10.0), "b": np.ones(4)})
+
+    reopened = ColumnarTable(str(tmp_path / "t"))
+    df = reopened.read(start="2024-01-03", end="2024-01-08")
+    assert df["a"].tolist() == [2.0, 3.0, 4.0, 5.0, 6.0, 7.0]
+    assert np.isnan(df["b"].iloc[0]) and df["b"].iloc[-1] == 1.0
+
+
+def test_interrupted_append_does_not_shift_rows(tmp_path):
+    table = ColumnarTable(str(tmp_path / "t"))
+    table.append(pd.date_range("2024-01-01", periods=2, freq="D", tz="UTC"), {"a": [1.0, 2.0], "b": [1.0, 2.0]})
+    # Un proceso muere tras escribir la columna "a" y antes de guardar meta.json
+    with open(table._file("a"), "ab") as f:
+        np.array([3.0]).tofile(f)
+
+    table = ColumnarTable(str(tmp_path / "t"))
+    table.append(pd.date_range("2024-01-03", periods=1, freq="D", tz="UTC"), {"a": [4.0], "b": [4.0]})
+    df = ColumnarTable(str(tmp_path / "t")).read()
+    assert df["a"].tolist() == df["b"].tolist() == [1.0, 2.0, 4.0]
+    assert len(table.index()) == 3
+
+
+def test_store_only_downloads_missing_tail(tmp_path):
+    provider = FakeProvider(500)
+    provider.visible = 480
+    store = OHLCVStore(str(tmp_path), downloader=provider)
+    store.get("EURUSD=X", period="max")
+    provider.visible = 500
+    df = store.get("EURUSD=X", period="max")
+
+    kwargs, rows = provider.calls[-1]
+    assert "start" in kwargs and rows == 21  # la vela provisional + 20 nuevas
+    pd.testing.assert_frame_equal(df, provider.history, check_dtype=False)
+
+
+def _best_of(fn, repeat=5):
+    """Mínimo de `repeat` mediciones (segundos): menos sensible a la carga de la máquina."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def test_cold_vs_warm_load(tmp_path):
+    provider = FakeProvider(24 * 252 * 10, freq="h")
+    store = OHLCVStore(str(tmp_path / "big"), downloader=provider)
+
+    start = time.perf_counter()
+    store.get("EURUSD=X", interval="1h", period="max")  # descarga + escritura
+    cold = time.perf_counter() - start
+    warm = _best_of(lambda: store.get("EURUSD=X", interval="1h", period="max", refresh=False))
+    df = store.get("EURUSD=X", interval="1h", period="max", refresh=False)
+    sliced = store.get("EURUSD=X", interval="1h", start="2020-06-01", end="2020-06-30", refresh=False)
+
+    assert len(df) == len(provider.history)
+    assert len(provider.calls) == 1
+    assert sliced["date"].min() >= pd.Timestamp("2020-06-01")
+    assert warm < cold / 2
+
+    # Un mes de una tabla 10 veces más pequeña cuesta lo mismo: la lectura no escala con la tabla
+    small = OHLCVStore(str(tmp_path / "small"), downloader=FakeProvider(24 * 252 * 10 // 10, freq="h"))
+    small.get("EURUSD=X", interval="1h", period="max")
+    month = {"interval": "1h", "start": "2015-06-01", "end": "2015-06-30", "refresh": False}
+    big_slice = _best_of(lambda: store.get("EURUSD=X", **month))
+    small_slice = _best_of(lambda: small.get("EURUSD=X", **month))
+    assert big_slice < small_slice * 3
@@ -0,0 +1,140 @@
+import threading
+import time
+import numpy as np
+from conftest import random_walk_ohlc
+from ss91_v3.fibonacci import rolling_fibonacci
+from ss91_v3.indicators import INDICATOR_COLUMNS, IndicatorState
+from ss91_v3.strategy import CompiledRules
+from ss91_v3.streaming import (MarginalRefresher, QueueSource, StreamState, measure, poll_bars,
+                               replay_frame, static_factors, stream_decisions)
+
+
+def _bars(n, seed=0):
+    return random_walk_ohlc(n, seed, sigma=0.002, freq="min", start="2024-01-02 09:00", spread=0.001,
+                            open_=True, volume=1)
+
+
+def test_stream_state_matches_batch_indicators_and_fibonacci():
+    df = _bars(300)
+    state = StreamState(fibo_lookback=50)
+    rows, ratios = [], []
+    for bar in replay_frame(df):
+        state.update(bar)
+        rows.append([state.values[c] for c in INDICATOR_COLUMNS])
+        ratios.append(state.position_ratio)
+    expected, _ = IndicatorState().advance(df["high"], df["low"], df["close"])
+    dpo = INDICATOR_COLUMNS.index("DPO_14")
+    np.testing.assert_allclose(np.delete(rows, dpo, axis=1), np.delete(expected, dpo, axis=1))
+    np.testing.assert_allclose(ratios, rolling_fibonacci(df, 50)["position_ratio"])
+
+    snapshot = state.snapshot({"reddit_vader_avg": 0.2})
+    assert snapshot["ohlc_latest"]["recent_prices"] == df["close"].iloc[-5:].tolist()
+    assert snapshot["fibonacci"]["fibo_levels"]["100%"] == snapshot["fibonacci"]["low_1y"]
+
+
+def _panic_thresholds():
+    # Cualquier vela con RSI válido dispara Pánico
+    return {"rsi_low": 101.0, "rsi_high": 200.0, "fibo_low": 2.0, "fibo_high": 2.0,
+            "sentiment_panic": 1.0, "sentiment_euphoria": 1.0, "gtrends_crisis": -1.0}
+
+
+def test_stream_decisions_calls_decide_only_on_signals():
+    calls = []
+
+    def decide(snapshot, thresholds, rules=None):
+        assert isinstance(rules, CompiledRules)
+        calls.append(snapshot)
+        return {"decision": "BUY"}, "BUY", "", ""
+
+    events = list(stream_decisions(replay_frame(_bars(40)), static_factors(), _panic_thresholds(),
+                                   fibo_lookback=20, decide=decide))
+    assert len(events) == 40
+    # RSI es NaN en la primera vela
+    assert events[0]["signal"] == 0 and events[0]["decision"] == "HOLD"
+    assert all(e["decision"] == "BUY" and e["signal"] == 1 for e in events[1:])
+    assert len(calls) == 39
+    assert calls[-1]["ohlc_latest"]["close"] == events[-1]["close"]
+
+    stats = measure(iter(events))
+    assert stats["bars"] == 40 and stats["signals"] == 39 and stats["decisions"] == {"HOLD": 1, "BUY": 39}
+
+
+def test_slow_decision_is_bounded_by_timeout():
+    release = threading.Event()
+
+    def slow(snapshot, thresholds, rules=None):
+        release.wait(5)
+        return {"decision": "BUY"}, "BUY", "", ""
+
+    start = time.perf_counter()
+    events = list(stream_decisions(replay_frame(_bars(5)), static_factors(), _panic_thresholds(),
+                                   fibo_lookback=5, decide=slow, decision_timeout_s=0.05))
+    release.set()
+    assert time.perf_counter() - start < 1.0
+    assert "sin respuesta" in events[1]["error"]
+    # Mientras la primera sigue en curso, las siguientes no se encolan
+    assert all(e["error"] == "decisión anterior en curso" for e in events[2:])
+    assert all(e["decision"] == "HOLD" for e in events)
+
+
+def test_queue_source():
+    source = QueueSource()
+    df = _bars(3)
+
+    def producer():
+        for bar in replay_frame(df):
+            source.put(bar)
+        source.close()
+
+    threading.Thread(target=producer).start()
+    assert [b.close for b in source] == df["close"].tolist()
+
+
+def test_poll_bars_emits_only_new_closed_bars():
+    df = _bars(6)
+    responses = [df.iloc[:3], df.iloc[:3], df.iloc[:6]]
+    stop = threading.Event()
+
+    def fetch(symbol, interval, period):
+        if len(responses) == 1:
+            stop.set()
+        return responses.pop(0)
+
+    bars = list(poll_bars("EURUSD=X", every_s=0, fetch=fetch, stop=stop))
+    # La última vela de cada respuesta sigue abierta
+    assert [b.date for b in bars] == df["date"].iloc[:5].tolist()
+
+
+def test_poll_bars_accepts_intraday_datetime_column():
+    # yfinance nombra 'Datetime' al índice intradía; tras reset_index + lower() queda 'datetime'
+    df = _bars(4).rename(columns={"date": "datetime"})
+    stop = threading.Event()
+
+    def fetch(symbol, interval, period):
+        stop.set()
+        return df
+
+    bars = list(poll_bars("EURUSD=X", every_s=0, fetch=fetch, stop=stop))
+    assert [b.date for b in bars] == df["datetime"].iloc[:3].tolist()
+
+
+def test_marginal_refresher_cadence():
+    now = [0.0]
+    fetched = []
+
+    def fetch():
+        fetched.append(now[0])
+        return {"reddit_vader_avg": 0.1}
+
+    refresher = MarginalRefresher(fetch=fetch, interval_s=60, clock=lambda: now[0])
+    assert refresher.current()["reddit_vader_avg"] == 0.5  # por defecto mientras refresca
+    refresher.wait(1)
+    assert refresher.current()["reddit_vader_avg"] == 0.1
+    now[0] = 30.0
+    refresher.current()
+    refresher.wait(1)
+    assert fetched == [0.0]
+    now[0] = 61.0
+    refresher.current()
+    refresher.wait(1)
+    assert fetched == [0.0, 61.0]
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import random_walk_ohlc
+from ss91_v3.backtest import run_vectorized_backtest, summarize
+from ss91_v3.strategy import thresholds_from_config, DEFAULT_THRESHOLDS
+from ss91_v3.sweep import DEFAULT_GRID, evaluate_combo, param_grid, prepare_arrays, run_sweep, walk_forward, walk_forward_splits
+
+GRID = {"rsi_low": [30.0, 40.0], "rsi_high": [60.0, 70.0], "fibo_low": [0.2, 0.5], "gtrends_crisis": [0.0, 0.5]}
+
+
+def _frame(n, seed=0):
+    return random_walk_ohlc(n, seed, rsi=True)
+
+
+def test_combo_matches_backtest_summary():
+    df = _frame(600)
+    sentiment = np.random.default_rng(2).uniform(0, 1, 600)
+    th = {"rsi_low": 40.0, "gtrends_crisis": 0.0, "sentiment_euphoria": 0.6}
+    arrays = prepare_arrays(df, sentiment=sentiment, gtrends_crisis=0.6, fibo_lookback=50)
+    expected = summarize(run_vectorized_backtest(df, sentiment=sentiment, gtrends_crisis=0.6,
+                                                 thresholds=th, fibo_lookback=50, cost=0.0001))
+    assert evaluate_combo(arrays, th, cost=0.0001) == pytest.approx(expected)
+
+
+def test_parallel_sweep_matches_serial():
+    arrays = prepare_arrays(_frame(800), sentiment=0.2, gtrends_crisis=0.6, fibo_lookback=60)
+    serial = run_sweep(arrays, GRID, workers=1)
+    parallel = run_sweep(arrays, GRID, workers=2, chunk_size=3)
+    assert len(serial) == 16
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_walk_forward_splits_are_out_of_sample():
+    splits = walk_forward_splits(600, folds=5)
+    assert splits[0] == (0, 100, 100, 200) and splits[-1] == (400, 500, 500, 600)
+    assert all(tr1 <= te0 for _, tr1, te0, _ in splits)
+    anchored = walk_forward_splits(600, folds=5, anchored=True)
+    assert all(tr0 == 0 for tr0, *_ in anchored)
+    with pytest.raises(ValueError):
+        walk_forward_splits(10, folds=20)
+
+
+def test_walk_forward_reports_each_fold():
+    arrays = prepare_arrays(_frame(900), sentiment=0.2, gtrends_crisis=0.6, fibo_lookback=60)
+    report = walk_forward(arrays, GRID, folds=4, workers=2)
+    assert report["fold"].tolist() == [0, 1, 2, 3]
+    # Los parámetros elegidos dan esas métricas en su tramo de prueba
+    row = report.iloc[2]
+    params = {k[len("param_"):]: row[k] for k in report.columns if k.startswith("param_")}
+    test = evaluate_combo(arrays, params, int(row["test_start"]), int(row["test_end"]))
+    assert test["sharpe"] == pytest.approx(row["test_sharpe"])
+
+
+def test_grid_and_config_thresholds():
+    assert len(param_grid(GRID)) == 16
+    with pytest.raises(KeyError):
+        param_grid({"rsi_bajo": [1]})
+    config = {"indicators": {"momentum_threshold_low": 25, "momentum_threshold_high": 75},
+              "strategy_thresholds": {"fibo_low": 0.1}}
+    th = thresholds_from_config(config)
+    assert (th["rsi_low"], th["rsi_high"], th["fibo_low"]) == (25.0, 75.0, 0.1)
+    assert th["sentiment_panic"] == DEFAULT_THRESHOLDS["sentiment_panic"]
+
+
+def _record_factors(history, dates, seed=1):
+    rng = np.random.default_rng(seed)
+    for t in pd.DatetimeIndex(dates).tz_localize("UTC"):
+        history.record("sentiment", {"reddit_vader_avg": rng.uniform(0, 1)}, as_of=t)
+        history.record("interest", {"gtrends_recession": rng.uniform(0, 1)}, as_of=t)
+
+
+def test_cli_sweeps_over_recorded_factors(tmp_path, monkeypatch):
+    from ss91_v3 import data_pipeline, sweep
+    from ss91_v3.factor_history import FactorHistory
+    df = _frame(600)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(data_pipeline, "fetch_ohlcv", lambda symbol, period: df)
+    seen = []
+    monkeypatch.setattr(sweep, "walk_forward", lambda arrays, *a, **k: seen.append(arrays) or pd.DataFrame())
+
+    # Sin factores registrados ninguna regla podría disparar: no se barre sobre ceros
+    with pytest.raises(SystemExit):
+        sweep.main(["--factor-history", str(tmp_path / "history"), "--workers", "1"])
+    assert seen == []
+
+    _record_factors(FactorHistory(str(tmp_path / "history")), df["date"])
+    sweep.main(["--factor-history", str(tmp_path / "history"), "--workers", "1"])
+    arrays = seen[0]
+    assert arrays[2].std() > 0 and arrays[3].std() > 0
+    signals = [evaluate_combo(arrays, combo)["n_signals"] for combo in param_grid(DEFAULT_GRID)[::97]]
+    assert max(signals) > 0